@@ -0,0 +1,81 @@
+"""
+Benchmarks the cold-start import time of the CLI and the web API.
+
+Each module is imported in fresh Python processes with `-X importtime`, and
+the median and minimum of its cumulative import time are reported. With
+--output, the results are appended as a JSON line together with the commit
+and Python version, so that the cold-start time can be tracked over time.
+
+Usage:
+python benchmarks/import_time.py
+python benchmarks/import_time.py --runs 10 --output import_times.jsonl
+"""
+import argparse
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+MODULES = ("daily_briefing.main", "daily_briefing.web_api")
+
+def import_time_us(module: str) -> int:
+    """Imports a module in a fresh process and returns its cumulative import time in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    # Lines look like "import time:   self [us] | cumulative | imported package".
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)\s*$", line)
+        if match and match.group(2) == module:
+            return int(match.group(1))
+    raise RuntimeError(f"No import time reported for {module}.")
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def benchmark(modules: List[str], runs: int) -> Dict[str, Dict[str, float]]:
+    """
+    Measures the import time of every module.
+
+    Returns:
+        The median and minimum import time of each module, in milliseconds.
+    """
+    results = {}
+    for module in modules:
+        times = [import_time_us(module) / 1000 for _ in range(runs)]
+        results[module] = {"median_ms": round(statistics.median(times), 1), "min_ms": round(min(times), 1)}
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=list(MODULES), help="The modules to import.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per module.")
+    parser.add_argument("--output", help="A JSON lines file to append the results to.")
+    args = parser.parse_args()
+
+    results = benchmark(args.modules, args.runs)
+    for module, times in results.items():
+        print(f"{module}: median {times['median_ms']} ms, min {times['min_ms']} ms")
+    if args.output:
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "runs": args.runs,
+            "modules": results,
+        }
+        with open(args.output, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n")
+
+if __name__ == "__main__":
+    main()
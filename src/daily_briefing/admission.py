@@ -0,0 +1,194 @@
+"""
+Admission control and load shedding for the web API.
+
+Without a limit, an overloaded server accepts every request, and they all
+queue behind the busy worker threads until the clients time out, so no
+request succeeds any more. AdmissionMiddleware instead routes each request
+into a lane (e.g. briefings, logs, authentication). Each lane admits a
+bounded number of concurrent requests and keeps a short, bounded queue.
+Requests that don't fit into the queue, or that wait in it for too long, are
+rejected right away with 503 Service Unavailable and a Retry-After header.
+Because the lanes are independent, a flood of briefing requests cannot starve
+the log endpoints or logins.
+
+The requests of the lanes mostly run in anyio's worker threads, so the lanes
+together should not admit more requests than there are threads; see
+`fit_to_thread_limit`.
+"""
+import asyncio
+import math
+import os
+import weakref
+from typing import Callable, Dict, Iterable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class AdmissionLane:
+    """A bounded number of concurrent request slots with a bounded wait queue."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int = 0, queue_timeout: float = 1.0):
+        """
+        Initializes the lane.
+
+        Args:
+            name: The name of the lane, e.g. "briefing".
+            max_concurrent: The maximum number of requests processed at once.
+            max_queue: The maximum number of requests waiting for a slot.
+            queue_timeout: How long a request may wait for a slot, in seconds.
+
+        Raises:
+            ValueError: If max_concurrent is not positive or max_queue is negative.
+        """
+        if max_concurrent <= 0 or max_queue < 0:
+            raise ValueError("max_concurrent must be positive and max_queue must not be negative.")
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # One semaphore per event loop, created on first use, as an asyncio
+        # semaphore can only be used by one loop.
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+
+    @classmethod
+    def from_env(cls, name: str, max_concurrent: int, max_queue: int, queue_timeout: float) -> "AdmissionLane":
+        """
+        Creates a lane whose limits can be overridden through the environment,
+        e.g. ADMISSION_BRIEFING_MAX_CONCURRENT for the "briefing" lane.
+
+        Args:
+            name: The name of the lane.
+            max_concurrent: The default maximum number of concurrent requests.
+            max_queue: The default maximum number of waiting requests.
+            queue_timeout: The default maximum wait for a slot, in seconds.
+
+        Returns:
+            The AdmissionLane.
+        """
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            max_concurrent=int(os.getenv(prefix + "MAX_CONCURRENT", str(max_concurrent))),
+            max_queue=int(os.getenv(prefix + "MAX_QUEUE", str(max_queue))),
+            queue_timeout=float(os.getenv(prefix + "QUEUE_TIMEOUT", str(queue_timeout))),
+        )
+
+    @property
+    def _semaphore(self) -> asyncio.Semaphore:
+        """The semaphore of the running event loop."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return semaphore
+
+    @property
+    def retry_after(self) -> int:
+        """The number of seconds a rejected client is asked to wait."""
+        return max(1, math.ceil(self.queue_timeout))
+
+    async def acquire(self) -> bool:
+        """
+        Waits for a free slot, if the queue has room.
+
+        Returns:
+            True if the request was admitted, and must call `release()` when
+            done. False if it was shed.
+        """
+        semaphore = self._semaphore
+        if semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.shed += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """Frees the slot of an admitted request."""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+def fit_to_thread_limit(lanes: Iterable[AdmissionLane], threads: int) -> None:
+    """
+    Scales the concurrency limits of lanes down in proportion, so that they
+    add up to at most `threads`. Admitting more requests than there are
+    worker threads only moves the queue from the lanes to the thread pool,
+    where requests wait without a timeout and can't be shed.
+
+    Must be called before the lanes admit requests, e.g. at startup.
+
+    Args:
+        lanes: The lanes.
+        threads: The number of worker threads available to the lanes.
+    """
+    lanes = list(lanes)
+    total = sum(lane.max_concurrent for lane in lanes)
+    if total <= threads:
+        return
+    for lane in lanes:
+        lane.max_concurrent = max(1, lane.max_concurrent * threads // total)
+        lane._semaphores.clear()
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests through per-lane limits."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        lanes: Dict[str, AdmissionLane],
+        classify: Callable[[str, str], Optional[str]],
+    ):
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            lanes: The lanes, keyed by name.
+            classify: Returns the lane name for a request's method and path,
+                or None for requests that aren't limited.
+        """
+        self.app = app
+        self.lanes = lanes
+        self.classify = classify
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        lane_name = self.classify(scope["method"], scope["path"])
+        lane = self.lanes.get(lane_name) if lane_name is not None else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await lane.acquire():
+            response = JSONResponse(
+                {"detail": "The server is overloaded. Please retry later."},
+                status_code=503,
+                headers={"Retry-After": str(lane.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            # The slot is held until the response, including a streamed
+            # body, has been sent.
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
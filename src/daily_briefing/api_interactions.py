@@ -9,6 +9,10 @@ from typing import List, Dict, Any, Optional
 
 import requests
 
+from .http_session import create_session, preconnect
+from .metrics import timed_upstream_call
+from .tracing import outbound_headers, traced
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class JSONPlaceholderClient:
@@ -24,7 +28,20 @@ class JSONPlaceholderClient:
         if not base_url:
             raise ValueError("Base URL cannot be empty.")        
         self.base_url = base_url
+        # Reuses connections across requests, and threads.
+        self.session = create_session()
+
+    def preconnect(self) -> None:
+        """
+        Opens a connection to the API ahead of the first request.
 
+        Raises:
+            requests.exceptions.RequestException: If the API cannot be reached.
+        """
+        preconnect(self.session, self.base_url)
+
+    @timed_upstream_call("get_users")
+    @traced("get_users")
     def get_users(self) -> Optional[List[Dict[str, Any]]]:
         """
         Fetches all users from the API.
@@ -34,7 +51,7 @@ class JSONPlaceholderClient:
         """
         logging.info(f"Fetching all users from: {self.base_url}/users")
         try:
-            response = requests.get(f"{self.base_url}/users", timeout=5)
+            response = self.session.get(f"{self.base_url}/users", headers=outbound_headers(), timeout=5)
             response.raise_for_status()
             users = response.json()
             logging.info(f"Successfully fetched {len(users)} users.")
@@ -43,6 +60,8 @@ class JSONPlaceholderClient:
             logging.error(f"An error occurred fetching users: {e}")
         return None
 
+    @timed_upstream_call("get_user")
+    @traced("get_user")
     def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """
         Fetches a single user by their ID from the API.
@@ -59,7 +78,7 @@ class JSONPlaceholderClient:
             return None
 
         try:
-            response = requests.get(f"{self.base_url}/users/{user_id}", timeout=5)
+            response = self.session.get(f"{self.base_url}/users/{user_id}", headers=outbound_headers(), timeout=5)
             response.raise_for_status()
             user = response.json()
             # JSONPlaceholder returns an empty object {} for a non-existent ID with a 200 OK
@@ -73,6 +92,8 @@ class JSONPlaceholderClient:
             logging.error(f"An error occurred fetching user {user_id}: {e}")
         return None
 
+    @timed_upstream_call("create_post")
+    @traced("create_post")
     def create_post(self, title: str, body: str, user_id: int) -> Optional[Dict[str, Any]]:
         """
         Creates a new post for a given user.
@@ -100,7 +121,7 @@ class JSONPlaceholderClient:
             "userId": user_id
         }
         try:
-            response = requests.post(f"{self.base_url}/posts", json=payload, timeout=5)
+            response = self.session.post(f"{self.base_url}/posts", json=payload, headers=outbound_headers(), timeout=5)
             response.raise_for_status()
             if response.status_code == 201:
                 created_post = response.json()
@@ -114,12 +135,15 @@ class JSONPlaceholderClient:
             logging.error(f"Invalid post data: {err}")
         return None
 
-    def get_posts_by_user(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+    @timed_upstream_call("get_posts_by_user")
+    @traced("get_posts_by_user")
+    def get_posts_by_user(self, user_id: int, since_id: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Fetches all posts for a specific user ID using query parameteres.
         
         Args:
             user_id (int): The ID of the user whose posts are to be fetched.
+            since_id (Optional[int]): If given, only posts with a greater ID are fetched.
 
         Returns:
             A list of post dictionaries if successful, otherwise None. 
@@ -130,8 +154,11 @@ class JSONPlaceholderClient:
             return None
 
         params = {"userId": user_id}        
+        if since_id is not None:
+            # The API supports range filters on any field via the `_gte` suffix.
+            params["id_gte"] = since_id + 1
         try:
-            response = requests.get(f"{self.base_url}/posts", params=params, timeout=5)
+            response = self.session.get(f"{self.base_url}/posts", params=params, headers=outbound_headers(), timeout=5)
             response.raise_for_status()
             posts = response.json()
             if posts:
@@ -143,6 +170,8 @@ class JSONPlaceholderClient:
             logging.error(f"An error occurred fetching posts for user {user_id}: {e}")
         return None
 
+    @timed_upstream_call("get_comments_for_post")
+    @traced("get_comments_for_post")
     def get_comments_for_post(self, post_id: int) -> Optional[List[Dict[str, Any]]]:
         """
         Fetches all comments for a specific post ID.
@@ -159,7 +188,7 @@ class JSONPlaceholderClient:
             return None
 
         try:
-            response = requests.get(f"{self.base_url}/posts/{post_id}/comments", timeout=5)
+            response = self.session.get(f"{self.base_url}/posts/{post_id}/comments", headers=outbound_headers(), timeout=5)
             response.raise_for_status()
             comments = response.json()
             if comments:
@@ -169,4 +198,35 @@ class JSONPlaceholderClient:
                 logging.info(f"No comments for post {post_id}.")
         except requests.exceptions.RequestException as e:
             logging.error(f"An error occurred fetching comments for post {post_id}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+    @timed_upstream_call("get_todos_by_user")
+    @traced("get_todos_by_user")
+    def get_todos_by_user(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches all todos for a specific user ID using query parameters.
+
+        Args:
+            user_id (int): The ID of the user whose todos are to be fetched.
+
+        Returns:
+            A list of todo dictionaries if successful, otherwise None.
+        """
+        logging.info(f"Fetching todos for user ID {user_id} from: {self.base_url}/todos...")
+        if not isinstance(user_id, int) or user_id <= 0:
+            logging.error("User ID must be a positive integer.")
+            return None
+
+        params = {"userId": user_id}
+        try:
+            response = self.session.get(f"{self.base_url}/todos", params=params, headers=outbound_headers(), timeout=5)
+            response.raise_for_status()
+            todos = response.json()
+            if todos:
+                logging.info(f"Successfully fetched {len(todos)} todos for user {user_id}.")
+                return todos
+            else:
+                logging.info(f"No todos for user ID: {user_id}.")
+        except requests.exceptions.RequestException as e:
+            logging.error(f"An error occurred fetching todos for user {user_id}: {e}")
+        return None
@@ -4,15 +4,19 @@ Handles all authentication and authorization logic.
 This module is responsible for:
 1. Password hashing and verification using passlib.
 2. Creating and decoding JSON Web Tokens (JWTs) for authentication.
-3. Providing a FastAPI dependency (`get_current_user`) to protect endpoints.
+3. Providing FastAPI dependencies to protect endpoints: `get_current_user`
+   for any authenticated user, and `get_admin_user` for operational
+   endpoints, which require a token granted the "admin" scope.
+
+passlib and jose are imported on first use, as most processes importing
+this module (e.g. the CLI) never hash a password or decode a token.
 """
+import functools
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 # --- Configuration ---
 # In a real production application, this should be loaded from environment variables.
@@ -20,12 +24,19 @@ SECRET_KEY = "a_very_secret_key_that_should_be_in_an_env_var"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# The OAuth2 scope required by operational endpoints, e.g. the profiler. It is
+# only put into a token if the user requests it at login and is allowed it.
+ADMIN_SCOPE = "admin"
+
 # OAuth2 scheme: tells FastAPI where the client should go to get a token.
 # The `tokenUrl="token"` means it will point to `/token` endpoint.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Password hashing context using the Bcrypt algorithm.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@functools.lru_cache(maxsize=None)
+def get_pwd_context():
+    """Returns the password hashing context using the Bcrypt algorithm."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # --- Password Utilities ---
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -39,7 +50,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if the passwords match, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """
@@ -51,7 +62,7 @@ def get_password_hash(password: str) -> str:
     Returns:
         The hashed password as a string.
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 # --- JWT Utilities ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -65,6 +76,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         The encoded JWT as a string.
     """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -74,6 +87,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def get_token_subject(token: str) -> Optional[str]:
+    """
+    Returns the 'sub' claim of a valid JWT, without raising.
+
+    Used where an invalid token is not an error, e.g. to identify the caller
+    for rate limiting.
+
+    Args:
+        token: The encoded JWT.
+
+    Returns:
+        The subject, or None if the token is invalid or has no subject.
+    """
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
 # --- Security Dependency ---
 def get_current_user(token: str = Depends(oauth2_scheme)):
     """
@@ -91,8 +124,11 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         token: The bearer token from the request header.
 
     Returns:
-        A dictionary containing the user's data (e.g., {"username": "testuser"}).
+        A dictionary containing the user's data and the scopes granted to the
+        token (e.g., {"username": "testuser", "scopes": []}).
     """
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -105,6 +141,22 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
         # In a real app, you would fetch the user from the database here
         # and return a full user object.
-        return {"username": username}
+        return {"username": username, "scopes": str(payload.get("scope", "")).split()}
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+
+def get_admin_user(current_user: dict = Depends(get_current_user)):
+    """
+    FastAPI dependency securing operational endpoints: the token must have
+    been granted the admin scope.
+
+    Raises:
+        HTTPException: 403 if the token lacks the admin scope.
+    """
+    if ADMIN_SCOPE not in current_user.get("scopes", []):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+            headers={"WWW-Authenticate": f'Bearer scope="{ADMIN_SCOPE}"'},
+        )
+    return current_user
\ No newline at end of file
@@ -0,0 +1,316 @@
+"""
+In-memory store of precomputed ("materialized") briefings.
+
+The inputs of a briefing (user record, posts and weather) change on a
+timescale of minutes, so rebuilding it on every request is wasted work for
+frequently polled users. This module keeps the latest BriefingResponse per
+(user_id, city) and refreshes the entries in a background thread shortly
+before they expire, so the /briefing endpoint can serve them with a single
+dictionary lookup.
+
+Each entry also carries the briefing serialized to JSON and an ETag derived
+from its content, both computed once when the entry is stored, so serving it
+needs no per-request serialization and conditional requests need no hashing.
+
+When the API runs several worker processes, the store can be backed by a
+SharedCache: every stored briefing is also written to it, a worker missing an
+entry takes the one another worker stored, and a short lease makes sure only
+one worker regenerates an entry about to expire, while the others take its
+result. The entries being served, and which users are active, stay per
+process.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from .cache import SharedCache
+from .metrics import record_cache_lookup
+from .models import BriefingResponse
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BriefingKey = Tuple[int, str]
+BriefingGenerator = Callable[[int, str], BriefingResponse]
+
+def briefing_etag(briefing: BriefingResponse) -> str:
+    """
+    Computes a weak ETag from the content of a briefing.
+
+    `generated_at` is left out, so a regenerated briefing with the same
+    content keeps its ETag. The ETag is weak because the serialized body
+    still differs in that timestamp.
+
+    Args:
+        briefing: The briefing.
+
+    Returns:
+        The ETag, including quotes and the W/ prefix.
+    """
+    content = briefing.model_dump_json(exclude={"generated_at"})
+    return f'W/"{hashlib.sha256(content.encode()).hexdigest()[:32]}"'
+
+@dataclass
+class MaterializedBriefing:
+    """A precomputed briefing together with its freshness information."""
+    briefing: BriefingResponse
+    expires_at: float     # time.monotonic() deadline after which the entry is stale
+    last_accessed: float  # time.monotonic() of the last read, used to drop idle users
+    etag: str = ""        # computed once per stored briefing, see briefing_etag()
+    body: bytes = b""     # the briefing serialized to JSON
+
+    def max_age(self) -> int:
+        """The number of whole seconds the entry stays fresh."""
+        return max(0, int(self.expires_at - time.monotonic()))
+
+class MaterializedBriefingStore:
+    """
+    A bounded, thread-safe store of precomputed briefings keyed by (user_id, city).
+
+    Entries are added on a cache miss and served until they expire. A background
+    scheduler regenerates entries that are about to expire, as long as they have
+    been read recently, so active users keep getting fresh briefings without
+    paying for the generation themselves. Users that stop polling are evicted.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        refresh_ahead_seconds: float = 60,
+        idle_seconds: float = 900,
+        max_entries: int = 1000,
+        check_interval_seconds: float = 5,
+        shared: Optional[SharedCache] = None,
+    ):
+        """
+        Initializes an empty store.
+
+        Args:
+            ttl_seconds: How long a briefing may be served after it was generated.
+            refresh_ahead_seconds: How long before expiry the scheduler regenerates an entry.
+            idle_seconds: Entries not read for this long are evicted instead of refreshed.
+            max_entries: Maximum number of entries; the least recently read one is evicted first.
+            check_interval_seconds: How often the background scheduler looks for due entries.
+            shared: A SharedCache through which the worker processes of a host
+                share their briefings and agree on which one refreshes an entry.
+        """
+        if refresh_ahead_seconds >= ttl_seconds:
+            raise ValueError("refresh_ahead_seconds must be smaller than ttl_seconds.")
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer.")
+        self.ttl_seconds = ttl_seconds
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.idle_seconds = idle_seconds
+        self.max_entries = max_entries
+        self.check_interval_seconds = check_interval_seconds
+        self.shared = shared
+
+        # OrderedDict keeps the entries in least-recently-read order, so both
+        # lookups and LRU eviction are O(1).
+        self._entries: "OrderedDict[BriefingKey, MaterializedBriefing]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, user_id: int, city: str) -> Optional[MaterializedBriefing]:
+        """
+        Returns the materialized briefing for a user and city.
+
+        Args:
+            user_id: The ID of the user.
+            city: The city of the briefing.
+
+        Returns:
+            The MaterializedBriefing if a fresh one exists, otherwise None.
+        """
+        key = (user_id, city)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                entry.last_accessed = now
+                self._entries.move_to_end(key)
+        if entry is None and self.shared is not None:
+            entry = self._adopt(key, min_remaining=0)
+        record_cache_lookup("materialized_briefings", hit=entry is not None)
+        return entry
+
+    def put(self, user_id: int, city: str, briefing: BriefingResponse) -> MaterializedBriefing:
+        """
+        Stores a freshly generated briefing, evicting the least recently read
+        entry if the store is full.
+
+        Args:
+            user_id: The ID of the user.
+            city: The city of the briefing.
+            briefing: The generated briefing.
+
+        Returns:
+            The stored MaterializedBriefing.
+        """
+        key = (user_id, city)
+        # Serializing and hashing happen outside of the lock.
+        etag = briefing_etag(briefing)
+        body = briefing.model_dump_json().encode()
+        if self.shared is not None:
+            self.shared.set(
+                _shared_key(key),
+                {"body": body.decode(), "etag": etag, "expires_at": time.time() + self.ttl_seconds},
+                ttl_seconds=self.ttl_seconds,
+            )
+        return self._install(key, briefing, etag, body, self.ttl_seconds)
+
+    def _install(
+        self, key: BriefingKey, briefing: BriefingResponse, etag: str, body: bytes, ttl_seconds: float
+    ) -> MaterializedBriefing:
+        """Stores an entry in this process, evicting the least recently read one if the store is full."""
+        now = time.monotonic()
+        with self._lock:
+            previous = self._entries.get(key)
+            entry = MaterializedBriefing(
+                briefing=briefing,
+                expires_at=now + ttl_seconds,
+                # A background refresh must not count as a read, otherwise
+                # idle users would be kept alive forever.
+                last_accessed=previous.last_accessed if previous else now,
+                etag=etag,
+                body=body,
+            )
+            self._entries[key] = entry
+            if previous is None:
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def _adopt(self, key: BriefingKey, min_remaining: float) -> Optional[MaterializedBriefing]:
+        """
+        Takes the briefing of a key stored in the shared cache by any worker,
+        if it stays fresh for more than `min_remaining` seconds and expires
+        later than the entry of this process.
+
+        Returns:
+            The adopted MaterializedBriefing, or None.
+        """
+        data = self.shared.get(_shared_key(key))
+        remaining = data["expires_at"] - time.time() if data is not None else 0
+        if remaining <= min_remaining:
+            return None
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.expires_at - time.monotonic() >= remaining:
+                return None
+        body = data["body"].encode()
+        return self._install(key, BriefingResponse.model_validate_json(body), data["etag"], body, remaining)
+
+    def _claim_refresh(self, key: BriefingKey) -> bool:
+        """Returns whether this process should refresh an entry, as no other worker does."""
+        user_id, city = key
+        # The lease runs out before the entry expires, so another worker can
+        # take over if the refreshing one fails.
+        return self.shared.add(
+            f"briefing-refresh:{user_id}:{city}", True, ttl_seconds=self.refresh_ahead_seconds / 2
+        )
+
+    def invalidate(self, user_id: int, city: str) -> None:
+        """Removes the entry for a user and city, if present, also from the shared cache."""
+        with self._lock:
+            self._entries.pop((user_id, city), None)
+        if self.shared is not None:
+            self.shared.delete(_shared_key((user_id, city)))
+
+    def clear(self) -> None:
+        """Removes all entries of this process."""
+        with self._lock:
+            self._entries.clear()
+
+    def refresh_due(self, generate: BriefingGenerator) -> int:
+        """
+        Regenerates all entries that are close to expiry and evicts idle ones.
+
+        Args:
+            generate: A callable producing a new briefing for (user_id, city).
+
+        Returns:
+            The number of entries that were refreshed.
+        """
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry.last_accessed >= self.idle_seconds:
+                    del self._entries[key]
+                elif entry.expires_at - now <= self.refresh_ahead_seconds:
+                    due.append(key)
+
+        refreshed = 0
+        # Generation does network I/O, so it must run outside of the lock.
+        for user_id, city in due:
+            if self.shared is not None:
+                # Another worker refreshed it already, or is refreshing it.
+                if self._adopt((user_id, city), min_remaining=self.refresh_ahead_seconds) is not None:
+                    refreshed += 1
+                    continue
+                if not self._claim_refresh((user_id, city)):
+                    continue
+            try:
+                briefing = generate(user_id, city)
+            except ValueError as e:
+                # The user no longer exists, so there is nothing left to serve.
+                logging.warning(f"Dropping materialized briefing for user {user_id} in {city}: {e}")
+                self.invalidate(user_id, city)
+                continue
+            except Exception as e:
+                # Keep serving the current entry until it expires.
+                logging.error(f"Could not refresh briefing for user {user_id} in {city}: {e}")
+                continue
+            with self._lock:
+                still_tracked = (user_id, city) in self._entries
+            if still_tracked:
+                self.put(user_id, city, briefing)
+                refreshed += 1
+        if due:
+            logging.info(f"Refreshed {refreshed} of {len(due)} materialized briefings.")
+        return refreshed
+
+    def start(self, generate: BriefingGenerator) -> None:
+        """
+        Starts the background scheduler that keeps the entries fresh.
+
+        Args:
+            generate: A callable producing a new briefing for (user_id, city).
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run() -> None:
+            while not self._stop_event.wait(self.check_interval_seconds):
+                try:
+                    self.refresh_due(generate)
+                except Exception as e:
+                    logging.error(f"Briefing refresh scheduler failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="briefing-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background scheduler and waits for it to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+def _shared_key(key: BriefingKey) -> str:
+    user_id, city = key
+    return f"briefing:{user_id}:{city}"
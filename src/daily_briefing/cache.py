@@ -0,0 +1,416 @@
+"""
+A small in-memory cache with per-entry expiry and tag-based invalidation.
+
+Entries can be tagged with the inputs they were built from (e.g. a user ID or
+a city), so that all entries depending on an input can be invalidated at once
+when that input changes.
+
+TTLCache lives in the memory of a single process. When the API runs several
+worker processes, SharedCache keeps entries in a SQLite file instead, so all
+workers of a host share them, and CachedCalls caches the results of client
+methods (e.g. the user and weather lookups) in either.
+"""
+import base64
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple, TypeVar
+
+from .metrics import record_cache_lookup
+
+T = TypeVar("T")
+
+class TTLCache:
+    """
+    A bounded, thread-safe cache whose entries expire after a time-to-live.
+
+    When the cache is full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 1024, name: Optional[str] = None):
+        """
+        Initializes an empty cache.
+
+        Args:
+            ttl_seconds: Default lifetime of an entry in seconds.
+            max_entries: Maximum number of entries kept in memory.
+            name: If given, hits and misses are counted in the cache_lookups_total
+                metric under this name.
+        """
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive.")
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive integer.")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.name = name
+        # key -> (expires_at, value, tags)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[Hashable, ...]]]" = OrderedDict()
+        # tag -> keys of the entries carrying that tag
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value for a key.
+
+        Args:
+            key: The cache key.
+            default: The value returned on a miss.
+
+        Returns:
+            The cached value, or `default` if the key is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if self.name is not None:
+            record_cache_lookup(self.name, hit=entry is not None)
+        return entry[1] if entry is not None else default
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl_seconds: Optional[float] = None,
+        tags: Iterable[Hashable] = (),
+    ) -> None:
+        """
+        Stores a value, replacing any previous entry for the key.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl_seconds: Lifetime of this entry; defaults to the cache's TTL.
+            tags: Inputs the value depends on, used by `invalidate_tag`.
+        """
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: Hashable) -> None:
+        """Removes the entry for a key, if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """
+        Removes all entries carrying a tag.
+
+        Args:
+            tag: The tag whose entries should be removed.
+
+        Returns:
+            The number of removed entries.
+        """
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        """Removes an entry and its tag references. The caller must hold the lock."""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class SharedCache:
+    """
+    A cache shared by the processes of a host, kept in a SQLite file.
+
+    SQLite in WAL mode lets any number of processes read concurrently while
+    one writes, and the file is in the page cache, so a lookup costs far less
+    than an upstream call. Values are stored as JSON: besides the JSON types,
+    bytes and the dataclasses passed as `types` can be stored, and nothing
+    else is ever instantiated from the file. The file is created readable and
+    writable by its owner only, and a file other users can access is refused.
+    Errors of the cache are logged and treated as misses; they never fail the
+    caller.
+    """
+
+    # Expired entries are purged every this many writes.
+    PURGE_EVERY = 256
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 60,
+        timeout: float = 1.0,
+        name: Optional[str] = None,
+        types: Iterable[type] = (),
+    ):
+        """
+        Initializes the cache. The file is created on first use.
+
+        Args:
+            path: The path of the SQLite file. Its directory must exist.
+            ttl_seconds: Default lifetime of an entry in seconds.
+            timeout: How long to wait for a lock held by another process, in seconds.
+            name: If given, hits and misses are counted in the cache_lookups_total
+                metric under this name.
+            types: The dataclasses whose instances may be stored, e.g. WeatherInfo.
+                They are stored as their fields and rebuilt with their constructor.
+        """
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive.")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.name = name
+        self._types = {cls.__name__: cls for cls in types}
+        self._local = threading.local()
+        self._writes = 0
+
+    def __len__(self) -> int:
+        """The number of unexpired entries, of all processes."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns the calling thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        # A forked worker must not reuse the connection of its parent.
+        if connection is None or self._local.pid != os.getpid():
+            self._create_file()
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT)"
+            )
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _create_file(self) -> None:
+        """
+        Creates the file accessible to its owner only, unless it exists, and
+        checks that no other user can access it. SQLite gives its -wal and
+        -shm files the permissions of the database file.
+
+        Raises:
+            PermissionError: If the file belongs to another user, or other
+                users may access it.
+        """
+        descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+        try:
+            info = os.fstat(descriptor)
+        finally:
+            os.close(descriptor)
+        if hasattr(os, "geteuid") and (info.st_uid != os.geteuid() or info.st_mode & 0o077):
+            raise PermissionError(f"{self.path} must be owned by this user and not accessible to others.")
+
+    def _encode(self, value: Any) -> str:
+        def default(value: Any) -> Any:
+            if isinstance(value, bytes):
+                return {"__bytes__": base64.b64encode(value).decode("ascii")}
+            if dataclasses.is_dataclass(value) and self._types.get(type(value).__name__) is type(value):
+                fields = {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+                return {"__dataclass__": type(value).__name__, "fields": fields}
+            raise TypeError(f"{type(value).__name__} values can't be stored in the shared cache.")
+        return json.dumps(value, default=default, separators=(",", ":"))
+
+    def _decode(self, text: str) -> Any:
+        def object_hook(data: Dict[str, Any]) -> Any:
+            if "__bytes__" in data:
+                return base64.b64decode(data["__bytes__"])
+            if "__dataclass__" in data:
+                cls = self._types.get(data["__dataclass__"])
+                if cls is None:
+                    raise ValueError(f"Unexpected type {data['__dataclass__']!r} in the shared cache.")
+                return cls(**data["fields"])
+            return data
+        return json.loads(text, object_hook=object_hook)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Returns the cached value for a key.
+
+        Args:
+            key: The cache key.
+            default: The value returned on a miss.
+
+        Returns:
+            The cached value, or `default` if the key is missing or expired.
+        """
+        try:
+            # Wall-clock time, so that all processes agree on the expiry.
+            row = self._connection().execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            value = self._decode(row[0]) if row is not None else None
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logging.warning(f"Shared cache lookup of {key!r} failed: {e}")
+            row = None
+        if self.name is not None:
+            record_cache_lookup(self.name, hit=row is not None)
+        return value if row is not None else default
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Stores a value, replacing any previous entry for the key.
+
+        Args:
+            key: The cache key.
+            value: The value to store: JSON types, bytes or instances of `types`.
+            ttl_seconds: Lifetime of this entry; defaults to the cache's TTL.
+        """
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds), self._encode(value)),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                connection.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logging.warning(f"Shared cache update of {key!r} failed: {e}")
+
+    def add(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """
+        Stores a value unless the key has an unexpired entry, atomically for
+        all processes, e.g. to let only one of them take on a task.
+
+        Args:
+            key: The cache key.
+            value: The value to store: JSON types, bytes or instances of `types`.
+            ttl_seconds: Lifetime of this entry; defaults to the cache's TTL.
+
+        Returns:
+            Whether the value was stored. False also if the cache failed.
+        """
+        now = time.time()
+        try:
+            cursor = self._connection().execute(
+                "INSERT INTO cache_entries (key, expires_at, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at, value = excluded.value "
+                "WHERE cache_entries.expires_at <= ?",
+                (key, now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds), self._encode(value), now),
+            )
+            return cursor.rowcount == 1
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logging.warning(f"Shared cache add of {key!r} failed: {e}")
+            return False
+
+    def update(self, key: str, update: Callable[[Any], Tuple[Any, T]], ttl_seconds: Optional[float] = None) -> T:
+        """
+        Replaces the value of a key with one computed from the current value,
+        atomically for all processes, e.g. to increment a counter.
+
+        Args:
+            key: The cache key.
+            update: Receives the current value, or None if there is none, and
+                returns the new value and a result to return.
+            ttl_seconds: Lifetime of the new entry; defaults to the cache's TTL.
+
+        Returns:
+            The result of `update`. If the cache fails, `update` is applied to
+            None and its result returned without storing anything.
+        """
+        now = time.time()
+        try:
+            connection = self._connection()
+            # Takes the write lock up front, so no other process can change
+            # the value between reading and writing it.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                value, result = update(self._decode(row[0]) if row is not None else None)
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, expires_at, value) VALUES (?, ?, ?)",
+                    (key, now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds), self._encode(value)),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return result
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logging.warning(f"Shared cache update of {key!r} failed: {e}")
+            return update(None)[1]
+
+    def delete(self, key: str) -> None:
+        """Removes the entry for a key, if present."""
+        try:
+            self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        except (sqlite3.Error, OSError) as e:
+            logging.warning(f"Shared cache delete of {key!r} failed: {e}")
+
+    def clear(self) -> None:
+        """Removes all entries, for all processes."""
+        self._connection().execute("DELETE FROM cache_entries")
+
+class CachedCalls:
+    """
+    Wraps a client so that the results of some of its methods are cached.
+
+    Results are keyed by the method name and arguments. None, which the
+    clients return when a lookup failed, is not cached. All other attributes
+    are passed through to the client.
+    """
+
+    def __init__(self, client: Any, cache: Any, ttl_seconds: Dict[str, float]):
+        """
+        Initializes the wrapper.
+
+        Args:
+            client: The wrapped client, e.g. a JSONPlaceholderClient.
+            cache: A TTLCache or SharedCache.
+            ttl_seconds: The cached methods and how long their results are
+                reused, e.g. {"get_user": 300}.
+        """
+        self._client = client
+        self._cache = cache
+        self._ttl_seconds = dict(ttl_seconds)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        ttl = self._ttl_seconds.get(name)
+        if ttl is None:
+            return attribute
+
+        def cached_call(*args, **kwargs):
+            key = f"{type(self._client).__name__}.{name}:{args!r}:{sorted(kwargs.items())!r}"
+            result = self._cache.get(key)
+            if result is None:
+                result = attribute(*args, **kwargs)
+                if result is not None:
+                    self._cache.set(key, result, ttl_seconds=ttl)
+            return result
+        return cached_call
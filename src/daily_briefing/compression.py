@@ -0,0 +1,232 @@
+"""
+Response compression for the web API.
+
+CompressionMiddleware negotiates the content encoding from the request's
+`Accept-Encoding` header and compresses responses above a size threshold with
+brotli or gzip. Brotli support is optional: it is used only if the `brotli`
+package is installed, otherwise clients get gzip. Streaming responses are
+compressed chunk by chunk, and already compressed or event-stream content is
+passed through unchanged.
+
+The responder is implemented here rather than on top of Starlette's
+GZipMiddleware, whose responder classes are internal and change between
+releases.
+"""
+import zlib
+from typing import Callable, Dict, Optional
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is an optional dependency
+    brotli = None
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Parses an Accept-Encoding header into a mapping of coding to q-value.
+
+    Args:
+        header: The header value, e.g. "br;q=1.0, gzip;q=0.8, *;q=0.1".
+
+    Returns:
+        The q-value of every listed coding, in lower case. Malformed q-values
+        count as 0, i.e. not acceptable.
+    """
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding] = q
+    return codings
+
+def choose_encoding(header: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    """
+    Picks the content encoding for a response.
+
+    Args:
+        header: The request's Accept-Encoding header.
+        brotli_available: Whether brotli compression can be used.
+
+    Returns:
+        "br", "gzip" or None for an uncompressed response. Brotli is preferred
+        over gzip when the client accepts both equally.
+    """
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+    supported = ["br", "gzip"] if brotli_available else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = codings.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+# Media types that are passed through uncompressed: already compressed
+# formats, and event streams, whose events must reach the client at once.
+EXCLUDED_CONTENT_TYPES = frozenset({
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/grpc",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/avif",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "text/event-stream",
+    "video/*",
+})
+
+# Chunks from this size on are compressed in a worker thread, so that they
+# don't block the event loop.
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+# Compresses a chunk of the body; the second argument tells whether more
+# chunks follow, and the stream is finished after the last one.
+Compress = Callable[[bytes, bool], bytes]
+
+def gzip_compressor(level: int) -> Compress:
+    """Returns a gzip Compress function for one response body."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(body: bytes, more_body: bool) -> bytes:
+        # Flush every chunk, so a streamed response reaches the client as it
+        # is produced instead of when the compressor's buffer fills.
+        return compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+    return compress
+
+def brotli_compressor(quality: int) -> Compress:
+    """Returns a brotli Compress function for one response body."""
+    compressor = brotli.Compressor(quality=quality)
+
+    def compress(body: bytes, more_body: bool) -> bytes:
+        return compressor.process(body) + (compressor.flush() if more_body else compressor.finish())
+    return compress
+
+def _is_excluded(headers: Headers) -> bool:
+    """Whether a response must be passed through uncompressed."""
+    media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+    return (
+        "content-encoding" in headers
+        or media_type in EXCLUDED_CONTENT_TYPES
+        or media_type.partition("/")[0] + "/*" in EXCLUDED_CONTENT_TYPES
+    )
+
+class CompressionResponder:
+    """Sends the response of one request, compressed if it is large enough."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int, encoding: Optional[str], compress: Optional[Compress]):
+        """
+        Initializes the responder.
+
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size: Responses smaller than this many bytes are sent uncompressed.
+            encoding: The Content-Encoding of compressed responses, or None
+                to send the response uncompressed.
+            compress: Compresses the body; None if `encoding` is None.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.compress = compress
+        self.send: Optional[Send] = None
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressing = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self.compress, body, more_body)
+        return self.compress(body, more_body)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            excluded = _is_excluded(headers)
+            self.passthrough = excluded or self.compress is None or message["status"] == 206
+            if not excluded:
+                # Caches must not serve a compressed response to clients
+                # that don't accept its encoding, or the other way around.
+                headers.add_vary_header("Accept-Encoding")
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # Held back until the first body chunk decides the headers.
+                self.start = message
+        elif self.passthrough or message_type != "http.response.body":
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+        elif self.start is not None:
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=self.start["headers"])
+            if len(body) >= self.minimum_size or more_body:
+                self.compressing = True
+                message["body"] = await self._compress(body, more_body)
+                headers["Content-Encoding"] = self.encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.start)
+            self.start = None
+            await self.send(message)
+        else:
+            if self.compressing:
+                message["body"] = await self._compress(message.get("body", b""), message.get("more_body", False))
+            await self.send(message)
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with brotli or gzip."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, gzip_level: int = 6, brotli_quality: int = 4):
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            minimum_size: Responses smaller than this many bytes are sent uncompressed.
+            gzip_level: The gzip compression level (1-9).
+            brotli_quality: The brotli quality (0-11).
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding == "br":
+            compress = brotli_compressor(self.brotli_quality)
+        elif encoding == "gzip":
+            compress = gzip_compressor(self.gzip_level)
+        else:
+            compress = None
+        await CompressionResponder(self.app, self.minimum_size, encoding, compress)(scope, receive, send)
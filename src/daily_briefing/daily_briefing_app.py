@@ -5,11 +5,64 @@ This module orchestrates the different clients (API, weather) to fetch
 and assemble the data required for a user's briefing.
 """
 import concurrent.futures
-from typing import Optional
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from .api_interactions import JSONPlaceholderClient
-from .models import BriefingResponse, WeatherInfo
-from .weather_client import OpenWeatherClient
+from . import tracing
+from .cache import TTLCache
+from .models import BriefingDelta, BriefingResponse
+from .rendering import BriefingRenderer
+from .sections import (
+    DEFAULT_DATA_SOURCES,
+    DEFAULT_SECTIONS,
+    BriefingContext,
+    BriefingSection,
+    DataSource,
+    format_weather_summary,
+)
+
+if TYPE_CHECKING:
+    from .api_interactions import JSONPlaceholderClient
+    from .weather_client import OpenWeatherClient
+
+PLAIN_RENDERER = BriefingRenderer("plain")
+
+class _SharedWeatherLookups:
+    """
+    Wraps a weather client so that each city's weather is fetched only once,
+    however many briefings of a batch ask for it, even concurrently.
+    """
+
+    def __init__(self, weather_client: "OpenWeatherClient"):
+        self._weather_client = weather_client
+        self._lock = threading.Lock()
+        self._lookups: Dict[str, concurrent.futures.Future] = {}
+
+    def get_weather(self, city: str):
+        with self._lock:
+            lookup = self._lookups.get(city)
+            owner = lookup is None
+            if owner:
+                lookup = self._lookups[city] = concurrent.futures.Future()
+        if owner:
+            # The first caller fetches; the others wait for its result.
+            try:
+                lookup.set_result(self._weather_client.get_weather(city))
+            except Exception as e:
+                lookup.set_exception(e)
+        return lookup.result()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._weather_client, name)
+
+@dataclass
+class BriefingWatermark:
+    """What a user has already been shown, used by the delta mode."""
+    last_post_id: int = 0
+    # The `dt` of the last weather observation returned, per city.
+    weather_observed_at: Dict[str, int] = field(default_factory=dict)
 
 class DailyBriefing:
     """
@@ -17,22 +70,99 @@ class DailyBriefing:
     a user's daily briefing.
     """
 
-    def __init__(self, api_client: JSONPlaceholderClient, weather_client: OpenWeatherClient):
+    def __init__(
+        self,
+        api_client: "JSONPlaceholderClient",
+        weather_client: "OpenWeatherClient",
+        response_cache_ttl: float = 60,
+        response_cache_size: int = 1024,
+        sections: Optional[Sequence[BriefingSection]] = None,
+        data_sources: Optional[Sequence[DataSource]] = None,
+        watermarks: Optional[TTLCache] = None,
+        dependents_ttl: float = 300,
+    ):
         """
         Initializes the application with its dependencies (the clients).
         This Dependency Injection makes the class easy to test.
+
+        Args:
+            api_client: The JSONPlaceholder client.
+            weather_client: The OpenWeatherMap client.
+            response_cache_ttl: How long an assembled briefing is reused, in seconds.
+            response_cache_size: Maximum number of cached briefings.
+            sections: The sections of the briefing. Defaults to the user name,
+                weather summary and latest post title.
+            data_sources: Additional data sources the sections can require,
+                on top of the built-in ones.
+            watermarks: Where the delta mode remembers what each user has
+                already been shown. Pass a shared cache to keep the watermarks
+                across DailyBriefing instances.
+            dependents_ttl: How long the invalidation listeners are notified
+                about a briefing after it was built; at least as long as
+                the listeners keep briefings, e.g. a store's TTL.
+
+        Raises:
+            ValueError: If section names are not unique, or the sections
+                require unknown or circularly dependent data sources.
         """
         self.api_client = api_client
         self.weather_client = weather_client
+        self.sections = list(sections) if sections is not None else list(DEFAULT_SECTIONS)
+        names = [section.name for section in self.sections]
+        if len(set(names)) != len(names):
+            raise ValueError("Section names must be unique.")
+        if set(names) & {"city", "sections", "generated_at"}:
+            raise ValueError("Section names must not shadow the city, sections or generated_at fields.")
+        # Critical sections go first, so a missing user fails the briefing
+        # without waiting for the other fetches.
+        self.sections.sort(key=lambda section: not section.critical)
+        self.data_sources: Dict[str, DataSource] = dict(DEFAULT_DATA_SOURCES)
+        for source in data_sources or ():
+            self.data_sources[source.name] = source
+        self._source_order = self._resolve_source_order()
+        # Assembled briefings per (user_id, city), tagged with the inputs they
+        # were built from so that a change to one input evicts its dependents.
+        self._response_cache = TTLCache(
+            ttl_seconds=response_cache_ttl, max_entries=response_cache_size, name="briefing_responses"
+        )
+        # Fingerprints of the last seen value of each input, used to detect
+        # when a fetch returned something new. They live as long as the
+        # briefings built from them.
+        self._input_fingerprints = TTLCache(ttl_seconds=response_cache_ttl, max_entries=3 * response_cache_size)
+        # Per-user BriefingWatermark for the delta mode. Forgetting one is
+        # harmless: the next delta is simply a full one again.
+        self._watermarks = watermarks if watermarks is not None else TTLCache(ttl_seconds=24 * 60 * 60, max_entries=10000)
+        self._watermark_lock = threading.Lock()
+        # The (user_id, city) keys of the briefings built from each input, for
+        # the invalidation listeners. Only kept once a listener is registered.
+        self._dependents = TTLCache(ttl_seconds=dependents_ttl, max_entries=3 * response_cache_size)
+        self._dependents_lock = threading.Lock()
+        self._invalidation_listeners: List[Callable[[int, str], None]] = []
+
+    def add_invalidation_listener(self, listener: Callable[[int, str], None]) -> None:
+        """
+        Registers a callable notified with the user ID and city of every
+        briefing made stale by a write or a changed input, e.g. to evict it
+        from a store of briefings in front of this class.
+
+        Args:
+            listener: Called with (user_id, city); must not raise.
+        """
+        self._invalidation_listeners.append(listener)
 
-    def generate_briefing_for_api(self, user_id: int, city: str) -> BriefingResponse:
+    def generate_briefing_for_api(self, user_id: int, city: str, use_cache: bool = True) -> BriefingResponse:
         """
         Generates a daily briefing as a structured Pydantic object for the API.
         Fetches data concurrently and assembles it into a BriefingResponse model.
 
+        A briefing assembled within the cache TTL is returned as is, skipping
+        both the upstream calls and the model construction.
+
         Args:
             user_id: The ID of the user.
             city: The city for the weather forecast.
+            use_cache: Whether a cached briefing may be returned. When False the
+                briefing is always rebuilt, and the cache is updated with it.
 
         Returns:
             A BriefingResponse object.
@@ -40,40 +170,173 @@ class DailyBriefing:
         Raises:
             ValueError: If the user with the given ID is not found.
         """
-        # Using a ThreadPoolExecutor to run I/O-bound tasks (API calls) in parallel.
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            user_future = executor.submit(self.api_client.get_user, user_id)
-            weather_future = executor.submit(self.weather_client.get_weather, city)
-            posts_future = executor.submit(self.api_client.get_posts_by_user, user_id)
+        context = BriefingContext(
+            api_client=self.api_client,
+            weather_client=self.weather_client,
+            user_id=user_id,
+            city=city,
+        )
+        return self._build_briefing(context, use_cache)
 
-            # Wait for the most critical data first.
-            user_info = user_future.result()
-            if not user_info:
-                raise ValueError(f"User with ID {user_id} not found.")
+    def generate_briefings(
+        self,
+        requests: Sequence[Tuple[int, str]],
+        max_workers: int = 8,
+    ) -> Iterator[Tuple[int, Optional[BriefingResponse], Optional[Exception]]]:
+        """
+        Generates briefings for many (user_id, city) pairs concurrently.
+
+        The briefings share their weather lookups: the weather of each city is
+        fetched once for the whole batch, however many users ask for it.
+
+        Args:
+            requests: The (user_id, city) pairs.
+            max_workers: The maximum number of briefings generated at once.
+
+        Yields:
+            A tuple of the request's index, the briefing and None, or the index,
+            None and the error, for each request as soon as it completes.
+        """
+        weather_client = _SharedWeatherLookups(self.weather_client)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(requests))))
+        try:
+            futures = {
+                executor.submit(
+                    tracing.bind_context(self._build_briefing),
+                    BriefingContext(
+                        api_client=self.api_client,
+                        weather_client=weather_client,
+                        user_id=user_id,
+                        city=city,
+                    ),
+                ): index
+                for index, (user_id, city) in enumerate(requests)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+        finally:
+            # If the consumer stops early, the pending briefings are not needed.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _build_briefing(self, context: BriefingContext, use_cache: bool = True) -> BriefingResponse:
+        """Assembles the briefing of a context, or returns the cached one, in a trace span."""
+        with tracing.start_span("generate_briefing", user_id=context.user_id, city=context.city):
+            return self._assemble_briefing(context, use_cache)
+
+    def _assemble_briefing(self, context: BriefingContext, use_cache: bool) -> BriefingResponse:
+        """Assembles the briefing of a context, or returns the cached one."""
+        user_id, city = context.user_id, context.city
+        cache_key = (user_id, city)
+        if use_cache:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                span = tracing.current_span()
+                if span is not None:
+                    span.set_attribute("cache_hit", True)
+                return cached
+
+        rendered, data = self._run_sections(context)
+
+        # Any input that changed since it was last seen makes the briefings
+        # built from its previous value stale, including other cities' ones.
+        tags = [self._source_tag(name, context) for name in self._source_order]
+        for name, tag in zip(self._source_order, tags):
+            self._record_input(tag, data.get(name), building=cache_key)
+
+        core_fields = {name: value for name, value in rendered.items() if name in BriefingResponse.model_fields}
+        extra_sections = {name: value for name, value in rendered.items() if name not in core_fields}
+        briefing = BriefingResponse(
+            city=city,
+            sections=extra_sections or None,
+            **core_fields,
+        )
+        self._response_cache.set(cache_key, briefing, tags=tags)
+        if self._invalidation_listeners:
+            with self._dependents_lock:
+                for tag in tags:
+                    self._dependents.set(tag, (self._dependents.get(tag) or frozenset()) | {cache_key})
+        return briefing
+
+    @tracing.traced("generate_briefing_delta")
+    def generate_briefing_delta(self, user_id: int, city: str) -> BriefingDelta:
+        """
+        Generates only what changed since the user's previous delta briefing.
+
+        The first call for a user returns everything and records a watermark:
+        the highest post ID and the weather observation time that were
+        returned. Subsequent calls only fetch posts above that ID, skip the user
+        lookup, and include the weather only if there is a newer observation.
+
+        Args:
+            user_id: The ID of the user.
+            city: The city for the weather forecast.
+
+        Returns:
+            A BriefingDelta object.
+
+        Raises:
+            ValueError: If the user with the given ID is not found.
+        """
+        watermark_key = f"watermark:{user_id}"
+        watermark: Optional[BriefingWatermark] = self._watermarks.get(watermark_key)
+        since_id = watermark.last_post_id if watermark else None
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+        try:
+            # A known watermark means the user existed a moment ago, so the
+            # user lookup is only needed for the initial briefing.
+            user_future = (
+                executor.submit(tracing.bind_context(self.api_client.get_user), user_id) if watermark is None else None
+            )
+            posts_future = executor.submit(tracing.bind_context(self.api_client.get_posts_by_user), user_id, since_id)
+            weather_future = executor.submit(tracing.bind_context(self.weather_client.get_weather), city)
 
-            # Get results from the other futures, handling potential failures gracefully.
+            if user_future is not None and not user_future.result():
+                raise ValueError(f"User with ID {user_id} not found.")
+            try:
+                new_posts = posts_future.result() or []
+            except Exception as e:
+                print(f"Post data could not be retrieved: {e}")
+                new_posts = []
             try:
                 weather_info = weather_future.result()
             except Exception as e:
                 print(f"Weather data could not be retrieved: {e}")
                 weather_info = None
-        
-            try:        
-                user_posts = posts_future.result()
-            except Exception as e:
-                print(f"Post data could not be retrieved: {e}")
-                user_posts = None
+        finally:
+            executor.shutdown(wait=False)
+
+        with self._watermark_lock:
+            # Re-read under the lock, so concurrent deltas never move it backwards.
+            current = self._watermarks.get(watermark_key) or BriefingWatermark()
+            if since_id is not None:
+                new_posts = [post for post in new_posts if post['id'] > since_id]
+            last_post_id = max([current.last_post_id] + [post['id'] for post in new_posts])
 
-        weather_summary = self._format_weather_summary(weather_info)
-        latest_post_title = user_posts[0]['title'] if user_posts else "No new posts."
+            last_observed_at = current.weather_observed_at.get(city)
+            weather_changed = weather_info is not None and (
+                weather_info.observed_at is None
+                or last_observed_at is None
+                or weather_info.observed_at > last_observed_at
+            )
+            weather_observed_at = dict(current.weather_observed_at)
+            if weather_changed and weather_info.observed_at is not None:
+                weather_observed_at[city] = weather_info.observed_at
+            self._watermarks.set(watermark_key, BriefingWatermark(last_post_id, weather_observed_at))
 
-        return BriefingResponse(
-            user_name=user_info.get('name', 'N/A'),
+        return BriefingDelta(
+            user_id=user_id,
             city=city,
-            weather_summary=weather_summary,
-            latest_post_title=latest_post_title,            
+            is_initial=watermark is None,
+            new_post_titles=[post['title'] for post in new_posts],
+            last_post_id=last_post_id or None,
+            weather_summary=format_weather_summary(weather_info) if weather_changed else None,
+            weather_observed_at=weather_info.observed_at if weather_changed else None,
         )
-    
+
     def generate_briefing(self, user_id: int, city: str) -> Optional[str]:
         """
         Generates a daily briefing string suitable for CLI output.
@@ -91,21 +354,209 @@ class DailyBriefing:
         """
         try:
             response_data = self.generate_briefing_for_api(user_id, city)
-            string = (
-                f"Good morning, {response_data.user_name}! "
-                f"{response_data.weather_summary} "
-                f"Your latest post is titled: '{response_data.latest_post_title}'."
-            )
-            return string
+            return PLAIN_RENDERER.render(response_data)
         except ValueError as e:
             return str(e)
-        
-    def _format_weather_summary(self, weather_info: Optional[WeatherInfo]) -> Optional[str]:
-        """Helper method to create a human-readable weather summary string."""
-        if not weather_info:
-            return "Weather data not available."
-        return (
-            f"The current weather in {weather_info.city} is "
-            f"{weather_info.description}. It's {weather_info.temperature}°C, "
-            f"but feels like {weather_info.feels_like}°C."
-        )
\ No newline at end of file
+
+    def iter_briefings(
+        self,
+        requests: Iterable[Tuple[int, str]],
+        on_error: Optional[Callable[[int, str, Exception], None]] = None,
+    ) -> Iterator[BriefingResponse]:
+        """
+        Lazily generates briefings for many (user_id, city) pairs.
+
+        Each briefing is generated only when the consumer asks for the next
+        one, so it can be written out before the following one is built.
+
+        Args:
+            requests: The (user_id, city) pairs.
+            on_error: Called with the user ID, city and error for every briefing
+                that could not be generated (e.g. an unknown user). Such
+                briefings are skipped.
+
+        Yields:
+            A BriefingResponse per successfully generated briefing.
+        """
+        for user_id, city in requests:
+            try:
+                briefing = self.generate_briefing_for_api(user_id, city)
+            except ValueError as e:
+                if on_error is not None:
+                    on_error(user_id, city, e)
+                continue
+            yield briefing
+
+    def create_post(self, title: str, body: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Creates a post for a user and invalidates the briefings showing their posts.
+
+        Args:
+            title: The title of the post.
+            body: The content of the post.
+            user_id: The ID of the user creating the post.
+
+        Returns:
+            A dictionary of the created post if successful, otherwise None.
+        """
+        post = self.api_client.create_post(title=title, body=body, user_id=user_id)
+        if post:
+            self.invalidate_posts(user_id)
+        return post
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drops the cached briefings built from a user's record."""
+        self._invalidate(("user", user_id))
+
+    def invalidate_posts(self, user_id: int) -> None:
+        """Drops the cached briefings built from a user's posts."""
+        self._invalidate(("posts", user_id))
+
+    def invalidate_weather(self, city: str) -> None:
+        """Drops the cached briefings built from a city's weather."""
+        self._invalidate(("weather", city))
+
+    def _invalidate(self, tag: Hashable) -> None:
+        self._response_cache.invalidate_tag(tag)
+        self._input_fingerprints.delete(tag)
+        self._notify_dependents(tag)
+
+    def _record_input(self, tag: Hashable, value: Any, building: Optional[Tuple[int, str]] = None) -> None:
+        """
+        Invalidates the dependents of an input if its value has changed,
+        except the briefing being built from the new value.
+        """
+        if value is None:
+            # A failed or empty fetch says nothing about whether the input changed.
+            return
+        fingerprint = hash(repr(value))
+        previous = self._input_fingerprints.get(tag)
+        if previous is not None and previous != fingerprint:
+            self._response_cache.invalidate_tag(tag)
+            self._notify_dependents(tag, building)
+        self._input_fingerprints.set(tag, fingerprint)
+
+    def _notify_dependents(self, tag: Hashable, building: Optional[Tuple[int, str]] = None) -> None:
+        """Notifies the invalidation listeners of the briefings built from an input."""
+        if not self._invalidation_listeners:
+            return
+        with self._dependents_lock:
+            keys = self._dependents.get(tag) or frozenset()
+            self._dependents.delete(tag)
+        for user_id, city in keys - {building}:
+            for listener in self._invalidation_listeners:
+                listener(user_id, city)
+
+    def _source_tag(self, name: str, context: BriefingContext) -> Hashable:
+        """Returns the cache tag of a data source's value, e.g. ("posts", 1)."""
+        return (name, self.data_sources[name].scope_key(context))
+
+    def _resolve_source_order(self) -> List[str]:
+        """
+        Returns all data sources needed by the sections, each one after the
+        sources it depends on.
+
+        Raises:
+            ValueError: If a source is unknown or the dependencies form a cycle.
+        """
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Data source '{name}' has a circular dependency.")
+            if name not in self.data_sources:
+                raise ValueError(f"Unknown data source '{name}'.")
+            visiting.add(name)
+            for dependency in self.data_sources[name].requires:
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for section in self.sections:
+            for name in section.requires:
+                visit(name)
+        return order
+
+    def _run_sections(self, context: BriefingContext) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Fetches all data sources as a dependency graph and renders the sections.
+
+        Every source is submitted to the thread pool at once. Sources without
+        dependencies start immediately; a dependent source waits in its worker
+        thread for the sources it needs, so independent branches run in
+        parallel and each source is fetched only once, however many sections
+        use it.
+
+        Args:
+            context: The briefing being generated.
+
+        Returns:
+            A tuple of the rendered sections and the fetched data, both keyed by name.
+
+        Raises:
+            ValueError: If a critical section cannot be rendered.
+        """
+        start = time.monotonic()
+        # One worker per source, so that dependent sources blocking on their
+        # dependencies can never starve the sources they are waiting for.
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(self._source_order))
+        try:
+            futures: Dict[str, concurrent.futures.Future] = {}
+            for name in self._source_order:
+                source = self.data_sources[name]
+                func, args = source.bind(context)
+                if source.requires:
+                    dependencies = [futures[dependency] for dependency in source.requires]
+                    futures[name] = executor.submit(tracing.bind_context(self._run_after), dependencies, func, args)
+                else:
+                    futures[name] = executor.submit(tracing.bind_context(func), *args)
+
+            data: Dict[str, Any] = {}
+            failed = set()
+            rendered: Dict[str, Any] = {}
+            for section in self.sections:
+                deadline = start + section.timeout if section.timeout is not None else None
+                section_data = {}
+                unavailable = False
+                for name in section.requires:
+                    if name not in data and name not in failed:
+                        timeout = max(deadline - time.monotonic(), 0) if deadline is not None else None
+                        if section.critical:
+                            # Critical data is waited for without a safety net:
+                            # there is no briefing without it.
+                            data[name] = futures[name].result(timeout=timeout)
+                        else:
+                            try:
+                                data[name] = futures[name].result(timeout=timeout)
+                            except concurrent.futures.TimeoutError:
+                                print(f"{name.capitalize()} data was not retrieved within {section.timeout}s.")
+                                unavailable = True
+                                continue
+                            except Exception as e:
+                                print(f"{name.capitalize()} data could not be retrieved: {e}")
+                                failed.add(name)
+                    unavailable = unavailable or name in failed
+                    section_data[name] = data.get(name)
+                if unavailable:
+                    rendered[section.name] = section.fallback
+                elif section.critical:
+                    rendered[section.name] = section.render(context, section_data)
+                else:
+                    try:
+                        rendered[section.name] = section.render(context, section_data)
+                    except Exception as e:
+                        print(f"Section '{section.name}' could not be rendered: {e}")
+                        rendered[section.name] = section.fallback
+            return rendered, data
+        finally:
+            # Don't wait for fetches that timed out; their results are not used.
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _run_after(dependencies: List[concurrent.futures.Future], func: Callable[..., Any], args: tuple) -> Any:
+        """Waits for the dependencies of a data source, then fetches it."""
+        results = [future.result() for future in dependencies]
+        return func(*args, *results)
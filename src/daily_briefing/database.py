@@ -5,12 +5,26 @@ This module is responsible for:
 1. Establishing the connection to the PostgreSQL database using SQLAlchemy.
 2. Defining the ORM models (e.g., the BriefingLog table).
 3. Providing a session-maker for database interactions.
+
+The engine and the session-maker are created on first use, e.g. the first
+access to `database.engine` or `database.SessionLocal`, rather than at import,
+so that importing the models doesn't load the database driver. Access them as
+attributes of this module (`database.SessionLocal()`); importing them by name
+creates them right away.
 """
 import os
+import threading
+import time
 from datetime import datetime, timezone
+from typing import Any, Optional
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Index
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
+
+from .metrics import DB_POOL_CHECKOUT_WAIT
 
 # --- Database Connection Setup ---
 
@@ -26,8 +40,100 @@ DATABASE_URL = (
     f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autoflush=False, bind=engine)
+# Connection pool settings. Up to DB_POOL_SIZE connections are kept open, and
+# up to DB_MAX_OVERFLOW more are opened under load and closed when returned.
+# A request waits up to DB_POOL_TIMEOUT seconds for a free connection.
+# Connections older than DB_POOL_RECYCLE seconds are replaced, before a
+# firewall or the server drops them, and with DB_POOL_PRE_PING each one is
+# checked when it is taken from the pool, so a dropped connection is replaced
+# instead of failing the request.
+#
+# Every worker process has its own pool. By default, the pools of the
+# WEB_CONCURRENCY workers (set by the `serve` command) share a budget of
+# DB_MAX_CONNECTIONS, which leaves headroom below PostgreSQL's default
+# max_connections of 100 for migrations, consoles and the like.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+_WORKER_COUNT = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+_CONNECTIONS_PER_WORKER = max(2, DB_MAX_CONNECTIONS // _WORKER_COUNT)
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(min(10, _CONNECTIONS_PER_WORKER // 2))))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(min(10, _CONNECTIONS_PER_WORKER - DB_POOL_SIZE))))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+class TimedQueuePool(QueuePool):
+    """
+    A QueuePool recording how long each checkout takes: waiting for a free
+    connection, or opening a new one, and the pre-ping.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            connection = super().connect()
+            outcome = "ok"
+            return connection
+        except PoolTimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, outcome)
+
+def pool_capacity() -> int:
+    """The maximum number of connections of the pool, including the overflow."""
+    return DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
+
+def get_engine(create: bool = True) -> Optional[Engine]:
+    """
+    Returns the application's engine, creating it on first use.
+
+    Args:
+        create: Whether to create the engine if it doesn't exist yet.
+
+    Returns:
+        The engine, or None if it doesn't exist and `create` is False.
+    """
+    global _engine, _session_factory
+    if _engine is None and create:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    DATABASE_URL,
+                    poolclass=TimedQueuePool,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                )
+                _session_factory = sessionmaker(autoflush=False, bind=engine)
+                _engine = engine
+    return _engine
+
+def get_session_factory() -> sessionmaker:
+    """
+    Returns the application's session-maker, creating it on first use.
+
+    A new session takes no connection from the pool: it checks one out when
+    it runs its first statement, and returns it on commit, rollback or close.
+    """
+    get_engine()
+    return _session_factory
+
+def __getattr__(name: str) -> Any:
+    """Provides `engine` and `SessionLocal`, creating them on first access."""
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 Base = declarative_base()
 
 # --- SQLAlchemy Model Definition ---
@@ -38,7 +144,15 @@ class BriefingLog(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
     city = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    # A callable, so the timestamp is taken per row rather than once at import.
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Composite indexes backing the keyset pagination of /logs, which orders
+    # by (created_at, id), with and without a filter on the user.
+    __table_args__ = (
+        Index("ix_briefing_logs_created_at_id", "created_at", "id"),
+        Index("ix_briefing_logs_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
 def create_db_and_tables():
     """
@@ -47,4 +161,4 @@ def create_db_and_tables():
     This function is called once on application startup to ensure the
     database schema is in place.
     """
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=get_engine())
\ No newline at end of file
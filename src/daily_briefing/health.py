@@ -0,0 +1,134 @@
+"""
+Liveness and readiness checks of the web API.
+
+Liveness (/healthz) only says the process is serving requests. Readiness
+(/readyz) says whether it should be sent more: the database must be
+reachable, and none of the resources requests wait for may be saturated,
+i.e. the database connection pool, the worker threads running the
+endpoints, the log writer buffer and the admission lanes. A load balancer
+polling /readyz then routes away from an instance before its latency spikes.
+
+Every check returns a dictionary with a "status" of "ok", "saturated" or
+"failed", plus the figures it is based on.
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from .admission import AdmissionLane
+from .log_writer import BufferedLogWriter
+from .metrics import CACHE_LOOKUPS
+from .warmup import WarmUpReport
+
+OK, SATURATED, FAILED = "ok", "saturated", "failed"
+
+def check_database(engine: Engine) -> Dict[str, Any]:
+    """Runs a trivial query on a pooled connection."""
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"status": FAILED, "error": str(e)}
+    return {"status": OK, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+def check_pool(pool: Pool, capacity: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Reports the connection pool usage.
+
+    Args:
+        pool: The engine's pool.
+        capacity: The maximum number of connections, i.e. the pool size plus
+            the allowed overflow. Defaults to the pool size.
+    """
+    size = pool.size() if hasattr(pool, "size") else None
+    checked_out = pool.checkedout() if hasattr(pool, "checkedout") else None
+    capacity = capacity if capacity is not None else size
+    saturated = checked_out is not None and capacity is not None and checked_out >= capacity
+    return {
+        "status": SATURATED if saturated else OK,
+        "size": size,
+        "checked_out": checked_out,
+        "capacity": capacity,
+    }
+
+def check_executor(threads_busy: int, threads_total: int, queued: int, max_queued_ratio: float = 0.5) -> Dict[str, Any]:
+    """
+    Reports the worker threads running the endpoints.
+
+    A few requests briefly queueing for a thread is normal under load, so
+    the executor is only saturated when more than `max_queued_ratio` times
+    the number of threads are queued.
+    """
+    return {
+        "status": SATURATED if queued > threads_total * max_queued_ratio else OK,
+        "threads_busy": threads_busy,
+        "threads_total": threads_total,
+        "queued": queued,
+    }
+
+def check_log_writer(log_writer: Optional[BufferedLogWriter]) -> Dict[str, Any]:
+    """Reports the log writer buffer; saturated when full, as new entries are then dropped."""
+    if log_writer is None:
+        return {"status": OK, "running": False}
+    return {
+        "status": SATURATED if log_writer.pending >= log_writer.max_queue_size else OK,
+        "running": log_writer.running,
+        "pending": log_writer.pending,
+        "capacity": log_writer.max_queue_size,
+    }
+
+def check_admission(lanes: Iterable[AdmissionLane]) -> Dict[str, Any]:
+    """Reports the admission lanes; saturated when a lane's queue is full."""
+    report: Dict[str, Any] = {"status": OK}
+    for lane in lanes:
+        report[lane.name] = {"in_flight": lane.in_flight, "waiting": lane.waiting, "shed": lane.shed}
+        if lane.in_flight >= lane.max_concurrent and lane.waiting >= lane.max_queue:
+            report["status"] = SATURATED
+    return report
+
+def check_warm_up(report: Optional[WarmUpReport]) -> Dict[str, Any]:
+    """Reports the startup warm-up; failed until it has finished."""
+    if report is None:
+        return {"status": OK, "enabled": False}
+    return {
+        "status": OK if report.finished else FAILED,
+        "steps": {name: step.status for name, step in report.steps.items()},
+    }
+
+def cache_stats(sizes: Dict[str, Callable[[], int]]) -> Dict[str, Any]:
+    """
+    Reports the number of entries and the hit ratio of caches.
+
+    Args:
+        sizes: Returns the number of entries of each cache, by cache name.
+
+    Returns:
+        The entries and hit ratio of every cache with lookups or a size.
+    """
+    lookups: Dict[str, Dict[str, float]] = {}
+    for (cache, result), count in CACHE_LOOKUPS.collect().items():
+        lookups.setdefault(cache, {})[result] = count
+    stats: Dict[str, Any] = {}
+    for name in sorted(set(sizes) | set(lookups)):
+        hits, misses = lookups.get(name, {}).get("hit", 0), lookups.get(name, {}).get("miss", 0)
+        stats[name] = {"hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None}
+        if name in sizes:
+            try:
+                stats[name]["entries"] = sizes[name]()
+            except Exception as e:
+                stats[name]["error"] = str(e)
+    return stats
+
+def readiness(checks: Dict[str, Dict[str, Any]]) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Combines the checks into a readiness report.
+
+    Returns:
+        A tuple of whether the instance is ready, and the report.
+    """
+    ready = all(check["status"] == OK for check in checks.values())
+    return ready, {"status": "ready" if ready else "not ready", "checks": checks}
@@ -0,0 +1,43 @@
+"""
+Pooled HTTP sessions for the upstream API clients.
+
+A requests.Session keeps the connections it opened alive and reuses them, so
+only the first request to a host pays for the DNS lookup, the TCP connection
+and the TLS handshake. The connection pool is sized for the number of
+briefings generated concurrently; requests' default of 10 connections per
+host would make the extra ones open and discard a connection every time.
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept alive per upstream host.
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "32"))
+
+def create_session(pool_maxsize: int = UPSTREAM_POOL_SIZE) -> requests.Session:
+    """
+    Creates a session with a connection pool of the given size per host.
+
+    Args:
+        pool_maxsize: The maximum number of connections kept alive per host.
+
+    Returns:
+        The requests.Session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def preconnect(session: requests.Session, url: str, timeout: float = 5) -> None:
+    """
+    Opens a connection to the host of a URL and leaves it in the session's pool.
+
+    Any HTTP status is fine; only the connection matters.
+
+    Raises:
+        requests.exceptions.RequestException: If the host cannot be reached.
+    """
+    session.head(url, timeout=timeout).close()
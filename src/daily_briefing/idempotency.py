@@ -0,0 +1,202 @@
+"""
+Idempotency keys for the POST endpoints of the web API.
+
+Clients that time out retry their requests, and every retry of e.g. POST
+/token repeats the bcrypt verification, or of a write repeats the write. A
+client can instead send an `Idempotency-Key` header with a unique value per
+logical request. The first response for a key is stored for a while, and
+retries with the same key are answered from the store, marked with an
+`Idempotent-Replayed: true` header, without running the endpoint again.
+
+Keys are scoped to the caller (see `rate_limit.client_identity`), the method
+and the path. A retry arriving while the original request is still running
+waits for its result. Reusing a key with a different request body is
+rejected with 422. Server errors (5xx) are not stored, so they can be retried.
+
+The store may be a SQLite file (SharedCache), so it is only accessed from
+worker threads, never on the event loop. Responses carrying credentials,
+such as the access tokens of POST /token, go to a separate store that should
+be kept in the process' memory.
+"""
+import asyncio
+import functools
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .rate_limit import client_identity
+from .request_body import read_body, replay_body
+
+# Longer keys are rejected; UUIDs are 36 characters.
+MAX_KEY_LENGTH = 255
+
+@dataclass
+class StoredResponse:
+    """A response stored for an idempotency key."""
+    fingerprint: str  # of the request body
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+class IdempotencyMiddleware:
+    """ASGI middleware answering retried requests with the stored response."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Any,
+        ttl_seconds: float = 24 * 60 * 60,
+        methods: Sequence[str] = ("POST",),
+        max_response_size: int = 1_000_000,
+        max_body_size: int = 1_000_000,
+        wait_timeout: float = 30.0,
+        identify: Callable[[Scope], str] = client_identity,
+        private_paths: Sequence[str] = (),
+        private_store: Optional[Any] = None,
+        private_ttl_seconds: Optional[float] = None,
+    ):
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            store: Where responses are kept, e.g. a TTLCache or SharedCache.
+            ttl_seconds: How long a response is kept.
+            methods: The methods honoring the Idempotency-Key header.
+            max_response_size: Larger responses are not stored.
+            max_body_size: Requests with an Idempotency-Key and a larger body
+                are rejected with 413, as the body is held in memory.
+            wait_timeout: How long a retry waits for the original request to
+                complete before it is rejected with 409, in seconds.
+            identify: Returns the caller identity of a request.
+            private_paths: Paths whose responses carry credentials, e.g.
+                "/token". They are kept in `private_store` instead of `store`.
+            private_store: Where the responses of `private_paths` are kept,
+                e.g. a TTLCache in the process' memory. Defaults to `store`.
+            private_ttl_seconds: How long a response of `private_paths` is
+                kept, e.g. the lifetime of an access token. Defaults to
+                `ttl_seconds`.
+        """
+        self.app = app
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.methods = frozenset(methods)
+        self.max_response_size = max_response_size
+        self.max_body_size = max_body_size
+        self.wait_timeout = wait_timeout
+        self.identify = identify
+        self.private_paths = frozenset(private_paths)
+        self.private_store = private_store if private_store is not None else store
+        self.private_ttl_seconds = private_ttl_seconds if private_ttl_seconds is not None else ttl_seconds
+        # Requests being processed: store key -> (body fingerprint, done event)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Event]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _error(f"The Idempotency-Key header must have 1 to {MAX_KEY_LENGTH} characters.", 400)(
+                scope, receive, send
+            )
+            return
+
+        content_length = headers.get("content-length", "")
+        too_large = content_length.isdigit() and int(content_length) > self.max_body_size
+        body = None if too_large else await read_body(receive, self.max_body_size)
+        if body is None:
+            await _error(f"Requests with an Idempotency-Key must not exceed {self.max_body_size} bytes.", 413)(
+                scope, receive, send
+            )
+            return
+        fingerprint = hashlib.sha256(body).hexdigest()
+        private = scope["path"] in self.private_paths
+        store = self.private_store if private else self.store
+        ttl_seconds = self.private_ttl_seconds if private else self.ttl_seconds
+        store_key = f"idempotency:{self.identify(scope)}:{scope['method']}:{scope['path']}:{key}"
+        while True:
+            stored = await anyio.to_thread.run_sync(store.get, store_key)
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    await _key_reused(scope, receive, send)
+                else:
+                    await _replay(stored, send)
+                return
+            in_flight = self._in_flight.get(store_key)
+            if in_flight is None:
+                break
+            if in_flight[0] != fingerprint:
+                await _key_reused(scope, receive, send)
+                return
+            try:
+                await asyncio.wait_for(in_flight[1].wait(), timeout=self.wait_timeout)
+            except asyncio.TimeoutError:
+                await _error("A request with this Idempotency-Key is still being processed.", 409)(
+                    scope, receive, send
+                )
+                return
+            # The original completed; it is replayed, unless it wasn't stored.
+
+        done = asyncio.Event()
+        self._in_flight[store_key] = (fingerprint, done)
+        try:
+            await self._process(scope, replay_body(body, receive), send, store, ttl_seconds, store_key, fingerprint)
+        finally:
+            del self._in_flight[store_key]
+            done.set()
+
+    async def _process(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        store: Any,
+        ttl_seconds: float,
+        store_key: str,
+        fingerprint: str,
+    ) -> None:
+        """Runs the request and stores its response."""
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        size = 0
+
+        async def send_and_capture(message: Message) -> None:
+            nonlocal status, headers, size
+            if message["type"] == "http.response.start":
+                status, headers = message["status"], list(message.get("headers", []))
+            elif message["type"] == "http.response.body" and size <= self.max_response_size:
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                if not message.get("more_body", False) and status < 500 and size <= self.max_response_size:
+                    stored = StoredResponse(fingerprint, status, headers, b"".join(chunks))
+                    await anyio.to_thread.run_sync(
+                        functools.partial(store.set, store_key, stored, ttl_seconds=ttl_seconds)
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+
+async def _replay(stored: StoredResponse, send: Send) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": stored.status,
+        "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+    })
+    await send({"type": "http.response.body", "body": stored.body})
+
+def _error(detail: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code)
+
+async def _key_reused(scope: Scope, receive: Receive, send: Send) -> None:
+    await _error("The Idempotency-Key was already used with a different request body.", 422)(scope, receive, send)
@@ -0,0 +1,314 @@
+"""
+Database queries over the briefing logs.
+
+The /logs endpoints page through the `briefing_logs` table with keyset
+pagination: instead of an OFFSET, each page continues after the
+(created_at, id) of the last row of the previous page, which is passed
+around as an opaque cursor. Backed by the (created_at, id) index, every page
+costs the same however large the table grows.
+
+Bulk deletes run as set-based DELETE statements in bounded chunks, each in
+its own short transaction, so cleaning up old logs neither takes a round trip
+per row nor holds locks on a large part of the table for long.
+
+Full exports stream the table through a server-side cursor instead, encoding
+and optionally compressing the rows chunk by chunk, so memory use stays flat
+for any table size.
+"""
+import base64
+import binascii
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import Select, delete, func, select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Query, Session
+
+from .database import BriefingLog
+from .metrics import DB_COMMIT_DURATION
+
+def encode_cursor(log: BriefingLog) -> str:
+    """
+    Encodes the position of a log entry as an opaque pagination cursor.
+
+    Args:
+        log: The last log entry of a page.
+
+    Returns:
+        A URL-safe cursor string.
+    """
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decodes a pagination cursor created by `encode_cursor`.
+
+    Args:
+        cursor: The cursor string.
+
+    Returns:
+        The (created_at, id) position the cursor points at.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, log_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def filter_logs(
+    query: Union[Query, Select],
+    user_id: Optional[int] = None,
+    city: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Union[Query, Select]:
+    """
+    Applies the optional /logs filters to a query over BriefingLog.
+
+    Args:
+        query: The ORM query or Core select statement to filter.
+        user_id: Only include logs of this user.
+        city: Only include logs for this city.
+        created_from: Only include logs created at or after this time.
+        created_to: Only include logs created before this time.
+
+    Returns:
+        The filtered query or statement.
+    """
+    # Both Query and Select support .filter() with the same semantics.
+    if user_id is not None:
+        query = query.filter(BriefingLog.user_id == user_id)
+    if city is not None:
+        query = query.filter(BriefingLog.city == city)
+    if created_from is not None:
+        query = query.filter(BriefingLog.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(BriefingLog.created_at < created_to)
+    return query
+
+def get_logs_page(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    city: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Tuple[List[BriefingLog], Optional[str]]:
+    """
+    Returns one page of log entries, newest first.
+
+    Args:
+        db: The database session.
+        limit: The maximum number of entries on the page.
+        cursor: The cursor returned with the previous page, if any.
+        user_id: Only include logs of this user.
+        city: Only include logs for this city.
+        created_from: Only include logs created at or after this time.
+        created_to: Only include logs created before this time.
+
+    Returns:
+        A tuple of the page's log entries and the cursor of the next page,
+        which is None on the last page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    query = filter_logs(db.query(BriefingLog), user_id, city, created_from, created_to)
+    if cursor is not None:
+        created_at, log_id = decode_cursor(cursor)
+        # A row-value comparison, so the database can seek straight to the
+        # position in the (created_at, id) index.
+        query = query.filter(tuple_(BriefingLog.created_at, BriefingLog.id) < tuple_(created_at, log_id))
+    # Fetch one extra row to know whether there is a next page.
+    logs = (
+        query.order_by(BriefingLog.created_at.desc(), BriefingLog.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(logs) > limit:
+        logs = logs[:limit]
+        return logs, encode_cursor(logs[-1])
+    return logs, None
+
+def get_top_cities(db: Session, limit: int, created_from: Optional[datetime] = None) -> List[str]:
+    """
+    Returns the cities with the most briefings, most requested first.
+
+    Args:
+        db: The database session.
+        limit: The maximum number of cities.
+        created_from: Only count logs created at or after this time.
+
+    Returns:
+        The city names.
+    """
+    statement = select(BriefingLog.city)
+    if created_from is not None:
+        statement = statement.where(BriefingLog.created_at >= created_from)
+    statement = (
+        statement.group_by(BriefingLog.city)
+        .order_by(func.count().desc(), BriefingLog.city)
+        .limit(limit)
+    )
+    return list(db.scalars(statement))
+
+def delete_logs(
+    db: Session,
+    ids: Optional[Sequence[int]] = None,
+    created_before: Optional[datetime] = None,
+    chunk_size: int = 1000,
+) -> int:
+    """
+    Deletes log entries by ID or by age, at most `chunk_size` rows per
+    statement and transaction.
+
+    Args:
+        db: The database session.
+        ids: The IDs of the logs to delete. Unknown IDs are ignored.
+        created_before: Delete all logs created before this time.
+        chunk_size: The maximum number of rows deleted per statement.
+
+    Returns:
+        The number of deleted log entries.
+
+    Raises:
+        ValueError: If neither or both of `ids` and `created_before` are given.
+    """
+    if (ids is None) == (created_before is None):
+        raise ValueError("Provide either ids or created_before, but not both.")
+    deleted = 0
+    if ids is not None:
+        unique_ids = sorted(set(ids))
+        for start in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[start:start + chunk_size]
+            result = db.execute(
+                delete(BriefingLog).where(BriefingLog.id.in_(chunk)),
+                execution_options={"synchronize_session": False},
+            )
+            with DB_COMMIT_DURATION.time("delete_briefing_logs"):
+                db.commit()
+            deleted += result.rowcount
+        return deleted
+    while True:
+        # Delete the oldest `chunk_size` matching rows, found through the
+        # (created_at, id) index, until none are left.
+        oldest = (
+            select(BriefingLog.id)
+            .where(BriefingLog.created_at < created_before)
+            .order_by(BriefingLog.created_at, BriefingLog.id)
+            .limit(chunk_size)
+        )
+        result = db.execute(
+            delete(BriefingLog).where(BriefingLog.id.in_(oldest.scalar_subquery())),
+            execution_options={"synchronize_session": False},
+        )
+        with DB_COMMIT_DURATION.time("delete_briefing_logs"):
+            db.commit()
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            return deleted
+
+
+# --- Export ---
+
+EXPORT_COLUMNS = ("id", "user_id", "city", "created_at")
+EXPORT_FORMATS = ("ndjson", "csv")
+
+def iter_log_rows(
+    db: Session,
+    fetch_size: int = 1000,
+    user_id: Optional[int] = None,
+    city: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Iterator[Sequence[Row]]:
+    """
+    Streams log rows from the database in chunks of `fetch_size`, oldest first.
+
+    The rows are read through a server-side cursor, so only one chunk is held
+    in memory at a time.
+
+    Args:
+        db: The database session.
+        fetch_size: The number of rows fetched from the database at once.
+        user_id: Only include logs of this user.
+        city: Only include logs for this city.
+        created_from: Only include logs created at or after this time.
+        created_to: Only include logs created before this time.
+
+    Yields:
+        Lists of up to `fetch_size` rows with the EXPORT_COLUMNS.
+    """
+    statement = select(*(getattr(BriefingLog, column) for column in EXPORT_COLUMNS))
+    statement = filter_logs(statement, user_id, city, created_from, created_to).order_by(BriefingLog.id)
+    result = db.execute(statement.execution_options(yield_per=fetch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def _encode_chunk(rows: Sequence[Row], export_format: str) -> str:
+    """Encodes a chunk of rows as NDJSON or CSV lines."""
+    if export_format == "ndjson":
+        return "".join(
+            json.dumps({
+                "id": row.id,
+                "user_id": row.user_id,
+                "city": row.city,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (row.id, row.user_id, row.city, row.created_at.isoformat() if row.created_at else "")
+        for row in rows
+    )
+    return buffer.getvalue()
+
+def encode_logs_export(
+    chunks: Iterable[Sequence[Row]],
+    export_format: str = "ndjson",
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """
+    Encodes chunks of log rows as an NDJSON or CSV byte stream.
+
+    Args:
+        chunks: The row chunks, e.g. from `iter_log_rows`.
+        export_format: "ndjson" or "csv". CSV output starts with a header row.
+        compress: Whether to gzip the stream.
+
+    Yields:
+        The encoded (and possibly compressed) bytes, one piece per chunk.
+
+    Raises:
+        ValueError: If the export format is not supported.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'.")
+    # wbits=31 makes zlib write a gzip header and trailer.
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def output(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    if export_format == "csv":
+        yield output((",".join(EXPORT_COLUMNS) + "\r\n").encode())
+    for rows in chunks:
+        data = output(_encode_chunk(rows, export_format).encode())
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
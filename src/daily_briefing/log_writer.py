@@ -0,0 +1,259 @@
+"""
+Buffered, batched writes of briefing log entries.
+
+Committing a BriefingLog row inside the request means every briefing waits for
+a database round trip and fsync. Instead, the endpoints hand the entries to a
+BufferedLogWriter, whose background thread inserts them in batches every
+`batch_size` rows or `flush_interval_ms` milliseconds, whichever comes first.
+The buffer is bounded by its number of rows; when it is full, new entries are
+either dropped or the caller blocks for a short while, depending on the
+configured policy.
+
+Entries submitted together with `submit_many` stay together: they are
+buffered, or dropped, as a whole and written in the same insert.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import database
+from .database import BriefingLog
+from . import tracing
+from .metrics import DB_COMMIT_DURATION
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Defaults, configurable through the environment like the database connection.
+LOG_WRITER_BATCH_SIZE = int(os.getenv("LOG_WRITER_BATCH_SIZE", "100"))
+LOG_WRITER_FLUSH_INTERVAL_MS = int(os.getenv("LOG_WRITER_FLUSH_INTERVAL_MS", "200"))
+LOG_WRITER_MAX_QUEUE_SIZE = int(os.getenv("LOG_WRITER_MAX_QUEUE_SIZE", "10000"))
+LOG_WRITER_WHEN_FULL = os.getenv("LOG_WRITER_WHEN_FULL", "drop")
+LOG_WRITER_BLOCK_TIMEOUT_MS = int(os.getenv("LOG_WRITER_BLOCK_TIMEOUT_MS", "100"))
+
+# Sentinel put on the queue to wake the writer thread up on close().
+_STOP = object()
+
+class BufferedLogWriter:
+    """
+    Collects briefing log entries in a bounded in-memory queue and inserts
+    them into the database in batches from a background thread.
+    """
+
+    POLICIES = ("drop", "block")
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        batch_size: int = LOG_WRITER_BATCH_SIZE,
+        flush_interval_ms: int = LOG_WRITER_FLUSH_INTERVAL_MS,
+        max_queue_size: int = LOG_WRITER_MAX_QUEUE_SIZE,
+        when_full: str = LOG_WRITER_WHEN_FULL,
+        block_timeout_ms: int = LOG_WRITER_BLOCK_TIMEOUT_MS,
+    ):
+        """
+        Initializes the writer. Call `start()` to begin writing.
+
+        Args:
+            session_factory: Creates the database sessions used for the inserts.
+                Defaults to the application's SessionLocal.
+            batch_size: Maximum number of rows inserted at once.
+            flush_interval_ms: Maximum time a row waits in the buffer.
+            max_queue_size: Maximum number of buffered rows. A `submit_many`
+                group larger than this is always dropped.
+            when_full: "drop" discards new rows when the buffer is full; "block"
+                makes the caller wait up to `block_timeout_ms` for free space
+                before discarding the row.
+            block_timeout_ms: How long `submit` may block with the "block" policy.
+        """
+        if when_full not in self.POLICIES:
+            raise ValueError(f"when_full must be one of: {', '.join(self.POLICIES)}.")
+        if batch_size <= 0 or max_queue_size <= 0:
+            raise ValueError("batch_size and max_queue_size must be positive integers.")
+        self.session_factory = session_factory if session_factory is not None else database.SessionLocal
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.when_full = when_full
+        self.block_timeout = block_timeout_ms / 1000
+        # Holds single rows and groups; the buffered rows are counted, and
+        # bounded, separately.
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._max_queue_size = max_queue_size
+        self._buffered = 0
+        self._thread: Optional[threading.Thread] = None
+        # Guards the counters, which request threads and the writer update.
+        self._counter_lock = threading.Lock()
+        # Notified when the writer takes rows off the buffer.
+        self._space_freed = threading.Condition(self._counter_lock)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        """The number of buffered rows waiting to be written."""
+        with self._counter_lock:
+            return self._buffered
+
+    @property
+    def max_queue_size(self) -> int:
+        """The maximum number of buffered rows."""
+        return self._max_queue_size
+
+    @property
+    def running(self) -> bool:
+        """Whether the background thread is writing."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, user_id: int, city: str) -> bool:
+        """
+        Buffers a log entry for a briefing request made now.
+
+        Args:
+            user_id: The ID of the user the briefing was generated for.
+            city: The city of the briefing.
+
+        Returns:
+            True if the entry was buffered, False if it was dropped because the
+            buffer was full.
+        """
+        # The timestamp is taken here, not at insert time, so it reflects
+        # when the briefing was requested.
+        row = {"user_id": user_id, "city": city, "created_at": datetime.now(timezone.utc)}
+        if self._enqueue(row, 1):
+            return True
+        with self._counter_lock:
+            self.dropped += 1
+        logging.warning(f"Briefing log buffer is full; dropped entry for user {user_id} in {city}.")
+        return False
+
+    def submit_many(self, entries: Iterable[Tuple[int, str]]) -> bool:
+        """
+        Buffers log entries for several briefing requests made now, to be
+        written together in one insert.
+
+        Args:
+            entries: The (user_id, city) pairs of the briefings.
+
+        Returns:
+            True if the entries were buffered (or there were none), False if
+            they were all dropped because the buffer was full.
+        """
+        created_at = datetime.now(timezone.utc)
+        rows = [{"user_id": user_id, "city": city, "created_at": created_at} for user_id, city in entries]
+        if not rows or self._enqueue(rows, len(rows)):
+            return True
+        with self._counter_lock:
+            self.dropped += len(rows)
+        logging.warning(f"Briefing log buffer is full; dropped {len(rows)} entries.")
+        return False
+
+    def _enqueue(self, item: Any, rows: int) -> bool:
+        """Puts a row or a group of `rows` rows on the queue, honoring the when_full policy."""
+        def has_space() -> bool:
+            return self._buffered + rows <= self._max_queue_size
+
+        with self._space_freed:
+            if self.when_full == "block" and rows <= self._max_queue_size:
+                self._space_freed.wait_for(has_space, timeout=self.block_timeout)
+            if not has_space():
+                return False
+            self._buffered += rows
+            # Queued under the lock, so the writer never takes rows it hasn't
+            # seen counted.
+            self._queue.put_nowait(item)
+        return True
+
+    def start(self) -> "BufferedLogWriter":
+        """Starts the background writer thread. Returns the writer itself."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="briefing-log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, timeout: Optional[float] = 10) -> None:
+        """
+        Writes all buffered rows and stops the background thread.
+
+        Args:
+            timeout: Maximum time to wait for the remaining rows to be written.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # The writer is stuck, e.g. on the database. Its thread is a
+            # daemon, so it doesn't keep the process from exiting.
+            logging.warning(f"Briefing log writer did not stop within {timeout}s; {self.pending} entries are pending.")
+            return
+        self._thread = None
+
+    def _run(self) -> None:
+        """Collects rows into batches and writes them until stopped."""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = self._take(first)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                # A group may push the batch over batch_size; it is still
+                # written in one insert.
+                batch.extend(self._take(item))
+            self._write(batch)
+        # Anything still queued at shutdown is flushed before returning.
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.extend(self._take(item))
+        for start in range(0, len(leftovers), self.batch_size):
+            self._write(leftovers[start:start + self.batch_size])
+
+    def _take(self, item: Any) -> List[Dict[str, Any]]:
+        """Returns the rows of a queue item, which is a single row or a group, and frees their space."""
+        rows = list(item) if isinstance(item, list) else [item]
+        with self._space_freed:
+            self._buffered -= len(rows)
+            self._space_freed.notify_all()
+        return rows
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        """Inserts a batch of rows with a single statement and commit."""
+        db = self.session_factory()
+        try:
+            # A trace of its own: a batch holds the entries of many requests.
+            with tracing.start_span("insert_briefing_logs", rows=len(rows)), \
+                    DB_COMMIT_DURATION.time("insert_briefing_logs"):
+                db.execute(insert(BriefingLog), rows)
+                db.commit()
+            with self._counter_lock:
+                self.written += len(rows)
+        except Exception as e:
+            db.rollback()
+            with self._counter_lock:
+                self.failed += len(rows)
+            logging.error(f"Could not write {len(rows)} briefing log entries: {e}")
+        finally:
+            db.close()
@@ -6,18 +6,28 @@ and check the application's configuration.
 Tu run CLI:
 python -m daily_briefing.main <COMMAND>, e.g. to get a briefing:
 python -m daily_briefing.main get-briefing 1 --city "Wroclaw"
+To render briefings for many users to a file:
+python -m daily_briefing.main render-briefings 1 2 3 --city "Wroclaw" --format markdown --output briefings.md
 To check configuration:
 python -m daily_briefing.main check-config
+To serve the web API with one worker process per available CPU core:
+python -m daily_briefing.main serve --host 0.0.0.0 --port 8000
 """
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
 import typer
 from typing_extensions import Annotated
 
-# Import the application components
-from .daily_briefing_app import DailyBriefing
-from .api_interactions import JSONPlaceholderClient
-from .weather_client import OpenWeatherClient
 from .config_reader import ConfigReader
 
+# The application components are imported by the commands that use them, so
+# that e.g. `check-config` or `--help` don't load the HTTP and model libraries.
+if TYPE_CHECKING:
+    from .daily_briefing_app import DailyBriefing
+
 # Create a Typer app instance.
 app = typer.Typer(
     help="A CLI application to generate a daily briefing for a user, including weather and recent posts.",
@@ -27,8 +37,12 @@ app = typer.Typer(
 
 # This dependency provider function is responsible for creating the
 # application instance. Our tests will mock this function directly.
-def get_DailyBriefing() -> DailyBriefing:
+def get_DailyBriefing() -> "DailyBriefing":
     """Dependency to create and provide the DailyBriefing app instance."""
+    from .api_interactions import JSONPlaceholderClient
+    from .daily_briefing_app import DailyBriefing
+    from .weather_client import OpenWeatherClient
+
     config_reader = ConfigReader()
     api_client = JSONPlaceholderClient()
     weather_client = OpenWeatherClient(config_reader=config_reader)
@@ -64,6 +78,53 @@ def get_briefing(
     except Exception as e:
         typer.secho(f"An unexpected application error occurred: {e}", fg=typer.colors.RED, err=True)
 
+@app.command()
+def render_briefings(
+    user_ids: Annotated[List[int], typer.Argument(
+        help="The IDs of the users to generate briefings for."
+    )],
+    city: Annotated[str, typer.Option(
+        "--city", "-c",
+        help="The city for the weather forecast (e.g., 'London')."
+    )],
+    output_format: Annotated[str, typer.Option(
+        "--format", "-f",
+        help="Output format: 'plain', 'markdown' or 'jsonl'."
+    )] = "plain",
+    output: Annotated[Optional[Path], typer.Option(
+        "--output", "-o",
+        help="The file to write the briefings to. Defaults to standard output."
+    )] = None
+    ):
+    """
+    Generates briefings for many users and streams them to a file or standard output.
+    """
+    from .rendering import BriefingRenderer
+
+    try:
+        renderer = BriefingRenderer(output_format)
+        briefing_app: DailyBriefing = get_DailyBriefing()
+
+        def report_error(user_id: int, city: str, error: Exception) -> None:
+            typer.secho(f"Skipping user {user_id}: {error}", fg=typer.colors.YELLOW, err=True)
+
+        # Briefings are generated one at a time and written as soon as they
+        # are ready, so memory use doesn't grow with the number of users.
+        briefings = briefing_app.iter_briefings(((user_id, city) for user_id in user_ids), on_error=report_error)
+        if output is None:
+            count = renderer.write_many(briefings, sys.stdout)
+        else:
+            with open(output, "w", encoding="utf-8") as fh:
+                count = renderer.write_many(briefings, fh)
+        typer.secho(f"Rendered {count} of {len(user_ids)} briefings.", fg=typer.colors.GREEN, err=True)
+
+    except ValueError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED, err=True)
+    except (FileNotFoundError, KeyError) as e:
+        typer.secho(f"Configuration Error: {e}", fg=typer.colors.RED, err=True)
+    except Exception as e:
+        typer.secho(f"An unexpected application error occurred: {e}", fg=typer.colors.RED, err=True)
+
 @app.command()
 def check_config():
     """
@@ -78,5 +139,66 @@ def check_config():
         error_message = f"❌ Configuration check failed: {e}"
         typer.secho(error_message, fg=typer.colors.RED, err=True)
 
+def default_worker_count() -> int:
+    """
+    Returns the number of web server worker processes: WEB_CONCURRENCY if set,
+    otherwise the number of CPU cores this process may run on.
+    """
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    try:
+        # Respects CPU affinity, e.g. the cpuset of a container.
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def default_shared_cache_path() -> str:
+    """
+    Returns the path of the shared cache file in the user's cache directory
+    ($XDG_CACHE_HOME or ~/.cache), creating its directory accessible to the
+    user only.
+    """
+    directory = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "daily_briefing")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    # makedirs leaves the mode of an existing directory alone.
+    os.chmod(directory, 0o700)
+    return os.path.join(directory, "shared_cache.sqlite3")
+
+@app.command()
+def serve(
+    host: Annotated[str, typer.Option(help="The interface to listen on.")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="The port to listen on.")] = 8000,
+    workers: Annotated[Optional[int], typer.Option(
+        help="The number of worker processes. Defaults to WEB_CONCURRENCY or the number of available CPU cores."
+    )] = None,
+    log_level: Annotated[str, typer.Option(help="The log level of the server.")] = "info",
+    shared_cache: Annotated[Optional[Path], typer.Option(
+        help="The SQLite file caching user and weather lookups for all workers. "
+             "Defaults to SHARED_CACHE_PATH, or a file in the user's cache directory."
+    )] = None
+    ):
+    """
+    Serves the web API with several worker processes sharing one cache.
+    """
+    import uvicorn
+
+    from .database import create_db_and_tables
+
+    workers = workers or default_worker_count()
+    # Concurrent CREATE TABLE statements from several workers conflict, so
+    # the tables are created once here and the workers skip it.
+    create_db_and_tables()
+    os.environ["CREATE_DB_TABLES"] = "false"
+    # The workers size their database pools by the number of workers.
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    # The workers are started as new processes, which read the cache location
+    # from the environment.
+    if shared_cache is not None:
+        os.environ["SHARED_CACHE_PATH"] = str(shared_cache)
+    elif not os.getenv("SHARED_CACHE_PATH"):
+        os.environ["SHARED_CACHE_PATH"] = default_shared_cache_path()
+    typer.echo(f"Serving on http://{host}:{port} with {workers} worker(s), sharing {os.environ['SHARED_CACHE_PATH']}")
+    uvicorn.run("daily_briefing.web_api:api_app", host=host, port=port, workers=workers, log_level=log_level)
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
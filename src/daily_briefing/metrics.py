@@ -0,0 +1,352 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters and histograms are recorded into per-thread shards: every thread
+updates its own dictionary, so recording takes no lock and threads never
+contend. The shards are only combined when the metrics are collected, e.g.
+by a scrape of the /metrics endpoint. Shards of finished threads are folded
+into a single total, so short-lived worker threads don't make them pile up.
+
+The application's metrics are defined at the bottom of this module.
+"""
+import bisect
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _ShardedMetric(ABC):
+    """Base class of the metrics recorded into per-thread shards."""
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # (thread, shard) of every thread that recorded a value
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        # The combined values of the shards of finished threads.
+        self._retired: dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        """Returns the calling thread's shard, creating it on first use."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._retire_finished_threads()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_finished_threads(self) -> None:
+        """Folds the shards of finished threads into the retired values. Needs the lock."""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for labels, value in shard.items():
+                    self._retired[labels] = self._merge(self._retired.get(labels), value)
+        self._shards = alive
+
+    @abstractmethod
+    def _merge(self, total, value):
+        """Combines a shard's value into a total, which is None for the first shard."""
+
+    @abstractmethod
+    def _copy(self, value):
+        """Returns a copy of a value that recording threads won't modify."""
+
+    def _check_labels(self, labels: LabelValues) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {labels}.")
+
+    def collect(self) -> Dict[LabelValues, object]:
+        """Returns the combined value of every label combination."""
+        with self._shards_lock:
+            self._retire_finished_threads()
+            totals = {labels: self._copy(value) for labels, value in self._retired.items()}
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            # Copying a dict is atomic, so threads may keep recording meanwhile.
+            for labels, value in shard.copy().items():
+                totals[labels] = self._merge(totals.get(labels), value)
+        return totals
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Returns the metric in the Prometheus text format, one line per item."""
+
+class Counter(_ShardedMetric):
+    """A monotonically increasing count, e.g. of requests."""
+
+    metric_type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """
+        Increments the counter.
+
+        Args:
+            *labels: The label values, in the order of the label names.
+            amount: The increment.
+        """
+        self._check_labels(labels)
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+    def _copy(self, value):
+        return value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Histogram(_ShardedMetric):
+    """The distribution of observed values, e.g. of latencies in seconds."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Records an observation.
+
+        Args:
+            value: The observed value.
+            *labels: The label values, in the order of the label names.
+        """
+        self._check_labels(labels)
+        shard = self._shard()
+        # [per-bucket counts (the last one is +Inf), sum]
+        entry = shard.get(labels)
+        if entry is None:
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observes the duration of the `with` block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _merge(self, total, value):
+        if total is None:
+            return self._copy(value)
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+    def _copy(self, value):
+        return [list(value[0]), value[1]]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class CallbackGauge:
+    """A gauge whose values are read from the application when collected."""
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+    ):
+        """
+        Initializes the gauge.
+
+        Args:
+            name: The metric name.
+            documentation: The help text.
+            labelnames: The label names.
+            callback: Returns (label values, value) pairs, e.g. the current
+                queue length of each lane.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.callback():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class MetricsRegistry:
+    """A collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Adds a metric to the registry.
+
+        Returns:
+            The metric itself.
+
+        Raises:
+            ValueError: If a metric with the same name is already registered.
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        """Removes a metric from the registry, if present."""
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of every HTTP request."""
+
+    def __init__(self, app: ASGIApp, histogram: Optional[Histogram] = None):
+        self.app = app
+        self.histogram = histogram if histogram is not None else HTTP_REQUEST_DURATION
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template, e.g. /briefing/{user_id}, keeps the number
+            # of label values bounded. Requests that never reached the router
+            # (unknown paths, or rejected by rate limiting or admission
+            # control) share one label.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unrouted"
+            self.histogram.observe(time.perf_counter() - start, scope["method"], path, str(status_code))
+
+# --- Application metrics ---
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests, including streamed bodies.",
+    ("method", "route", "status"),
+))
+UPSTREAM_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to the upstream APIs.",
+    ("call", "outcome"),
+))
+DB_COMMIT_DURATION = REGISTRY.register(Histogram(
+    "db_commit_duration_seconds",
+    "Latency of database writes, including the commit.",
+    ("operation",),
+))
+DB_POOL_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time taken to check out a database connection, including waiting for a free one.",
+    ("outcome",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0),
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result.",
+    ("cache", "result"),
+))
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Counts a hit or miss of a named cache."""
+    CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+def timed_upstream_call(call: str) -> Callable:
+    """
+    Decorator recording the latency and outcome of an upstream API call:
+    "ok", "empty" when the client returned None (it logs and swallows
+    request errors), or "error" when it raised.
+
+    Args:
+        call: The name of the call, e.g. "get_user".
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "empty" if result is None else "ok"
+                return result
+            finally:
+                UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - start, call, outcome)
+        return wrapper
+    return decorator
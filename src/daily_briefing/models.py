@@ -8,9 +8,9 @@ Pydantic models are used for:
 """
 from dataclasses import dataclass
 
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
 
 @dataclass(frozen=True) # 'frozen=True' makes instances immutable
 class WeatherInfo:
@@ -20,6 +20,7 @@ class WeatherInfo:
     feels_like: float
     description: str
     icon_code: str
+    observed_at: Optional[int] = None  # Unix time of the observation ('dt' in the API response)
     
 class BriefingResponse(BaseModel):
     """Defines the response structure for the main /briefing endpoint."""
@@ -28,6 +29,53 @@ class BriefingResponse(BaseModel):
     weather_summary: Optional[str] = None
     latest_post_title: Optional[str] = None
     error_message: Optional[str] = None
+    # Values of additional briefing sections (e.g. "open_todos"), keyed by name.
+    sections: Optional[Dict[str, Any]] = None
+    # When the briefing was assembled, so clients can tell how fresh a
+    # precomputed briefing is.
+    generated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class BriefingDelta(BaseModel):
+    """
+    Defines the response structure for the /briefing/{user_id}/changes endpoint:
+    only what changed since the user's previous briefing.
+    """
+    user_id: int
+    city: str
+    # True when there was no previous briefing to compare with, in which case
+    # everything currently available is returned.
+    is_initial: bool
+    new_post_titles: List[str] = []
+    last_post_id: Optional[int] = None
+    # Only set when the weather observation is newer than the last one returned.
+    weather_summary: Optional[str] = None
+    weather_observed_at: Optional[int] = None
+    generated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class BriefingBatchItem(BaseModel):
+    """One (user_id, city) pair of a /briefings batch request."""
+    user_id: int
+    city: str
+
+class BriefingBatchRequest(BaseModel):
+    """Request body for the /briefings batch endpoint."""
+    items: List[BriefingBatchItem] = Field(min_length=1, max_length=100)
+
+class BriefingBatchResult(BaseModel):
+    """
+    The outcome of one item of a batch: either its briefing, or the error
+    with the status code the /briefing endpoint would have answered with.
+    """
+    index: int  # position of the item in the request
+    user_id: int
+    city: str
+    status_code: int
+    briefing: Optional[BriefingResponse] = None
+    error: Optional[str] = None
+
+class BriefingBatchResponse(BaseModel):
+    """Response of the /briefings batch endpoint, in request order."""
+    results: List[BriefingBatchResult]
 
 class BriefingLog(BaseModel):
     """Pydantic schema for reading log entries from the API."""
@@ -36,4 +84,22 @@ class BriefingLog(BaseModel):
     city: str
     created_at: datetime
     # This allows the Pydantic model to be created from an ORM object
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class BulkDeleteLogsRequest(BaseModel):
+    """
+    Request body for /logs/bulk-delete: either explicit log IDs or a cutoff
+    before which all logs are deleted.
+    """
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    created_before: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_exactly_one_criterion(self) -> "BulkDeleteLogsRequest":
+        if (self.ids is None) == (self.created_before is None):
+            raise ValueError("Provide either 'ids' or 'created_before', but not both.")
+        return self
+
+class BulkDeleteLogsResult(BaseModel):
+    """Response of /logs/bulk-delete."""
+    deleted: int
@@ -0,0 +1,122 @@
+"""
+A sampling profiler for diagnosing CPU hot spots in the running server.
+
+Instead of instrumenting every function call like cProfile, the profiler
+periodically records the Python stack of every thread, e.g. 100 times a
+second, from a background thread. The overhead is low and does not depend on
+what the application is doing, so it is safe to run under real traffic.
+
+The result is in the collapsed-stack format read by flamegraph tools such as
+flamegraph.pl or speedscope: one line per distinct stack, its frames from the
+root to the leaf separated by semicolons, followed by the number of samples.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+Stack = Tuple[str, ...]
+
+# (file name, function) of the frames where a thread sits while it waits for
+# work, I/O or a lock rather than using CPU.
+IDLE_FRAMES = frozenset({
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+})
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+# Only one profile at a time: concurrent profiles would sample each other.
+_profile_lock = threading.Lock()
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+def sample_stacks(
+    duration: float,
+    interval: float = 0.01,
+    include_idle: bool = False,
+    include_thread_names: bool = False,
+) -> Dict[Stack, int]:
+    """
+    Samples the stacks of all threads, except the calling one, for a while.
+
+    Args:
+        duration: How long to sample, in seconds.
+        interval: The time between samples, in seconds.
+        include_idle: Whether to count threads that are waiting, e.g. for a
+            lock, a queue or the network, rather than using CPU.
+        include_thread_names: Whether to prefix every stack with the name of
+            its thread.
+
+    Returns:
+        The number of samples of every distinct stack, frames ordered from the
+        root to the leaf.
+
+    Raises:
+        ProfilerBusyError: If another profile is running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running.")
+    try:
+        own_thread = threading.get_ident()
+        counts: Counter = Counter()
+        deadline = time.monotonic() + duration
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()} if include_thread_names else {}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread or (not include_idle and _is_idle(frame)):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if include_thread_names:
+                    stack.append(names.get(thread_id, str(thread_id)))
+                counts[tuple(reversed(stack))] += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return dict(counts)
+            time.sleep(min(interval, remaining))
+    finally:
+        _profile_lock.release()
+
+def collapse_stacks(counts: Dict[Stack, int]) -> str:
+    """
+    Formats sampled stacks in the collapsed-stack format, most frequent first.
+
+    Args:
+        counts: The number of samples of every stack, as from `sample_stacks`.
+
+    Returns:
+        The profile, one "frame;frame;frame count" line per stack.
+    """
+    lines = [f"{';'.join(stack)} {count}" for stack, count in sorted(counts.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + "\n" if lines else ""
+
+def profile(duration: float, interval: float = 0.01, include_idle: bool = False,
+            include_thread_names: bool = False) -> Tuple[str, int]:
+    """
+    Samples all threads and returns the collapsed-stack profile.
+
+    Args:
+        See `sample_stacks`.
+
+    Returns:
+        A tuple of the profile and the total number of stack samples.
+
+    Raises:
+        ProfilerBusyError: If another profile is running.
+    """
+    counts = sample_stacks(duration, interval, include_idle, include_thread_names)
+    return collapse_stacks(counts), sum(counts.values())
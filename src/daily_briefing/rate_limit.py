@@ -0,0 +1,298 @@
+"""
+Per-client rate limiting for the web API.
+
+Each caller is identified by the subject of a valid bearer token or, for
+anonymous requests, by the client IP address. Requests are counted per caller
+and route with a sliding window counter: the number of requests in the current
+fixed window, plus the previous window's count weighted by how much of it
+still overlaps the sliding window. That needs only two counters per caller,
+so every check is O(1) in time and memory, unlike a log of timestamps.
+
+Responses carry the `RateLimit-Limit`, `RateLimit-Remaining` and
+`RateLimit-Reset` headers; rejected requests get 429 Too Many Requests with a
+`Retry-After` header. The counters live in memory by default;
+SharedRateLimitStore keeps them in a SharedCache, so that the worker
+processes of a host share the limits.
+
+A request costs 1 by default. A rule can instead weigh requests by their
+body, e.g. a batch by its number of items.
+"""
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import auth
+from .cache import SharedCache
+from .request_body import read_body, replay_body
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    Allows `limit` requests per caller within any `window_seconds` long
+    period. With `cost`, a request counts as many requests as `cost` returns
+    for its body, e.g. the number of items of a batch.
+    """
+    name: str
+    limit: int
+    window_seconds: float
+    cost: Optional[Callable[[bytes], int]] = field(default=None, compare=False)
+
+    @classmethod
+    def from_env(
+        cls, name: str, limit: int, window_seconds: float, cost: Optional[Callable[[bytes], int]] = None
+    ) -> "RateLimitRule":
+        """
+        Creates a rule whose values can be overridden through the environment,
+        e.g. RATE_LIMIT_BRIEFING_LIMIT and RATE_LIMIT_BRIEFING_WINDOW_SECONDS.
+        """
+        prefix = f"RATE_LIMIT_{name.upper()}_"
+        return cls(
+            name,
+            limit=int(os.getenv(prefix + "LIMIT", str(limit))),
+            window_seconds=float(os.getenv(prefix + "WINDOW_SECONDS", str(window_seconds))),
+            cost=cost,
+        )
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """The outcome of a rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: int  # until the current window ends
+
+class RateLimitStore(ABC):
+    """Where the sliding window counters are kept."""
+
+    # Whether `hit` waits for I/O, so that it must not run on the event loop.
+    blocking = False
+
+    @abstractmethod
+    def hit(self, key: Hashable, rule: RateLimitRule, now: float, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Counts a request if it is within the limit.
+
+        Must be atomic, so that concurrent requests cannot both take the last
+        free slot.
+
+        Args:
+            key: The counter key, identifying the caller and rule.
+            rule: The rule to apply.
+            now: The current time in seconds.
+            cost: How many requests the request counts as.
+
+        Returns:
+            A tuple of whether the request is allowed, and the estimated number
+            of requests in the sliding window, including this one if allowed.
+        """
+
+def _count(counter: List[int], rule: RateLimitRule, now: float, cost: int) -> Tuple[bool, float]:
+    """
+    Applies a request to a counter of [window index, current window count,
+    previous window count], in place.
+    """
+    window = int(now // rule.window_seconds)
+    # How much of the previous window still overlaps the sliding window.
+    previous_weight = 1 - (now % rule.window_seconds) / rule.window_seconds
+    if counter[0] != window:
+        # Roll over; a gap of more than one window leaves nothing to carry.
+        counter[2] = counter[1] if counter[0] == window - 1 else 0
+        counter[0], counter[1] = window, 0
+    estimated = counter[2] * previous_weight + counter[1]
+    if estimated + cost > rule.limit:
+        return False, estimated
+    counter[1] += cost
+    return True, estimated + cost
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """A bounded, thread-safe in-process store of sliding window counters."""
+
+    def __init__(self, max_keys: int = 100_000):
+        """
+        Initializes an empty store.
+
+        Args:
+            max_keys: Maximum number of tracked keys; the least recently seen
+                caller is forgotten first.
+        """
+        self.max_keys = max_keys
+        # key -> [window index, current window count, previous window count]
+        self._counters: "OrderedDict[Hashable, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: Hashable, rule: RateLimitRule, now: float, cost: int = 1) -> Tuple[bool, float]:
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = [int(now // rule.window_seconds), 0, 0]
+                if len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+            return _count(counter, rule, now, cost)
+
+class SharedRateLimitStore(RateLimitStore):
+    """
+    Sliding window counters kept in a SharedCache, so that the worker
+    processes of a host share the limits. If the cache fails, requests are
+    allowed rather than rejected.
+    """
+
+    blocking = True
+
+    def __init__(self, cache: SharedCache):
+        """
+        Initializes the store.
+
+        Args:
+            cache: The SharedCache keeping the counters.
+        """
+        self.cache = cache
+
+    def hit(self, key: Hashable, rule: RateLimitRule, now: float, cost: int = 1) -> Tuple[bool, float]:
+        def update(counter: Optional[List[int]]) -> Tuple[List[int], Tuple[bool, float]]:
+            counter = counter or [int(now // rule.window_seconds), 0, 0]
+            return counter, _count(counter, rule, now, cost)
+
+        name, identity = key
+        # Two windows: the counter is needed until its previous window no longer overlaps.
+        return self.cache.update(f"rate-limit:{name}:{identity}", update, ttl_seconds=2 * rule.window_seconds)
+
+class SlidingWindowRateLimiter:
+    """Applies rate limit rules to callers."""
+
+    def __init__(self, store: Optional[RateLimitStore] = None, clock: Callable[[], float] = time.time):
+        """
+        Initializes the limiter.
+
+        Args:
+            store: Where the counters are kept. Defaults to an in-memory store.
+            clock: Returns the current time in seconds. Wall-clock time, so
+                that processes sharing a store agree on the windows.
+        """
+        self.store = store if store is not None else InMemoryRateLimitStore()
+        self.clock = clock
+
+    def check(self, identity: str, rule: RateLimitRule, cost: int = 1) -> RateLimitResult:
+        """
+        Counts a request of a caller against a rule.
+
+        Args:
+            identity: The caller, e.g. "user:testuser" or "ip:10.0.0.1".
+            rule: The rule to apply.
+            cost: How many requests the request counts as.
+
+        Returns:
+            The RateLimitResult.
+        """
+        now = self.clock()
+        allowed, estimated = self.store.hit((rule.name, identity), rule, now, cost)
+        return RateLimitResult(
+            allowed=allowed,
+            limit=rule.limit,
+            remaining=max(0, math.floor(rule.limit - estimated)),
+            reset_seconds=max(1, math.ceil(rule.window_seconds - now % rule.window_seconds)),
+        )
+
+def client_identity(scope: Scope) -> str:
+    """
+    Identifies the caller of a request: the subject of a valid bearer token,
+    otherwise the client IP address.
+    """
+    authorization = Headers(scope=scope).get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        subject = auth.get_token_subject(token)
+        if subject is not None:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+def _rate_limit_headers(result: RateLimitResult) -> dict:
+    return {
+        "RateLimit-Limit": str(result.limit),
+        "RateLimit-Remaining": str(result.remaining),
+        "RateLimit-Reset": str(result.reset_seconds),
+    }
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing per-caller, per-route rate limits."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: SlidingWindowRateLimiter,
+        rule_for: Callable[[str, str], Optional[RateLimitRule]],
+        identify: Callable[[Scope], str] = client_identity,
+        max_body_size: int = 1_000_000,
+    ):
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            limiter: The rate limiter.
+            rule_for: Returns the rule for a request's method and path, or
+                None for requests that aren't limited.
+            identify: Returns the caller identity of a request.
+            max_body_size: Requests to rules with a `cost` and a larger body
+                are rejected with 413, as the body is read to weigh them.
+        """
+        self.app = app
+        self.limiter = limiter
+        self.rule_for = rule_for
+        self.identify = identify
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = self.rule_for(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        cost = 1
+        if rule.cost is not None:
+            body = await read_body(receive, self.max_body_size)
+            if body is None:
+                response = JSONResponse({"detail": "Request body too large."}, status_code=413)
+                await response(scope, receive, send)
+                return
+            cost = max(1, rule.cost(body))
+            receive = replay_body(body, receive)
+
+        identity = self.identify(scope)
+        if self.limiter.store.blocking:
+            result = await anyio.to_thread.run_sync(self.limiter.check, identity, rule, cost)
+        else:
+            result = self.limiter.check(identity, rule, cost)
+        headers = _rate_limit_headers(result)
+        if not result.allowed:
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded. Please retry later."},
+                status_code=429,
+                headers={**headers, "Retry-After": str(result.reset_seconds)},
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                for name, value in headers.items():
+                    response_headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,160 @@
+"""
+Text rendering of briefings.
+
+Templates use the `str.format` syntax. They are parsed once, when they are
+created, so that a malformed template fails at startup rather than on the
+first briefing, and rendering only looks up and formats the fields.
+Renderers turn BriefingResponse objects into plain text, Markdown or JSON
+lines, and can stream any number of briefings to a file handle without
+holding them all in memory.
+"""
+import re
+import string
+from typing import Any, Iterable, List, Mapping, Optional, TextIO, Tuple, Union
+
+from .models import BriefingResponse
+
+# The name a replacement field looks up in the values, before any attribute
+# or index access, e.g. "user" for "{user.name}" or "{user[name]}".
+_FIELD_ROOT = re.compile(r"[^.\[]*")
+
+# Resolves attribute and index access, e.g. "{user.name}", and conversions.
+_FORMATTER = string.Formatter()
+
+class CompiledTemplate:
+    """A `str.format`-style template that is parsed once and rendered many times."""
+
+    def __init__(self, template: str):
+        """
+        Parses the template.
+
+        Args:
+            template: The template, e.g. "Good morning, {user_name}!".
+
+        Raises:
+            ValueError: If the template is malformed or uses positional fields.
+        """
+        self.template = template
+        fields = set()
+        # (literal text, field name, whether the field is a plain name,
+        # conversion, format spec) per part; a format spec with nested
+        # fields is a template itself.
+        self._parts: List[Tuple[str, Optional[str], bool, Optional[str], Union[str, "CompiledTemplate", None]]] = []
+        for literal, field_name, format_spec, conversion in _FORMATTER.parse(template):
+            plain_name = False
+            if field_name is not None:
+                root = _FIELD_ROOT.match(field_name).group(0)
+                if not root or root.isdigit():
+                    raise ValueError(f"Template fields must be named: {template!r}")
+                fields.add(root)
+                plain_name = field_name == root
+                if "{" in format_spec:
+                    format_spec = CompiledTemplate(format_spec)
+                    fields |= format_spec.fields
+            self._parts.append((literal, field_name, plain_name, conversion, format_spec))
+        self.fields = frozenset(fields)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """
+        Renders the template.
+
+        Args:
+            values: The field values, keyed by field name.
+
+        Returns:
+            The rendered text.
+
+        Raises:
+            KeyError: If a field of the template is missing from `values`.
+        """
+        rendered = []
+        for literal, field_name, plain_name, conversion, format_spec in self._parts:
+            rendered.append(literal)
+            if field_name is None:
+                continue
+            if plain_name:
+                value = values[field_name]
+            else:
+                value, _ = _FORMATTER.get_field(field_name, (), values)
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            if isinstance(format_spec, CompiledTemplate):
+                format_spec = format_spec.render(values)
+            rendered.append(format(value, format_spec))
+        return "".join(rendered)
+
+PLAIN_TEMPLATE = CompiledTemplate(
+    "Good morning, {user_name}! {weather_summary} "
+    "Your latest post is titled: '{latest_post_title}'."
+)
+
+MARKDOWN_TEMPLATE = CompiledTemplate(
+    "## Good morning, {user_name}!\n"
+    "\n"
+    "- **Weather in {city}:** {weather_summary}\n"
+    "- **Latest post:** {latest_post_title}\n"
+)
+
+class BriefingRenderer:
+    """Renders briefings in one output format."""
+
+    FORMATS = ("plain", "markdown", "jsonl")
+
+    def __init__(self, output_format: str = "plain"):
+        """
+        Initializes the renderer.
+
+        Args:
+            output_format: One of "plain", "markdown" or "jsonl".
+
+        Raises:
+            ValueError: If the output format is not supported.
+        """
+        if output_format not in self.FORMATS:
+            raise ValueError(
+                f"Unsupported output format '{output_format}'. Choose one of: {', '.join(self.FORMATS)}."
+            )
+        self.output_format = output_format
+        self._template = {"plain": PLAIN_TEMPLATE, "markdown": MARKDOWN_TEMPLATE}.get(output_format)
+
+    def render(self, briefing: BriefingResponse) -> str:
+        """
+        Renders a single briefing, without a trailing separator.
+
+        Args:
+            briefing: The briefing to render.
+
+        Returns:
+            The rendered briefing.
+        """
+        if self._template is None:
+            return briefing.model_dump_json()
+        return self._template.render(vars(briefing))
+
+    def write_many(self, briefings: Iterable[BriefingResponse], fh: TextIO) -> int:
+        """
+        Streams briefings to a file handle as they are produced.
+
+        Each briefing is rendered and written as soon as the iterable yields
+        it, so a generator producing briefings on demand keeps memory use flat
+        however many briefings are written.
+
+        Args:
+            briefings: The briefings to write; typically a generator.
+            fh: A text file handle, e.g. an open file or sys.stdout.
+
+        Returns:
+            The number of briefings written.
+        """
+        # Plain text and JSON lines hold one briefing per line. Markdown
+        # briefings already end with a newline and are separated by a blank line.
+        markdown = self.output_format == "markdown"
+        count = 0
+        for briefing in briefings:
+            if markdown and count:
+                fh.write("\n")
+            fh.write(self.render(briefing))
+            if not markdown:
+                fh.write("\n")
+            count += 1
+        return count
@@ -0,0 +1,34 @@
+"""
+Helpers for ASGI middleware that need the request body before the endpoint.
+"""
+from typing import Optional
+
+from starlette.types import Message, Receive
+
+async def read_body(receive: Receive, max_size: int) -> Optional[bytes]:
+    """Reads the request body, or returns None as soon as it exceeds `max_size` bytes."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if size > max_size:
+            return None
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+def replay_body(body: bytes, receive: Receive) -> Receive:
+    """Returns a receive callable delivering the already read body, then the original messages."""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+    return replay
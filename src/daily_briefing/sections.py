@@ -0,0 +1,184 @@
+"""
+Pluggable sections of a daily briefing.
+
+A briefing is assembled from sections. Each section declares the data sources
+it needs (e.g. the user record or the user's posts), and the DailyBriefing
+orchestrator fetches every required source exactly once, in parallel wherever
+the dependencies between sources allow it, before rendering the sections.
+
+To add a section, subclass BriefingSection and, if it needs data that is not
+fetched yet, register a DataSource for it:
+
+    class AlbumCountSection(BriefingSection):
+        name = "album_count"
+        requires = ("albums",)
+        fallback = 0
+
+        def render(self, context, data):
+            return len(data["albums"] or [])
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from .models import WeatherInfo
+from .rendering import CompiledTemplate
+
+if TYPE_CHECKING:
+    from .api_interactions import JSONPlaceholderClient
+    from .weather_client import OpenWeatherClient
+
+@dataclass(frozen=True)
+class BriefingContext:
+    """The clients and parameters of a single briefing being generated."""
+    api_client: "JSONPlaceholderClient"
+    weather_client: "OpenWeatherClient"
+    user_id: int
+    city: str
+
+@dataclass(frozen=True)
+class DataSource:
+    """
+    A named upstream fetch that one or more sections can depend on.
+
+    Attributes:
+        name: The unique name sections use to refer to this source.
+        bind: Returns the callable and positional arguments performing the
+            fetch for a briefing. The results of the sources listed in
+            `requires` are appended to these arguments.
+        requires: Names of the sources whose results this fetch needs.
+        scope: Whether the data belongs to the user ("user") or to the city
+            ("city"). Used to invalidate cached briefings when it changes.
+    """
+    name: str
+    bind: Callable[[BriefingContext], Tuple[Callable[..., Any], tuple]]
+    requires: Tuple[str, ...] = ()
+    scope: str = "user"
+
+    def scope_key(self, context: BriefingContext) -> Any:
+        """Returns the user ID or city this source's data belongs to."""
+        return context.city if self.scope == "city" else context.user_id
+
+class BriefingSection(ABC):
+    """
+    Base class for a section of the briefing.
+
+    Attributes:
+        name: The key of the rendered value. Names matching a BriefingResponse
+            field fill that field; all others are returned under `sections`.
+        requires: Names of the data sources the section needs.
+        critical: If True, the briefing fails when the section's data is missing.
+        timeout: Seconds to wait for the section's data, counted from the start
+            of the briefing. None waits until the fetch completes.
+        fallback: Value used when the data of a non-critical section could not
+            be retrieved in time.
+    """
+    name: str = ""
+    requires: Tuple[str, ...] = ()
+    critical: bool = False
+    timeout: Optional[float] = None
+    fallback: Any = None
+
+    @abstractmethod
+    def render(self, context: BriefingContext, data: Dict[str, Any]) -> Any:
+        """
+        Renders the section from the fetched data.
+
+        Args:
+            context: The briefing being generated.
+            data: The results of the required data sources, keyed by name.
+                A source that failed or did not complete in time maps to None.
+
+        Returns:
+            The section's value.
+        """
+
+# --- Data sources ---
+
+def _comments_for_latest_post(api_client: "JSONPlaceholderClient", posts: Optional[List[Dict[str, Any]]]):
+    """Fetches the comments of the user's latest post, if there is one."""
+    if not posts:
+        return None
+    return api_client.get_comments_for_post(posts[0]['id'])
+
+DEFAULT_DATA_SOURCES: Dict[str, DataSource] = {
+    source.name: source for source in (
+        DataSource("user", lambda ctx: (ctx.api_client.get_user, (ctx.user_id,))),
+        DataSource("posts", lambda ctx: (ctx.api_client.get_posts_by_user, (ctx.user_id,))),
+        DataSource("weather", lambda ctx: (ctx.weather_client.get_weather, (ctx.city,)), scope="city"),
+        DataSource("todos", lambda ctx: (ctx.api_client.get_todos_by_user, (ctx.user_id,))),
+        DataSource(
+            "comments",
+            lambda ctx: (_comments_for_latest_post, (ctx.api_client,)),
+            requires=("posts",),
+        ),
+    )
+}
+
+# --- Sections ---
+
+WEATHER_SUMMARY_TEMPLATE = CompiledTemplate(
+    "The current weather in {city} is {description}. "
+    "It's {temperature}°C, but feels like {feels_like}°C."
+)
+
+def format_weather_summary(weather_info: Optional[WeatherInfo]) -> str:
+    """Creates a human-readable weather summary string."""
+    if not weather_info:
+        return WeatherSummarySection.fallback
+    return WEATHER_SUMMARY_TEMPLATE.render(vars(weather_info))
+
+class UserNameSection(BriefingSection):
+    """The user's name. Without a user there is no briefing."""
+    name = "user_name"
+    requires = ("user",)
+    critical = True
+
+    def render(self, context: BriefingContext, data: Dict[str, Any]) -> str:
+        user_info = data["user"]
+        if not user_info:
+            raise ValueError(f"User with ID {context.user_id} not found.")
+        return user_info.get('name', 'N/A')
+
+class WeatherSummarySection(BriefingSection):
+    """A human-readable summary of the current weather in the city."""
+    name = "weather_summary"
+    requires = ("weather",)
+    fallback = "Weather data not available."
+
+    def render(self, context: BriefingContext, data: Dict[str, Any]) -> str:
+        return format_weather_summary(data["weather"])
+
+class LatestPostSection(BriefingSection):
+    """The title of the user's latest post."""
+    name = "latest_post_title"
+    requires = ("posts",)
+    fallback = "No new posts."
+
+    def render(self, context: BriefingContext, data: Dict[str, Any]) -> str:
+        user_posts = data["posts"]
+        return user_posts[0]['title'] if user_posts else self.fallback
+
+class LatestPostCommentsSection(BriefingSection):
+    """The number of comments on the user's latest post."""
+    name = "latest_post_comments"
+    requires = ("comments",)
+    fallback = 0
+
+    def render(self, context: BriefingContext, data: Dict[str, Any]) -> int:
+        return len(data["comments"] or [])
+
+class OpenTodosSection(BriefingSection):
+    """The number of the user's todos that are not completed yet."""
+    name = "open_todos"
+    requires = ("todos",)
+    fallback = 0
+
+    def render(self, context: BriefingContext, data: Dict[str, Any]) -> int:
+        return sum(1 for todo in data["todos"] or [] if not todo.get('completed'))
+
+DEFAULT_SECTIONS: Tuple[BriefingSection, ...] = (
+    UserNameSection(),
+    WeatherSummarySection(),
+    LatestPostSection(),
+)
@@ -0,0 +1,303 @@
+"""
+Lightweight tracing of the briefing pipeline.
+
+A trace is a tree of spans, each timing one step of handling a request: the
+HTTP request itself, the briefing generation, every upstream call and the
+database writes. The current span is kept in a context variable, so nested
+spans find their parent automatically. Work submitted to a thread pool
+inherits it through `bind_context`. Outbound HTTP requests carry it in a W3C
+`traceparent` header, and incoming `traceparent` headers are continued, so a
+trace can span several services.
+
+Finished spans are handed to an exporter. Tracing is off unless one is
+configured, either with `configure()` or through the TRACING_EXPORT
+environment variable: "file:<path>" appends one JSON object per span to a
+file, and "memory" keeps the spans in memory as a stand-in for a collector.
+When tracing is off, spans cost a context variable lookup. `shutdown()`
+writes out the spans still pending and closes the exporter.
+"""
+import contextvars
+import functools
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Starlette is only needed by the middleware, not by the CLI.
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+@dataclass
+class Span:
+    """One timed step of a trace."""
+    name: str
+    trace_id: str   # 32 hex digits, shared by all spans of a trace
+    span_id: str    # 16 hex digits
+    parent_id: Optional[str]
+    start_time_ns: int
+    end_time_ns: Optional[int] = None
+    status: str = "ok"
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+class SpanExporter(ABC):
+    """Receives finished spans."""
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Exports a finished span. Must be thread-safe and must not raise."""
+
+    def close(self) -> None:
+        """Exports the pending spans and releases the exporter's resources."""
+
+_STOP = object()
+
+class JsonlFileExporter(SpanExporter):
+    """
+    Appends every finished span as a JSON line to a file.
+
+    `export` only queues the span, as it is called on the event loop; a
+    background thread, started with the first span, encodes and writes them.
+    When the queue is full, spans are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, path: str, max_queue_size: int = 10_000):
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    # A daemon, so that it never keeps the process alive;
+                    # close() writes out the pending spans.
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                span = self._queue.get()
+                if span is _STOP:
+                    break
+                file.write(json.dumps({**asdict(span), "duration_ms": span.duration_ms}, default=str) + "\n")
+                # Flushed when the queue runs empty, not after every span.
+                if self._queue.empty():
+                    file.flush()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Writes the pending spans and closes the file.
+
+        Args:
+            timeout: How long to wait for the pending spans to be written.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent finished spans in memory, e.g. for tests."""
+
+    def __init__(self, max_spans: int = 10_000):
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+_exporter: Optional[SpanExporter] = None
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+def configure(exporter: Optional[SpanExporter]) -> None:
+    """Sets the exporter of finished spans, closing the previous one. None turns tracing off."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter:
+        previous.close()
+
+def configure_from_env() -> None:
+    """Configures the exporter from the TRACING_EXPORT environment variable."""
+    setting = os.getenv("TRACING_EXPORT", "")
+    if setting.startswith("file:"):
+        configure(JsonlFileExporter(setting[len("file:"):]))
+    elif setting == "memory":
+        configure(InMemoryExporter())
+    else:
+        configure(None)
+
+def shutdown() -> None:
+    """Exports the pending spans and closes the exporter, e.g. when the application stops."""
+    exporter = _exporter
+    if exporter is not None:
+        exporter.close()
+
+def is_enabled() -> bool:
+    return _exporter is not None
+
+def current_span() -> Optional[Span]:
+    """Returns the span of the running step, if any."""
+    return _current_span.get()
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Parses a W3C traceparent header.
+
+    Returns:
+        The (trace_id, parent span_id), or None if the header is missing or malformed.
+    """
+    match = TRACEPARENT_PATTERN.match((header or "").strip().lower())
+    if match is None or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+@contextmanager
+def start_span(name: str, remote_parent: Optional[Tuple[str, str]] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Times the `with` block as a span, a child of the current span.
+
+    Args:
+        name: The name of the step, e.g. "get_user".
+        remote_parent: The (trace_id, span_id) of a parent in another
+            service, used when there is no current span.
+        **attributes: Attributes recorded with the span.
+
+    Yields:
+        The Span, or None when tracing is off.
+    """
+    if _exporter is None:
+        yield None
+        return
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    elif remote_parent is not None:
+        trace_id, parent_id = remote_parent
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+    span = Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent_id,
+        start_time_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.set_attribute("error", repr(e))
+        raise
+    finally:
+        span.end_time_ns = time.time_ns()
+        _current_span.reset(token)
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(span)
+
+def traced(name: str) -> Callable:
+    """Decorator running every call of a function in a span of the given name."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def bind_context(func: Callable) -> Callable:
+    """
+    Binds a function to a copy of the current context, so that spans it
+    starts in another thread (e.g. in a ThreadPoolExecutor) are children of
+    the current span. Call it once per submitted task.
+
+    Returns:
+        The function itself when tracing is off.
+    """
+    if _exporter is None:
+        return func
+    return functools.partial(contextvars.copy_context().run, func)
+
+def outbound_headers() -> Dict[str, str]:
+    """Returns the headers propagating the current span to an outbound HTTP request."""
+    span = _current_span.get()
+    if span is None:
+        return {}
+    return {"traceparent": f"00-{span.trace_id}-{span.span_id}-01"}
+
+class TracingMiddleware:
+    """ASGI middleware running every HTTP request in a root span."""
+
+    def __init__(self, app: "ASGIApp"):
+        self.app = app
+
+    async def __call__(self, scope: "Scope", receive: "Receive", send: "Send") -> None:
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+        from starlette.datastructures import Headers, MutableHeaders
+
+        remote_parent = parse_traceparent(Headers(scope=scope).get("traceparent"))
+        with start_span("http.request", remote_parent=remote_parent, method=scope["method"]) as span:
+
+            async def send_with_trace_id(message: "Message") -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("status", message["status"])
+                    # Lets clients quote the trace of a slow response.
+                    MutableHeaders(scope=message)["X-Trace-Id"] = span.trace_id
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = scope.get("route")
+                span.name = f"{scope['method']} {getattr(route, 'path', None) or 'unrouted'}"
+
+configure_from_env()
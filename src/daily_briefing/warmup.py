@@ -0,0 +1,137 @@
+"""
+Warm-up of a freshly started API process.
+
+Right after a deploy, the first requests would otherwise pay for opening
+database connections, the TLS handshakes to the upstream APIs, loading the
+bcrypt backend and empty caches. The warm-up runs these steps concurrently
+during startup, before the server accepts requests, within a time budget.
+A failing or slow step is recorded and skipped; it never stops the startup.
+"""
+import concurrent.futures
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import auth
+from .log_queries import get_top_cities
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+@dataclass
+class WarmUpStep:
+    """The outcome of one warm-up step."""
+    name: str
+    status: str = "pending"  # "ok", "failed" or "timed out"
+    duration_seconds: Optional[float] = None
+    detail: str = ""
+
+@dataclass
+class WarmUpReport:
+    """The outcome of the warm-up, kept on `app.state.warm_up`."""
+    steps: Dict[str, WarmUpStep] = field(default_factory=dict)
+    finished: bool = False
+    duration_seconds: Optional[float] = None
+
+def run_warm_up(steps: Dict[str, Callable[[], str]], timeout: float) -> WarmUpReport:
+    """
+    Runs warm-up steps concurrently and waits for them up to a timeout.
+
+    Args:
+        steps: The steps by name. Each returns a short description of what it did.
+        timeout: How long to wait for all steps, in seconds. Steps still
+            running afterwards are left to finish in the background, on
+            daemon threads, so that they never keep the process from exiting.
+
+    Returns:
+        The WarmUpReport.
+    """
+    report = WarmUpReport(steps={name: WarmUpStep(name) for name in steps})
+    start = time.perf_counter()
+
+    def run(name: str, step: Callable[[], str]) -> None:
+        step_start = time.perf_counter()
+        result = report.steps[name]
+        try:
+            result.detail = step()
+            result.status = "ok"
+        except Exception as e:
+            result.detail = str(e)
+            result.status = "failed"
+            logging.warning(f"Warm-up step {name} failed: {e}")
+        finally:
+            result.duration_seconds = time.perf_counter() - step_start
+
+    threads = [
+        threading.Thread(target=run, args=(name, step), name=f"warm-up-{name}", daemon=True)
+        for name, step in steps.items()
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    for result in report.steps.values():
+        if result.status == "pending":
+            result.status = "timed out"
+            logging.warning(f"Warm-up step {result.name} did not finish within {timeout} seconds.")
+    report.duration_seconds = time.perf_counter() - start
+    report.finished = True
+    return report
+
+# --- Steps ---
+
+def open_db_connections(engine: Engine, count: int) -> str:
+    """Opens `count` database connections at once, leaving them in the engine's pool."""
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return f"opened {len(connections)} connections"
+
+def preconnect_upstreams(*clients: Any) -> str:
+    """Opens a connection to the API of each client."""
+    for client in clients:
+        client.preconnect()
+    return f"connected to {len(clients)} upstream APIs"
+
+def load_password_hashing() -> str:
+    """Loads the bcrypt backend, which happens on the first login otherwise."""
+    auth.get_password_hash("warm-up")
+    return "bcrypt loaded"
+
+def prefetch_weather(
+    session_factory: Callable[[], Session],
+    weather_client: Any,
+    top_k: int,
+    days: int = 7,
+) -> str:
+    """
+    Fetches the weather of the cities with the most briefings in the last
+    days, so that it is cached when the first briefings are requested.
+
+    Args:
+        session_factory: Creates a database session.
+        weather_client: The (caching) weather client.
+        top_k: The number of cities.
+        days: How far back to count the briefings.
+    """
+    db = session_factory()
+    try:
+        cities = get_top_cities(db, top_k, created_from=datetime.now(timezone.utc) - timedelta(days=days))
+    finally:
+        db.close()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(8, len(cities)))) as executor:
+        fetched = sum(weather is not None for weather in executor.map(weather_client.get_weather, cities))
+    return f"fetched the weather of {fetched} of {len(cities)} cities"
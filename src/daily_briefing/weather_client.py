@@ -10,6 +10,9 @@ from typing import Optional
 import requests
 
 from .config_reader import ConfigReader
+from .http_session import create_session, preconnect
+from .metrics import timed_upstream_call
+from .tracing import outbound_headers, traced
 from .models import WeatherInfo
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,7 +30,20 @@ class OpenWeatherClient:
         """        
         self.base_url = base_url
         self.api_key = config_reader.get_api_key("openweathermap")
+        # Reuses connections across requests, and threads.
+        self.session = create_session()
 
+    def preconnect(self) -> None:
+        """
+        Opens a connection to the API ahead of the first request.
+
+        Raises:
+            requests.exceptions.RequestException: If the API cannot be reached.
+        """
+        preconnect(self.session, self.base_url)
+
+    @timed_upstream_call("get_weather")
+    @traced("get_weather")
     def get_weather(self, city: str, country_code: str = 'PL') -> Optional[WeatherInfo]:
         """
         Fetches the current weather for a given city.
@@ -46,7 +62,7 @@ class OpenWeatherClient:
         }
         logging.info(f"Fetching weather for {params['q']} from {self.base_url}/weather...")
         try:
-            response = requests.get(f"{self.base_url}/weather", params=params, timeout=10)
+            response = self.session.get(f"{self.base_url}/weather", params=params, headers=outbound_headers(), timeout=10)
             response.raise_for_status()
             weather = response.json()
             # Example API response:
@@ -94,7 +110,8 @@ class OpenWeatherClient:
                 temperature=weather['main']['temp'],
                 feels_like=weather['main']['feels_like'],
                 description=weather['weather'][0]['description'],
-                icon_code=weather['weather'][0]['icon']
+                icon_code=weather['weather'][0]['icon'],
+                observed_at=weather.get('dt')
             )
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
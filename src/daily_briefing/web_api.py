@@ -5,19 +5,182 @@ This module is the entry point for the web server and orchestrates the
 entire API functionality, including routing, dependency injection, and
 request/response handling.
 """
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends, status
+import anyio.to_thread
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from . import auth
-from .api_interactions import JSONPlaceholderClient
+from . import auth, health, warmup
+from .admission import AdmissionLane, AdmissionMiddleware, fit_to_thread_limit
+from .briefing_store import MaterializedBriefing, MaterializedBriefingStore
+from .cache import CachedCalls, SharedCache, TTLCache
+from .compression import CompressionMiddleware
 from .config_reader import ConfigReader
-from .daily_briefing_app import DailyBriefing
-from .database import SessionLocal, create_db_and_tables, BriefingLog as BriefingLogModel
-from .models import BriefingResponse, BriefingLog as BriefingLogSchema
-from .weather_client import OpenWeatherClient
+from .daily_briefing_app import BriefingWatermark, DailyBriefing
+from .idempotency import IdempotencyMiddleware, StoredResponse
+from .log_queries import EXPORT_FORMATS, delete_logs, encode_logs_export, get_logs_page, iter_log_rows
+from .log_writer import BufferedLogWriter
+from .metrics import DB_COMMIT_DURATION, REGISTRY, CallbackGauge, MetricsMiddleware
+from . import tracing
+from .tracing import TracingMiddleware
+from .profiler import ProfilerBusyError, profile
+from .rate_limit import RateLimitMiddleware, RateLimitRule, SharedRateLimitStore, SlidingWindowRateLimiter
+from . import database
+from .database import create_db_and_tables, BriefingLog as BriefingLogModel
+from .models import (
+    BriefingBatchRequest,
+    BriefingBatchResponse,
+    BriefingBatchResult,
+    BriefingDelta,
+    BriefingResponse,
+    BriefingLog as BriefingLogSchema,
+    BulkDeleteLogsRequest,
+    BulkDeleteLogsResult,
+    WeatherInfo,
+)
+
+# The HTTP clients, and with them the requests library, are imported when the
+# first client is created, so importing the API stays fast. The application
+# uses them through CachedCalls wrappers.
+
+# --- Application-scoped Objects ---
+# The configuration, the clients, the DailyBriefing and the briefing store are
+# created once per application and kept on `app.state`, instead of being
+# rebuilt (and config.ini re-read) on every request.
+
+_app_state_lock = threading.Lock()
+
+def _app_singleton(app: FastAPI, name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Returns the object stored on `app.state` under `name`, creating it with
+    `factory` on first use.
+    """
+    instance = getattr(app.state, name, None)
+    if instance is None:
+        with _app_state_lock:
+            instance = getattr(app.state, name, None)
+            if instance is None:
+                instance = factory()
+                setattr(app.state, name, instance)
+    return instance
+
+# User and weather lookups are cached, so that briefings of the same user or
+# city reuse them. When SHARED_CACHE_PATH is set, the cache is a SQLite file
+# shared by all worker processes of the host (see the `serve` command), so
+# that adding workers doesn't divide the hit rate; otherwise it is in memory.
+# The materialized briefings, their background refresh, the delta watermarks,
+# the idempotent responses and the rate limits are shared the same way. The
+# DailyBriefing response cache, with its tag-based invalidation, stays per
+# process: it only serves misses of the shared materialized store.
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+WEATHER_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "300"))
+
+UPSTREAM_CACHE = (
+    SharedCache(SHARED_CACHE_PATH, name="upstream_lookups", types=(WeatherInfo,)) if SHARED_CACHE_PATH
+    else TTLCache(max_entries=4096, name="upstream_lookups")
+)
+
+def _create_api_client() -> CachedCalls:
+    from .api_interactions import JSONPlaceholderClient
+    return CachedCalls(JSONPlaceholderClient(), UPSTREAM_CACHE, {"get_user": USER_CACHE_TTL_SECONDS})
+
+def _create_weather_client(config_reader: ConfigReader) -> CachedCalls:
+    from .weather_client import OpenWeatherClient
+    return CachedCalls(
+        OpenWeatherClient(config_reader=config_reader), UPSTREAM_CACHE, {"get_weather": WEATHER_CACHE_TTL_SECONDS}
+    )
+
+def _create_briefing_app(
+    api_client: CachedCalls, weather_client: CachedCalls, store: MaterializedBriefingStore
+) -> DailyBriefing:
+    watermarks = (
+        SharedCache(SHARED_CACHE_PATH, ttl_seconds=24 * 60 * 60, types=(BriefingWatermark,)) if SHARED_CACHE_PATH
+        else None
+    )
+    briefing_app = DailyBriefing(
+        api_client=api_client, weather_client=weather_client, watermarks=watermarks, dependents_ttl=store.ttl_seconds
+    )
+    # Writes and changed inputs also evict the served, materialized briefings.
+    briefing_app.add_invalidation_listener(store.invalidate)
+    return briefing_app
+
+def _create_briefing_store() -> MaterializedBriefingStore:
+    return MaterializedBriefingStore(
+        shared=SharedCache(SHARED_CACHE_PATH, name="shared_briefings") if SHARED_CACHE_PATH else None
+    )
+
+def _briefing_app_for(
+    app: FastAPI, api_client: CachedCalls, weather_client: CachedCalls, store: MaterializedBriefingStore
+) -> DailyBriefing:
+    """
+    Returns the application's DailyBriefing for a pair of clients and the
+    store it invalidates. It is replaced when they change, e.g. because
+    get_api_client, get_weather_client or get_briefing_store is overridden,
+    so that it never uses other ones than it was requested with.
+    """
+    dependencies = (api_client, weather_client, store)
+
+    def current() -> Optional[DailyBriefing]:
+        created_for = getattr(app.state, "briefing_app_clients", None)
+        if created_for is not None and all(a is b for a, b in zip(created_for, dependencies)):
+            return getattr(app.state, "briefing_app", None)
+        return None
+
+    briefing_app = current()
+    if briefing_app is None:
+        with _app_state_lock:
+            briefing_app = current()
+            if briefing_app is None:
+                briefing_app = app.state.briefing_app = _create_briefing_app(*dependencies)
+                app.state.briefing_app_clients = dependencies
+    return briefing_app
+
+def _get_app_briefing_app(app: FastAPI) -> DailyBriefing:
+    """Returns the application's DailyBriefing, creating it and its clients if needed."""
+    config_reader = _app_singleton(app, "config_reader", ConfigReader)
+    api_client = _app_singleton(app, "api_client", _create_api_client)
+    weather_client = _app_singleton(app, "weather_client", lambda: _create_weather_client(config_reader))
+    store = _app_singleton(app, "briefing_store", _create_briefing_store)
+    return _briefing_app_for(app, api_client, weather_client, store)
+
+# Warm-up at startup; see the warmup module. Disabled with WARMUP_ENABLED=false.
+# `serve` creates the tables before starting its workers.
+CREATE_DB_TABLES = os.getenv("CREATE_DB_TABLES", "true").lower() in ("1", "true", "yes")
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "10"))
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "5"))
+WARMUP_TOP_CITIES = int(os.getenv("WARMUP_TOP_CITIES", "10"))
+
+def _warm_up_steps(briefing_app: Optional[DailyBriefing]) -> dict:
+    """Returns the warm-up steps of the application, by name."""
+    steps = {
+        # Connections beyond the pool size would be closed again right away.
+        "database_pool": lambda: warmup.open_db_connections(
+            database.engine, min(WARMUP_DB_CONNECTIONS, database.DB_POOL_SIZE)
+        ),
+        "password_hashing": warmup.load_password_hashing,
+    }
+    if briefing_app is not None:
+        steps["upstream_connections"] = lambda: warmup.preconnect_upstreams(
+            briefing_app.api_client, briefing_app.weather_client
+        )
+        if WARMUP_TOP_CITIES > 0:
+            steps["weather_prefetch"] = lambda: warmup.prefetch_weather(
+                database.SessionLocal, briefing_app.weather_client, WARMUP_TOP_CITIES
+            )
+    return steps
 
 # --- Lifespan Event Handler ---
 @asynccontextmanager
@@ -25,10 +188,44 @@ async def lifespan(app: FastAPI):
     """
     Handles application startup and shutdown events.
     This is the recommended way to manage resources like database tables.
+
+    The server only accepts requests once the startup, including the
+    warm-up, has finished.
     """
-    print("Application startup: Creating database tables...")
-    create_db_and_tables()
+    if CREATE_DB_TABLES:
+        print("Application startup: Creating database tables...")
+        create_db_and_tables()
+    # The thread limiter only exists within the event loop.
+    fit_to_thread_limit(
+        ADMISSION_LANES.values(),
+        anyio.to_thread.current_default_thread_limiter().total_tokens - ADMISSION_RESERVED_THREADS,
+    )
+    try:
+        briefing_app = _get_app_briefing_app(app)
+    except KeyError as e:
+        # Keep serving the endpoints that don't need the weather API; the
+        # clients are created on the first briefing request instead.
+        print(f"Briefing clients could not be created yet: {e}")
+        briefing_app = None
+    if WARMUP_ENABLED:
+        app.state.warm_up = await run_in_threadpool(
+            warmup.run_warm_up, _warm_up_steps(briefing_app), WARMUP_TIMEOUT_SECONDS
+        )
+        print(f"Warm-up finished in {app.state.warm_up.duration_seconds:.2f}s: "
+              + ", ".join(f"{step.name} {step.status}" for step in app.state.warm_up.steps.values()))
+    briefing_store = _app_singleton(app, "briefing_store", _create_briefing_store)
+
+    def refresh_briefing(user_id: int, city: str) -> BriefingResponse:
+        """Regenerates a briefing for the background refresh scheduler."""
+        return _get_app_briefing_app(app).generate_briefing_for_api(user_id=user_id, city=city, use_cache=False)
+
+    briefing_store.start(generate=refresh_briefing)
+    log_writer = _app_singleton(app, "log_writer", lambda: BufferedLogWriter().start())
     yield
+    briefing_store.stop()
+    # Write the buffered log entries and spans before the process exits.
+    log_writer.close()
+    tracing.shutdown()
     print("Application shutdown.")
 
 # Initialize the main FastAPI application object
@@ -39,6 +236,155 @@ api_app = FastAPI(
     lifespan=lifespan
 )
 
+# Responses of POST requests with an Idempotency-Key header are kept for
+# retries. Innermost, so the stored responses are uncompressed and every
+# replay is compressed for the retrying client.
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+IDEMPOTENCY_MAX_BODY_SIZE = int(os.getenv("IDEMPOTENCY_MAX_BODY_SIZE", "1000000"))
+
+api_app.add_middleware(
+    IdempotencyMiddleware,
+    # Shared by the workers if they share a cache, as a retry may reach another worker.
+    store=(
+        SharedCache(SHARED_CACHE_PATH, name="idempotent_responses", types=(StoredResponse,)) if SHARED_CACHE_PATH
+        else TTLCache(
+            ttl_seconds=IDEMPOTENCY_TTL_SECONDS, max_entries=IDEMPOTENCY_MAX_ENTRIES, name="idempotent_responses"
+        )
+    ),
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    max_body_size=IDEMPOTENCY_MAX_BODY_SIZE,
+    # Access tokens never leave the process' memory, and expire with the token.
+    private_paths=("/token",),
+    private_store=TTLCache(max_entries=1000, name="idempotent_responses"),
+    private_ttl_seconds=auth.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+# Responses from this size on are compressed with brotli or gzip, whichever
+# the client prefers. Smaller ones aren't worth the CPU time.
+COMPRESSION_MINIMUM_SIZE = 1000
+
+api_app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+
+# Separate admission lanes, so that overload on one kind of endpoint sheds
+# its own excess requests instead of starving the others. The limits can be
+# overridden through the environment, see AdmissionLane.from_env. At startup,
+# they are scaled down to fit into anyio's worker threads (40 by default),
+# less a few threads for probes, stores and the other endpoints.
+ADMISSION_RESERVED_THREADS = int(os.getenv("ADMISSION_RESERVED_THREADS", "4"))
+
+ADMISSION_LANES = {
+    lane.name: lane
+    for lane in (
+        AdmissionLane.from_env("briefing", max_concurrent=32, max_queue=64, queue_timeout=2),
+        # A batch generates up to 100 briefings, so few of them run at once.
+        AdmissionLane.from_env("briefing_batch", max_concurrent=4, max_queue=8, queue_timeout=2),
+        AdmissionLane.from_env("logs", max_concurrent=8, max_queue=16, queue_timeout=5),
+        AdmissionLane.from_env("auth", max_concurrent=4, max_queue=16, queue_timeout=2),
+    )
+}
+
+def _admission_lane(method: str, path: str) -> Optional[str]:
+    """Returns the admission lane of a request, or None if it isn't limited."""
+    if path == "/briefings":
+        return "briefing_batch"
+    if path.startswith("/briefing"):
+        # Event subscriptions are long-lived but hold no worker thread, so
+        # they are not counted against the briefing lane.
+        return None if path.endswith("/events") else "briefing"
+    if path.startswith("/logs"):
+        return "logs"
+    if path == "/token":
+        return "auth"
+    return None
+
+api_app.add_middleware(AdmissionMiddleware, lanes=ADMISSION_LANES, classify=_admission_lane)
+
+def _batch_size(body: bytes) -> int:
+    """Returns the number of items of a /briefings request body, or 1 if it is malformed."""
+    try:
+        items = json.loads(body).get("items")
+    except (ValueError, AttributeError):
+        return 1
+    return len(items) if isinstance(items, list) else 1
+
+# Per-caller limits, so that a single client can't use up the upstream API
+# quotas or the admission slots of everyone else. Overridable through the
+# environment, see RateLimitRule.from_env.
+RATE_LIMIT_RULES = {
+    rule.name: rule
+    for rule in (
+        RateLimitRule.from_env("briefing", limit=60, window_seconds=60),
+        # Charged per item; a batch of up to 100 items must fit in the limit.
+        RateLimitRule.from_env("briefing_batch", limit=300, window_seconds=60, cost=_batch_size),
+        RateLimitRule.from_env("logs", limit=120, window_seconds=60),
+        RateLimitRule.from_env("auth", limit=10, window_seconds=60),
+    )
+}
+
+def _rate_limit_rule(method: str, path: str) -> Optional[RateLimitRule]:
+    """Returns the rate limit rule of a request, or None if it isn't limited."""
+    if path == "/briefings":
+        return RATE_LIMIT_RULES["briefing_batch"]
+    if path.startswith("/briefing"):
+        return RATE_LIMIT_RULES["briefing"]
+    if path.startswith("/logs"):
+        return RATE_LIMIT_RULES["logs"]
+    if path == "/token":
+        return RATE_LIMIT_RULES["auth"]
+    return None
+
+# Callers over their limit are rejected before they take up an admission slot.
+# The counters are shared by the workers if they share a cache; otherwise
+# every worker allows the full limit.
+api_app.add_middleware(
+    RateLimitMiddleware,
+    limiter=SlidingWindowRateLimiter(
+        store=SharedRateLimitStore(SharedCache(SHARED_CACHE_PATH, name="rate_limits")) if SHARED_CACHE_PATH else None
+    ),
+    rule_for=_rate_limit_rule,
+)
+
+# Added last, so it runs first and also times rejected requests.
+api_app.add_middleware(MetricsMiddleware)
+
+# Outermost, so the root span of a request covers all other middleware.
+api_app.add_middleware(TracingMiddleware)
+
+def _admission_lane_values():
+    for lane in ADMISSION_LANES.values():
+        yield (lane.name, "in_flight"), lane.in_flight
+        yield (lane.name, "waiting"), lane.waiting
+        yield (lane.name, "shed_total"), lane.shed
+
+def _log_writer_values():
+    log_writer = getattr(api_app.state, "log_writer", None)
+    if log_writer is not None:
+        yield ("pending",), log_writer.pending
+        yield ("written_total",), log_writer.written
+        yield ("dropped_total",), log_writer.dropped
+        yield ("failed_total",), log_writer.failed
+
+def _db_pool_values():
+    # Doesn't create the engine: a scrape before the first query reports nothing.
+    engine = database.get_engine(create=False)
+    if engine is not None and hasattr(engine.pool, "checkedout"):
+        yield ("checked_out",), engine.pool.checkedout()
+        yield ("idle",), engine.pool.checkedin()
+        yield ("overflow",), max(engine.pool.overflow(), 0)
+        yield ("capacity",), database.pool_capacity()
+
+REGISTRY.register(CallbackGauge(
+    "db_pool_connections", "Database pool connections by state.", ("state",), _db_pool_values
+))
+REGISTRY.register(CallbackGauge(
+    "admission_lane_requests", "Requests per admission lane and state.", ("lane", "state"), _admission_lane_values
+))
+REGISTRY.register(CallbackGauge(
+    "briefing_log_writer_rows", "Briefing log rows of the background writer by state.", ("state",), _log_writer_values
+))
+
 
 # --- FAKE USER DATABASE (for demonstration) ---
 # In a real app, this would be a user table in the database.
@@ -46,7 +392,9 @@ api_app = FastAPI(
 fake_users_db = {
     "testuser": {
         "username": "testuser",
-        "hashed_password": "$2b$12$oK1WqVEz3K0xgXVFj9s9cOsoZU1wy9/nk/24LeQVhpQImJuFn2LiG"
+        "hashed_password": "$2b$12$oK1WqVEz3K0xgXVFj9s9cOsoZU1wy9/nk/24LeQVhpQImJuFn2LiG",
+        # The scopes the user may request at login.
+        "scopes": [auth.ADMIN_SCOPE],
     }
 }
 
@@ -57,36 +405,151 @@ def get_db():
     """
     FastAPI dependency that provides a database session for a single request.
     Ensures the session is always closed after the request is finished.
+
+    Creating the session is cheap: it only checks out a pooled connection
+    when the endpoint runs its first query, so requests rejected before that,
+    e.g. for a missing token, never wait for or hold a connection.
     """
-    db = SessionLocal()
+    db = database.SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-def get_config_reader() -> ConfigReader:
-    return ConfigReader()
+def get_config_reader(request: Request) -> ConfigReader:
+    return _app_singleton(request.app, "config_reader", ConfigReader)
+
+def get_api_client(request: Request) -> CachedCalls:
+    return _app_singleton(request.app, "api_client", _create_api_client)
 
-def get_api_client() -> JSONPlaceholderClient:
-    return JSONPlaceholderClient()
+def get_weather_client(request: Request, config: ConfigReader = Depends(get_config_reader)) -> CachedCalls:
+    return _app_singleton(request.app, "weather_client", lambda: _create_weather_client(config))
 
-def get_weather_client(config: ConfigReader = Depends(get_config_reader)) -> OpenWeatherClient:
-    return OpenWeatherClient(config_reader=config)
+def get_briefing_store(request: Request) -> MaterializedBriefingStore:
+    return _app_singleton(request.app, "briefing_store", _create_briefing_store)
 
 def get_briefing_app(
-    api_client: JSONPlaceholderClient = Depends(get_api_client),
-    weather_client: OpenWeatherClient = Depends(get_weather_client)
+    request: Request,
+    api_client: CachedCalls = Depends(get_api_client),
+    weather_client: CachedCalls = Depends(get_weather_client),
+    store: MaterializedBriefingStore = Depends(get_briefing_store)
 ) -> DailyBriefing:
-    return DailyBriefing(api_client=api_client, weather_client=weather_client)
+    return _briefing_app_for(request.app, api_client, weather_client, store)
+
+def get_log_writer(request: Request) -> BufferedLogWriter:
+    return _app_singleton(request.app, "log_writer", lambda: BufferedLogWriter().start())
 
 
 # --- API ENDPOINTS ---
 
+@api_app.get("/metrics", response_class=PlainTextResponse, tags=["Monitoring"])
+def get_metrics():
+    """
+    Returns the application metrics in the Prometheus text format: request,
+    upstream call and database latencies, cache hit rates, admission lanes
+    and the log writer.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@api_app.get("/healthz", tags=["Monitoring"])
+async def get_liveness():
+    """
+    Liveness check: succeeds whenever the process is serving requests. Checks
+    no dependencies, so it stays cheap.
+    """
+    return {"status": "ok"}
+
+# How long /readyz waits for the database before reporting it as failed.
+READINESS_DB_TIMEOUT_SECONDS = 2.0
+# The executor is saturated when more requests than this share of its threads wait for one.
+READINESS_MAX_QUEUED_RATIO = float(os.getenv("READINESS_MAX_QUEUED_RATIO", "0.5"))
+
+# The blocking checks of /readyz run on their own threads, so that it still
+# answers when the endpoint worker threads are all busy. One thread runs the
+# database check, the other counts the cache entries.
+_READINESS_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="readiness")
+_database_check: Optional[Future] = None
+_database_check_lock = threading.Lock()
+
+def _start_database_check() -> Future:
+    """
+    Starts a database check, or returns the running one. A check that
+    outlives the probe's timeout is joined by the next probes instead of
+    piling up further threads behind it.
+    """
+    global _database_check
+    with _database_check_lock:
+        if _database_check is None or _database_check.done():
+            _database_check = _READINESS_EXECUTOR.submit(health.check_database, database.engine)
+        return _database_check
+
+@api_app.get("/readyz", tags=["Monitoring"])
+async def get_readiness(request: Request):
+    """
+    Readiness check: 200 if the instance can take more requests, otherwise 503.
+
+    Reports the database connectivity, the connection pool usage, the worker
+    threads and their queue, the log writer buffer, the admission lanes, the
+    warm-up and, for information, the state of the caches.
+    """
+    app = request.app
+    try:
+        database_check = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(_start_database_check())), timeout=READINESS_DB_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        database_check = {"status": health.FAILED, "error": "timed out"}
+    threads = anyio.to_thread.current_default_thread_limiter().statistics()
+    ready, report = health.readiness({
+        "warm_up": health.check_warm_up(getattr(app.state, "warm_up", None)),
+        "database": database_check,
+        "connection_pool": health.check_pool(database.engine.pool, capacity=database.pool_capacity()),
+        "executor": health.check_executor(
+            threads.borrowed_tokens, threads.total_tokens, threads.tasks_waiting, READINESS_MAX_QUEUED_RATIO
+        ),
+        "log_writer": health.check_log_writer(getattr(app.state, "log_writer", None)),
+        "admission": health.check_admission(ADMISSION_LANES.values()),
+    })
+    briefing_store = getattr(app.state, "briefing_store", None)
+    # Counting the entries of a shared cache is a query.
+    report["caches"] = await asyncio.get_running_loop().run_in_executor(_READINESS_EXECUTOR, health.cache_stats, {
+        "upstream_lookups": lambda: len(UPSTREAM_CACHE),
+        **({"materialized_briefings": lambda: len(briefing_store)} if briefing_store is not None else {}),
+    })
+    return JSONResponse(report, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+# Upper bound of a single profile run.
+MAX_PROFILE_SECONDS = 60
+
+@api_app.get("/debug/profile", response_class=PlainTextResponse, tags=["Monitoring"])
+async def get_cpu_profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS, description="How long to sample."),
+    interval_ms: int = Query(10, ge=1, le=1000, description="The time between samples."),
+    idle: bool = Query(False, description="Also count threads waiting for locks, queues or I/O."),
+    threads: bool = Query(False, description="Prefix every stack with its thread name."),
+    current_user: dict = Depends(auth.get_admin_user)
+    ):
+    """
+    (Protected) Samples the stacks of all threads for a number of seconds and
+    returns a collapsed-stack profile, ready for flamegraph.pl or speedscope.
+    Requires a JWT access token granted the admin scope.
+
+    Only one profile runs at a time; concurrent requests get 409 Conflict.
+    """
+    try:
+        collapsed, samples = await run_in_threadpool(
+            profile, seconds, interval=interval_ms / 1000, include_idle=idle, include_thread_names=threads
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return PlainTextResponse(collapsed, headers={"X-Profile-Samples": str(samples)})
+
 @api_app.post("/token", tags=["Authentication"])
 def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Authenticates a user and returns a JWT access token.
-    This is the standard OAuth2 password flow endpoint.
+    This is the standard OAuth2 password flow endpoint. The token is granted
+    the requested scopes the user is allowed, e.g. "admin".
     """    
     user = fake_users_db.get(form_data.username)
     if not user or not auth.verify_password(form_data.password, user["hashed_password"]):
@@ -95,32 +558,61 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user["username"]})
+    scopes = [scope for scope in form_data.scopes if scope in user.get("scopes", [])]
+    access_token = auth.create_access_token(data={"sub": user["username"], "scope": " ".join(scopes)})
     return {"access_token": access_token, "token_type": "bearer"}
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks an If-None-Match header against an ETag, using the weak comparison
+    that RFC 9110 prescribes for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
 @api_app.get("/briefing/{user_id}", response_model=BriefingResponse, tags=["Briefing"])
 def get_user_briefing(
     user_id: int,
     city: str,
-    db: Session = Depends(get_db),
-    app: DailyBriefing = Depends(get_briefing_app)
+    if_none_match: Optional[str] = Header(None),
+    app: DailyBriefing = Depends(get_briefing_app),
+    store: MaterializedBriefingStore = Depends(get_briefing_store),
+    log_writer: BufferedLogWriter = Depends(get_log_writer)
 ):
     """
     Generates and returns a daily briefing for a given user ID and city.
 
     This endpoint orchestrates calls to external services to gather user data,
     weather information, and recent posts, then combines them into a
-    structured response. It also logs the request to the database.
+    structured response. It also logs the request to the database; the log
+    entry is written in the background, so the response doesn't wait for it.
+
+    Briefings are served from the materialized store when a fresh one exists;
+    `generated_at` in the response tells how old it is. On a miss the briefing
+    is generated live and stored, so the background scheduler keeps it fresh
+    for subsequent requests.
+
+    Responses carry an `ETag` of the briefing content and a `Cache-Control`
+    max-age of the time the stored briefing stays fresh. A request whose
+    `If-None-Match` matches the current ETag gets a 304 Not Modified without
+    a body. Stored briefings are sent as the JSON they were serialized to
+    when they were stored.
     """
     try:
-        briefing = app.generate_briefing_for_api(user_id=user_id, city=city)
+        entry = store.get(user_id, city)
+        if entry is None:
+            briefing = app.generate_briefing_for_api(user_id=user_id, city=city)
+            entry = store.put(user_id, city, briefing)
 
         # Log the successful briefing request to the database.       
-        log_entry = BriefingLogModel(user_id=user_id, city=city)
-        db.add(log_entry)
-        db.commit()
+        log_writer.submit(user_id=user_id, city=city)
 
-        return briefing
+        cache_headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={entry.max_age()}"}
+        if _etag_matches(if_none_match, entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+        return Response(content=entry.body, media_type="application/json", headers=cache_headers)
 
     except ValueError as e:
         # This catches specific application errors, like a user not being found.
@@ -129,18 +621,309 @@ def get_user_briefing(
         # It's good practice to have a catch-all for unexpected errors.
         raise HTTPException(status_code=500, detail="An unexpected server error occurred: {e}.")
 
+def _batch_results(
+    batch: BriefingBatchRequest,
+    app: DailyBriefing,
+    store: MaterializedBriefingStore,
+    log_writer: BufferedLogWriter,
+) -> Iterator[BriefingBatchResult]:
+    """
+    Yields the result of every item of a batch as soon as it is available,
+    and logs the successful ones together once the batch is done.
+    """
+    served: List[Tuple[int, str]] = []
+    missing: List[int] = []
+    try:
+        for index, item in enumerate(batch.items):
+            entry = store.get(item.user_id, item.city)
+            if entry is None:
+                missing.append(index)
+                continue
+            served.append((item.user_id, item.city))
+            yield BriefingBatchResult(
+                index=index, user_id=item.user_id, city=item.city, status_code=200, briefing=entry.briefing
+            )
+
+        requests = [(batch.items[index].user_id, batch.items[index].city) for index in missing]
+        for position, briefing, error in app.generate_briefings(requests):
+            index = missing[position]
+            user_id, city = requests[position]
+            if error is None:
+                store.put(user_id, city, briefing)
+                served.append((user_id, city))
+                yield BriefingBatchResult(index=index, user_id=user_id, city=city, status_code=200, briefing=briefing)
+            elif isinstance(error, ValueError):
+                yield BriefingBatchResult(index=index, user_id=user_id, city=city, status_code=404, error=str(error))
+            else:
+                yield BriefingBatchResult(
+                    index=index,
+                    user_id=user_id,
+                    city=city,
+                    status_code=500,
+                    error=f"An unexpected server error occurred: {error}.",
+                )
+    finally:
+        # One bulk insert for the whole batch.
+        log_writer.submit_many(served)
+
+@api_app.post("/briefings", response_model=BriefingBatchResponse, tags=["Briefing"])
+def get_user_briefings(
+    batch: BriefingBatchRequest,
+    stream: bool = Query(False, description="Stream the results as NDJSON, in completion order."),
+    app: DailyBriefing = Depends(get_briefing_app),
+    store: MaterializedBriefingStore = Depends(get_briefing_store),
+    log_writer: BufferedLogWriter = Depends(get_log_writer)
+):
+    """
+    Generates the briefings of up to 100 (user_id, city) pairs in one request.
+
+    Briefings are served from the materialized store where possible; the
+    others are generated concurrently, fetching each city's weather once for
+    the whole batch. Every item gets its own result with a status code, so
+    one unknown user doesn't fail the others. All successful briefings are
+    logged together in one bulk insert.
+
+    With `stream=true` the results are sent as NDJSON, one line per item as
+    soon as it completes; otherwise they are returned in request order.
+    """
+    results = _batch_results(batch, app, store, log_writer)
+    if stream:
+        return StreamingResponse(
+            (result.model_dump_json() + "\n" for result in results),
+            media_type="application/x-ndjson",
+        )
+    return BriefingBatchResponse(results=sorted(results, key=lambda result: result.index))
+
+@api_app.get("/briefing/{user_id}/changes", response_model=BriefingDelta, tags=["Briefing"])
+def get_user_briefing_changes(
+    user_id: int,
+    city: str,
+    app: DailyBriefing = Depends(get_briefing_app),
+    log_writer: BufferedLogWriter = Depends(get_log_writer)
+):
+    """
+    Returns only what changed since the user's previous call to this endpoint:
+    new posts, and the weather if there is a newer observation.
+
+    The first call for a user returns everything currently available. Frequent
+    pollers get much smaller responses and cause fewer upstream fetches than
+    with the full /briefing endpoint.
+    """
+    try:
+        delta = app.generate_briefing_delta(user_id=user_id, city=city)
+
+        log_writer.submit(user_id=user_id, city=city)
+
+        return delta
+
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred: {e}.")
+
+# How often a briefing subscription checks the store for a new version, and
+# how often it sends a keep-alive comment when nothing changed.
+EVENTS_POLL_INTERVAL_SECONDS = 1.0
+EVENTS_KEEPALIVE_SECONDS = 15.0
+
+async def _current_briefing(
+    user_id: int, city: str, app: DailyBriefing, store: MaterializedBriefingStore
+) -> MaterializedBriefing:
+    """Returns the stored briefing, generating and storing it on a miss."""
+    # In the threadpool, as the store may read and write the shared cache file.
+    entry = await run_in_threadpool(store.get, user_id, city)
+    if entry is None:
+        briefing = await run_in_threadpool(app.generate_briefing_for_api, user_id=user_id, city=city)
+        entry = await run_in_threadpool(store.put, user_id, city, briefing)
+    return entry
+
+def _briefing_event(entry: MaterializedBriefing) -> str:
+    """Formats a stored briefing as a server-sent event."""
+    return f"event: briefing\nid: {entry.etag}\ndata: {entry.body.decode()}\n\n"
+
+async def _briefing_events(
+    request: Request,
+    user_id: int,
+    city: str,
+    app: DailyBriefing,
+    store: MaterializedBriefingStore,
+    entry: MaterializedBriefing,
+    last_etag: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Yields a server-sent event whenever the stored briefing changes, until
+    the client disconnects.
+
+    Reading the store every poll also keeps the entry active, so the
+    background scheduler keeps refreshing it while someone is subscribed.
+    """
+    idle = 0.0
+    while True:
+        if entry.etag != last_etag:
+            last_etag = entry.etag
+            idle = 0.0
+            yield _briefing_event(entry)
+        elif idle >= EVENTS_KEEPALIVE_SECONDS:
+            idle = 0.0
+            # A comment line keeps proxies from closing an idle connection.
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(EVENTS_POLL_INTERVAL_SECONDS)
+        idle += EVENTS_POLL_INTERVAL_SECONDS
+        if await request.is_disconnected():
+            return
+        try:
+            entry = await _current_briefing(user_id, city, app, store)
+        except Exception as e:
+            # Keep the subscription; the next poll tries again.
+            print(f"Briefing for user {user_id} in {city} could not be refreshed: {e}")
+
+@api_app.get("/briefing/{user_id}/events", tags=["Briefing"])
+async def subscribe_to_user_briefing(
+    request: Request,
+    user_id: int,
+    city: str,
+    last_event_id: Optional[str] = Header(None),
+    app: DailyBriefing = Depends(get_briefing_app),
+    store: MaterializedBriefingStore = Depends(get_briefing_store),
+    log_writer: BufferedLogWriter = Depends(get_log_writer)
+):
+    """
+    Subscribes to a user's briefing as a stream of server-sent events.
+
+    The current briefing is sent right away, and then again only when its
+    content changes, e.g. after a new post or a new weather observation, as
+    picked up by the background refresh of the materialized store. Each
+    event's `id` is the briefing's ETag; a reconnecting client sending it as
+    `Last-Event-ID` doesn't get the unchanged briefing again. One connection
+    replaces polling /briefing/{user_id} on a timer.
+    """
+    try:
+        entry = await _current_briefing(user_id, city, app, store)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    log_writer.submit(user_id=user_id, city=city)
+    return StreamingResponse(
+        _briefing_events(request, user_id, city, app, store, entry, last_etag=last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# The largest page /logs returns, however many entries the client asks for.
+MAX_LOGS_PAGE_SIZE = 500
+
 @api_app.get("/logs", response_model=list[BriefingLogSchema], tags=["Logs"])
 def get_all_logs(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_LOGS_PAGE_SIZE, description="Maximum number of entries to return."),
+    cursor: Optional[str] = Query(None, description="The X-Next-Cursor of the previous page."),
+    user_id: Optional[int] = Query(None, description="Only return logs of this user."),
+    city: Optional[str] = Query(None, description="Only return logs for this city."),
+    created_from: Optional[datetime] = Query(None, description="Only return logs created at or after this time."),
+    created_to: Optional[datetime] = Query(None, description="Only return logs created before this time."),
     db: Session = Depends(get_db),
     current_user: dict = Depends(auth.get_current_user)
     ):
     """
-    (Protected) Retrieves all briefing log entries from the database.
+    (Protected) Retrieves briefing log entries from the database, newest first,
+    one page at a time.
     Requires a valid JWT access token.
+
+    If there are more entries, the response carries an `X-Next-Cursor` header
+    (and a matching `Link: rel="next"` header). Pass its value as `cursor`,
+    together with the same filters, to get the next page.
     """
-    logs = db.query(BriefingLogModel).all()
+    try:
+        logs, next_cursor = get_logs_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            user_id=user_id,
+            city=city,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
     return logs
 
+# Rows fetched from the database at once while exporting.
+EXPORT_FETCH_SIZE = 1000
+
+@api_app.get("/logs/export", tags=["Logs"])
+def export_logs(
+    export_format: str = Query(
+        "ndjson", alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$", description="ndjson or csv."
+    ),
+    compress: bool = Query(False, alias="gzip", description="Gzip-compress the export."),
+    user_id: Optional[int] = Query(None, description="Only export logs of this user."),
+    city: Optional[str] = Query(None, description="Only export logs for this city."),
+    created_from: Optional[datetime] = Query(None, description="Only export logs created at or after this time."),
+    created_to: Optional[datetime] = Query(None, description="Only export logs created before this time."),
+    current_user: dict = Depends(auth.get_current_user)
+    ):
+    """
+    (Protected) Streams all matching briefing log entries, oldest first, as
+    NDJSON or CSV, optionally gzip-compressed.
+    Requires a valid JWT access token.
+
+    Rows are read through a server-side cursor and sent as they are encoded,
+    so memory use stays flat however large the table is.
+    """
+    def generate():
+        # The stream outlives the endpoint function, so it uses its own
+        # session instead of the request-scoped one from get_db.
+        db = database.SessionLocal()
+        try:
+            chunks = iter_log_rows(
+                db,
+                fetch_size=EXPORT_FETCH_SIZE,
+                user_id=user_id,
+                city=city,
+                created_from=created_from,
+                created_to=created_to,
+            )
+            yield from encode_logs_export(chunks, export_format=export_format, compress=compress)
+        finally:
+            db.close()
+
+    filename = f"briefing_logs.{export_format}" + (".gz" if compress else "")
+    media_type = "application/gzip" if compress else {"ndjson": "application/x-ndjson", "csv": "text/csv"}[export_format]
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# Rows deleted per statement (and transaction) by /logs/bulk-delete.
+BULK_DELETE_CHUNK_SIZE = 1000
+
+@api_app.post("/logs/bulk-delete", response_model=BulkDeleteLogsResult, tags=["Logs"])
+def bulk_delete_logs(
+    criteria: BulkDeleteLogsRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(auth.get_admin_user)
+    ):
+    """
+    (Protected) Deletes the log entries with the given IDs, or all entries
+    created before a cutoff, and returns how many were deleted.
+    Requires a JWT access token granted the admin scope.
+
+    Rows are deleted with set-based statements in bounded chunks, each
+    committed separately, to keep locks short on large tables.
+    """
+    deleted = delete_logs(
+        db,
+        ids=criteria.ids,
+        created_before=criteria.created_before,
+        chunk_size=BULK_DELETE_CHUNK_SIZE,
+    )
+    return BulkDeleteLogsResult(deleted=deleted)
+
 @api_app.get("/logs/{log_id}", response_model=BriefingLogSchema, tags=["Logs"])
 def get_log_by_id(
     log_id: int,
@@ -167,12 +950,12 @@ def delete_log_by_id(
     Returns a 204 No Content status on successful deletion.
     Requires a valid JWT access token.
     """
-    log_to_delete = db.query(BriefingLogModel).filter(BriefingLogModel.id == log_id).first()
-    if not log_to_delete:
+    # A single DELETE statement instead of loading the row first.
+    deleted = db.query(BriefingLogModel).filter(BriefingLogModel.id == log_id).delete(synchronize_session=False)
+    if not deleted:
         raise HTTPException(status_code=404, detail="A log with ID {log_id} not found")
-    
-    db.delete(log_to_delete)
-    db.commit()
+    with DB_COMMIT_DURATION.time("delete_briefing_log"):
+        db.commit()
     
     # A 204 response should have no body, so we return None.
     return None
\ No newline at end of file
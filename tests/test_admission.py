@@ -0,0 +1,115 @@
+"""
+Unit tests for the admission control middleware.
+"""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from daily_briefing.admission import AdmissionLane, AdmissionMiddleware, fit_to_thread_limit
+
+class TestAdmissionLane(unittest.TestCase):
+    """Test suite for the AdmissionLane class."""
+
+    def test_excess_requests_are_shed_when_queue_is_full(self):
+        """With all slots taken and no queue, further requests are rejected at once."""
+        async def scenario():
+            lane = AdmissionLane("briefing", max_concurrent=1, max_queue=0)
+            first = await lane.acquire()
+            second = await lane.acquire()
+            return lane, first, second
+
+        lane, first, second = asyncio.run(scenario())
+
+        self.assertTrue(first)
+        self.assertFalse(second)
+        self.assertEqual((lane.in_flight, lane.admitted, lane.shed), (1, 1, 1))
+
+    def test_queued_request_gets_freed_slot(self):
+        """A queued request is admitted as soon as a slot is released."""
+        async def scenario():
+            lane = AdmissionLane("briefing", max_concurrent=1, max_queue=1, queue_timeout=5)
+            await lane.acquire()
+            waiter = asyncio.create_task(lane.acquire())
+            await asyncio.sleep(0)
+            waiting = lane.waiting
+            lane.release()
+            return lane, waiting, await waiter
+
+        lane, waiting, admitted = asyncio.run(scenario())
+
+        self.assertEqual(waiting, 1)
+        self.assertTrue(admitted)
+        self.assertEqual((lane.in_flight, lane.waiting), (1, 0))
+
+    def test_queued_request_times_out(self):
+        """A request waiting longer than the queue timeout is shed."""
+        async def scenario():
+            lane = AdmissionLane("briefing", max_concurrent=1, max_queue=1, queue_timeout=0.01)
+            await lane.acquire()
+            return lane, await lane.acquire()
+
+        lane, admitted = asyncio.run(scenario())
+
+        self.assertFalse(admitted)
+        self.assertEqual((lane.waiting, lane.shed), (0, 1))
+
+    def test_lane_can_be_used_by_several_event_loops(self):
+        """A lane isn't bound to the event loop that first waited on it."""
+        async def scenario(lane):
+            await lane.acquire()
+            waiter = asyncio.create_task(lane.acquire())
+            await asyncio.sleep(0)
+            lane.release()
+            admitted = await waiter
+            lane.release()
+            return admitted
+
+        lane = AdmissionLane("briefing", max_concurrent=1, max_queue=1, queue_timeout=5)
+
+        self.assertEqual([asyncio.run(scenario(lane)) for _ in range(2)], [True, True])
+
+    def test_lanes_are_fitted_to_the_thread_limit(self):
+        """Lanes exceeding the worker threads are scaled down in proportion."""
+        lanes = [AdmissionLane("briefing", max_concurrent=32), AdmissionLane("logs", max_concurrent=8)]
+
+        fit_to_thread_limit(lanes, 20)
+        self.assertEqual([lane.max_concurrent for lane in lanes], [16, 4])
+        fit_to_thread_limit(lanes, 40)
+        self.assertEqual([lane.max_concurrent for lane in lanes], [16, 4])
+
+class TestAdmissionMiddleware(unittest.TestCase):
+    """Test suite for the AdmissionMiddleware."""
+
+    def setUp(self):
+        self.lane = AdmissionLane("briefing", max_concurrent=2, queue_timeout=3)
+        app = FastAPI()
+        app.add_middleware(
+            AdmissionMiddleware,
+            lanes={"briefing": self.lane},
+            classify=lambda method, path: "briefing" if path.startswith("/briefing") else None,
+        )
+
+        @app.get("/briefing")
+        def briefing():
+            return {"ok": True}
+
+        self.client = TestClient(app)
+
+    def test_admitted_request_releases_its_slot(self):
+        """An admitted request is processed and frees its slot afterwards."""
+        response = self.client.get("/briefing")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((self.lane.in_flight, self.lane.admitted), (0, 1))
+
+    def test_shed_request_gets_503_with_retry_after(self):
+        """A shed request is answered with 503 and a Retry-After header."""
+        self.lane.acquire = AsyncMock(return_value=False)
+
+        response = self.client.get("/briefing")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "3")
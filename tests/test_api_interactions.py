@@ -14,7 +14,7 @@ class TestJSONPlaceholderClient(unittest.TestCase):
         """Set up a client instance for each test."""
         self.client = JSONPlaceholderClient()
     
-    @patch("daily_briefing.api_interactions.requests.get")
+    @patch("daily_briefing.api_interactions.requests.Session.get")
     def test_get_users_success(self, mock_requests_get):
         """Test successful fetching of all users."""
         # Arrange
@@ -33,10 +33,10 @@ class TestJSONPlaceholderClient(unittest.TestCase):
         
         # Assert
         mock_response.json.assert_called_once()
-        mock_requests_get.assert_called_once_with(f"{self.client.base_url}/users", timeout=5)
+        mock_requests_get.assert_called_once_with(f"{self.client.base_url}/users", headers={}, timeout=5)
         self.assertEqual(result, users)
 
-    @patch("daily_briefing.api_interactions.requests.get")
+    @patch("daily_briefing.api_interactions.requests.Session.get")
     def test_get_users_failure(self, mock_requests_get):
         """
         Tests that the method returns None when the API call fails.
@@ -50,10 +50,10 @@ class TestJSONPlaceholderClient(unittest.TestCase):
         result = self.client.get_users()
         
         # Assert
-        mock_requests_get.assert_called_once_with("https://jsonplaceholder.typicode.com/users", timeout=5)
+        mock_requests_get.assert_called_once_with("https://jsonplaceholder.typicode.com/users", headers={}, timeout=5)
         self.assertIsNone(result)
 
-    @patch("daily_briefing.api_interactions.requests.get")
+    @patch("daily_briefing.api_interactions.requests.Session.get")
     def test_get_posts_by_user_success(self, mock_requests_get):
         """
         Tests the successful fetching of posts for a specific user,
@@ -76,10 +76,30 @@ class TestJSONPlaceholderClient(unittest.TestCase):
 
         # Assert
         expected_params = {"userId": 1}
-        mock_requests_get.assert_called_once_with(f"{self.client.base_url}/posts", params=expected_params, timeout=5)
+        mock_requests_get.assert_called_once_with(f"{self.client.base_url}/posts", params=expected_params, headers={}, timeout=5)
         self.assertEqual(result, posts)
 
-    @patch("daily_briefing.api_interactions.requests.post")
+    @patch("daily_briefing.api_interactions.requests.Session.get")
+    def test_get_posts_by_user_since_id(self, mock_requests_get):
+        """
+        Tests that only posts newer than `since_id` are requested.
+        """
+        # Arrange
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        posts = [{'userId': 1, 'id': 9, 'title': 'nesciunt iure omnis dolorem tempora', 'body': 'alias dolor cumque'}]
+        mock_response.json.return_value = posts
+        mock_requests_get.return_value = mock_response
+
+        # Act
+        result = self.client.get_posts_by_user(user_id=1, since_id=8)
+
+        # Assert
+        expected_params = {"userId": 1, "id_gte": 9}
+        mock_requests_get.assert_called_once_with(f"{self.client.base_url}/posts", params=expected_params, headers={}, timeout=5)
+        self.assertEqual(result, posts)
+
+    @patch("daily_briefing.api_interactions.requests.Session.post")
     def test_create_post_success(self, mock_requests_post):
         """
         Tests the successful creation of a new post via a POST request.
@@ -109,6 +129,29 @@ class TestJSONPlaceholderClient(unittest.TestCase):
         )
 
         # Assert
-        mock_requests_post.assert_called_once_with(f"{self.client.base_url}/posts", json=post_payload, timeout=5)
+        mock_requests_post.assert_called_once_with(f"{self.client.base_url}/posts", json=post_payload, headers={}, timeout=5)
         mock_response.json.assert_called_once()
-        self.assertEqual(result, post)
\ No newline at end of file
+        self.assertEqual(result, post)
+
+    @patch("daily_briefing.api_interactions.requests.Session.get")
+    def test_get_todos_by_user_success(self, mock_requests_get):
+        """
+        Tests the successful fetching of todos for a specific user,
+        verifying that the `userId` is passed as a query parameter.
+        """
+        # Arrange
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        todos = [
+            {'userId': 2, 'id': 21, 'title': 'suscipit repellat esse quibusdam', 'completed': False},
+            {'userId': 2, 'id': 22, 'title': 'distinctio vitae autem nihil ut', 'completed': True}
+        ]
+        mock_response.json.return_value = todos
+        mock_requests_get.return_value = mock_response
+
+        # Act
+        result = self.client.get_todos_by_user(user_id=2)
+
+        # Assert
+        mock_requests_get.assert_called_once_with(f"{self.client.base_url}/todos", params={"userId": 2}, headers={}, timeout=5)
+        self.assertEqual(result, todos)
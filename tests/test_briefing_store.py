@@ -0,0 +1,128 @@
+"""
+Unit tests for the MaterializedBriefingStore.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from daily_briefing.briefing_store import MaterializedBriefingStore, briefing_etag
+from daily_briefing.cache import SharedCache
+from daily_briefing.models import BriefingResponse
+
+def make_briefing(user_name: str = "Leanne Graham") -> BriefingResponse:
+    return BriefingResponse(user_name=user_name, city="Wrocław")
+
+class TestMaterializedBriefingStore(unittest.TestCase):
+    """Test suite for the MaterializedBriefingStore class."""
+
+    def setUp(self):
+        self.store = MaterializedBriefingStore(
+            ttl_seconds=100, refresh_ahead_seconds=10, idle_seconds=500, max_entries=2
+        )
+
+    @patch("daily_briefing.briefing_store.time.monotonic")
+    def test_get_returns_entry_until_it_expires(self, mock_monotonic):
+        """A stored briefing is served until its TTL has passed."""
+        mock_monotonic.return_value = 1000
+        briefing = make_briefing()
+        self.store.put(1, "Wrocław", briefing)
+
+        mock_monotonic.return_value = 1099
+        self.assertIs(self.store.get(1, "Wrocław").briefing, briefing)
+
+        mock_monotonic.return_value = 1100
+        self.assertIsNone(self.store.get(1, "Wrocław"))
+        self.assertEqual(len(self.store), 0)
+
+    def test_put_evicts_least_recently_read_entry(self):
+        """When the store is full, the entry read longest ago is evicted."""
+        self.store.put(1, "Wrocław", make_briefing())
+        self.store.put(2, "Wrocław", make_briefing())
+        self.store.get(1, "Wrocław")
+
+        self.store.put(3, "Wrocław", make_briefing())
+
+        self.assertIsNotNone(self.store.get(1, "Wrocław"))
+        self.assertIsNone(self.store.get(2, "Wrocław"))
+        self.assertIsNotNone(self.store.get(3, "Wrocław"))
+
+    @patch("daily_briefing.briefing_store.time.monotonic")
+    def test_refresh_due_regenerates_entries_close_to_expiry(self, mock_monotonic):
+        """Only entries inside the refresh-ahead window are regenerated."""
+        mock_monotonic.return_value = 1000
+        self.store.put(1, "Wrocław", make_briefing("Old"))
+        mock_monotonic.return_value = 1050
+        self.store.put(2, "Wrocław", make_briefing("Untouched"))
+        generate = MagicMock(return_value=make_briefing("New"))
+
+        mock_monotonic.return_value = 1095
+        refreshed = self.store.refresh_due(generate)
+
+        self.assertEqual(refreshed, 1)
+        generate.assert_called_once_with(1, "Wrocław")
+        self.assertEqual(self.store.get(1, "Wrocław").briefing.user_name, "New")
+        self.assertEqual(self.store.get(2, "Wrocław").briefing.user_name, "Untouched")
+
+    @patch("daily_briefing.briefing_store.time.monotonic")
+    def test_refresh_due_evicts_idle_and_missing_users(self, mock_monotonic):
+        """Idle entries are evicted, and users that no longer exist are dropped."""
+        self.store = MaterializedBriefingStore(ttl_seconds=60, refresh_ahead_seconds=20, idle_seconds=50)
+        mock_monotonic.return_value = 1000
+        self.store.put(1, "Wrocław", make_briefing())
+        mock_monotonic.return_value = 1010
+        self.store.put(2, "Wrocław", make_briefing())
+        generate = MagicMock(side_effect=ValueError("User with ID 2 not found."))
+
+        mock_monotonic.return_value = 1052
+        refreshed = self.store.refresh_due(generate)
+
+        self.assertEqual(refreshed, 0)
+        generate.assert_called_once_with(2, "Wrocław")
+        self.assertEqual(len(self.store), 0)
+
+    @patch("daily_briefing.briefing_store.time.monotonic")
+    def test_refresh_due_keeps_entry_on_upstream_failure(self, mock_monotonic):
+        """A failed refresh keeps serving the current briefing until it expires."""
+        mock_monotonic.return_value = 1000
+        briefing = make_briefing()
+        self.store.put(1, "Wrocław", briefing)
+        generate = MagicMock(side_effect=RuntimeError("Upstream down"))
+
+        mock_monotonic.return_value = 1095
+        self.store.refresh_due(generate)
+
+        self.assertIs(self.store.get(1, "Wrocław").briefing, briefing)
+
+    def test_etag_depends_on_content_only(self):
+        """Regenerated briefings with the same content share an ETag."""
+        first = self.store.put(1, "Wrocław", make_briefing())
+        second = self.store.put(1, "Wrocław", make_briefing())
+        changed = self.store.put(1, "Wrocław", make_briefing("Ervin Howell"))
+
+        self.assertEqual(first.etag, second.etag)
+        self.assertNotEqual(first.etag, changed.etag)
+        self.assertEqual(changed.etag, briefing_etag(make_briefing("Ervin Howell")))
+
+    @patch("daily_briefing.briefing_store.time.time")
+    @patch("daily_briefing.briefing_store.time.monotonic")
+    def test_workers_share_entries_and_refresh_them_once(self, mock_monotonic, mock_time):
+        """Stores backed by one SharedCache serve each other's entries, and only one regenerates them."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite3")
+            first, second = (
+                MaterializedBriefingStore(ttl_seconds=100, refresh_ahead_seconds=10, shared=SharedCache(path))
+                for _ in range(2)
+            )
+            mock_monotonic.return_value = mock_time.return_value = 1000
+            stored = first.put(1, "Wrocław", make_briefing("Old"))
+
+            self.assertEqual(second.get(1, "Wrocław").etag, stored.etag)
+
+            generate = MagicMock(return_value=make_briefing("New"))
+            mock_monotonic.return_value = mock_time.return_value = 1095
+            self.assertEqual(first.refresh_due(generate), 1)
+            self.assertEqual(second.refresh_due(generate), 1)
+
+            generate.assert_called_once_with(1, "Wrocław")
+            self.assertEqual(second.get(1, "Wrocław").briefing.user_name, "New")
@@ -0,0 +1,155 @@
+"""
+Unit tests for the TTLCache and the SharedCache.
+"""
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from daily_briefing.cache import CachedCalls, SharedCache, TTLCache
+from daily_briefing.models import WeatherInfo
+
+class TestTTLCache(unittest.TestCase):
+    """Test suite for the TTLCache class."""
+
+    def setUp(self):
+        self.cache = TTLCache(ttl_seconds=10, max_entries=2)
+
+    @patch("daily_briefing.cache.time.monotonic")
+    def test_entries_expire_after_ttl(self, mock_monotonic):
+        """An entry is returned until its TTL has passed."""
+        mock_monotonic.return_value = 100
+        self.cache.set("key", "value")
+
+        mock_monotonic.return_value = 109
+        self.assertEqual(self.cache.get("key"), "value")
+
+        mock_monotonic.return_value = 110
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_zero_ttl_is_not_replaced_by_the_default(self):
+        """An explicit TTL of 0 stores an entry that is already expired."""
+        self.cache.set("key", "value", ttl_seconds=0)
+
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """When the cache is full, the least recently used entry is evicted."""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+
+        self.cache.set("c", 3)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("c"), 3)
+
+    def test_invalidate_tag_removes_all_dependent_entries(self):
+        """All entries carrying a tag are removed together."""
+        cache = TTLCache(ttl_seconds=10, max_entries=10)
+        cache.set((1, "Wrocław"), "briefing 1", tags=[("user", 1), ("weather", "Wrocław")])
+        cache.set((2, "Wrocław"), "briefing 2", tags=[("user", 2), ("weather", "Wrocław")])
+        cache.set((2, "Gdańsk"), "briefing 3", tags=[("user", 2), ("weather", "Gdańsk")])
+
+        removed = cache.invalidate_tag(("weather", "Wrocław"))
+
+        self.assertEqual(removed, 2)
+        self.assertIsNone(cache.get((1, "Wrocław")))
+        self.assertIsNone(cache.get((2, "Wrocław")))
+        self.assertEqual(cache.get((2, "Gdańsk")), "briefing 3")
+        self.assertEqual(cache.invalidate_tag(("weather", "Wrocław")), 0)
+
+class TestSharedCache(unittest.TestCase):
+    """Test suite for the SQLite-backed SharedCache and CachedCalls."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_entries_are_shared_between_instances(self):
+        """Entries written through one instance are read by another, as by another process."""
+        writer = SharedCache(self.path, ttl_seconds=10)
+        reader = SharedCache(self.path, ttl_seconds=10)
+
+        writer.set("weather:Wroclaw", {"temperature": 21.5})
+
+        self.assertEqual(reader.get("weather:Wroclaw"), {"temperature": 21.5})
+        reader.delete("weather:Wroclaw")
+        self.assertIsNone(writer.get("weather:Wroclaw"))
+
+    @patch("daily_briefing.cache.time.time")
+    def test_entries_expire_after_ttl(self, mock_time):
+        """An entry is returned until its TTL has passed."""
+        cache = SharedCache(self.path, ttl_seconds=10)
+        mock_time.return_value = 100
+        cache.set("key", "value")
+
+        mock_time.return_value = 109
+        self.assertEqual(cache.get("key"), "value")
+        mock_time.return_value = 110
+        self.assertEqual(cache.get("key", "default"), "default")
+
+    def test_zero_ttl_is_not_replaced_by_the_default(self):
+        """An explicit TTL of 0 stores an entry that is already expired, with every write method."""
+        cache = SharedCache(self.path, ttl_seconds=10)
+
+        cache.set("set", "value", ttl_seconds=0)
+        cache.update("update", lambda value: ("value", None), ttl_seconds=0)
+
+        self.assertIsNone(cache.get("set"))
+        self.assertIsNone(cache.get("update"))
+        self.assertTrue(cache.add("set", "value", ttl_seconds=0))
+
+    def test_errors_are_treated_as_misses(self):
+        """An unusable cache file never fails the caller."""
+        cache = SharedCache(os.path.join(self.path, "missing", "cache.sqlite3"))
+
+        cache.set("key", "value")
+
+        self.assertIsNone(cache.get("key"))
+
+    def test_values_are_stored_as_json(self):
+        """Bytes and allowed dataclasses round-trip; other objects are not stored."""
+        weather = WeatherInfo("Wroclaw", 21.5, 20.0, "clear sky", "01d", observed_at=1700000000)
+        cache = SharedCache(self.path, types=(WeatherInfo,))
+
+        cache.set("weather", weather)
+        cache.set("body", b"\x00\xff")
+        cache.set("object", object())
+
+        self.assertEqual(SharedCache(self.path, types=(WeatherInfo,)).get("weather"), weather)
+        self.assertEqual(cache.get("body"), b"\x00\xff")
+        self.assertIsNone(cache.get("object"))
+        # A reader that doesn't allow the type doesn't instantiate it.
+        self.assertIsNone(SharedCache(self.path).get("weather"))
+
+    def test_file_is_private_to_its_owner(self):
+        """The file is created with mode 0600, and a file others can access is refused."""
+        cache = SharedCache(self.path)
+        cache.set("key", "value")
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+        os.chmod(self.path, 0o666)
+
+        self.assertIsNone(SharedCache(self.path).get("key"))
+
+    def test_cached_calls_reuse_results(self):
+        """Cached methods call the client once per arguments; None is not cached."""
+        client = MagicMock()
+        client.get_user.side_effect = lambda user_id: {"id": user_id} if user_id != 404 else None
+        cached_client = CachedCalls(client, SharedCache(self.path), {"get_user": 60})
+
+        self.assertEqual(cached_client.get_user(1), {"id": 1})
+        self.assertEqual(cached_client.get_user(1), {"id": 1})
+        self.assertIsNone(cached_client.get_user(404))
+        self.assertIsNone(cached_client.get_user(404))
+        cached_client.get_posts_by_user(1)
+
+        self.assertEqual(client.get_user.call_count, 3)
+        client.get_posts_by_user.assert_called_once_with(1)
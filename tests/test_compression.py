@@ -0,0 +1,89 @@
+"""
+Unit tests for the response compression middleware.
+"""
+import unittest
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from daily_briefing.compression import CompressionMiddleware, choose_encoding, parse_accept_encoding
+
+class TestEncodingNegotiation(unittest.TestCase):
+    """Test suite for the Accept-Encoding negotiation."""
+
+    def test_parse_accept_encoding(self):
+        """Codings are parsed with their q-values, defaulting to 1."""
+        self.assertEqual(
+            parse_accept_encoding("gzip, br;q=0.5, Deflate; q=0.2, identity;q=oops"),
+            {"gzip": 1.0, "br": 0.5, "deflate": 0.2, "identity": 0.0},
+        )
+
+    def test_choose_encoding(self):
+        """The client's preferred supported coding wins; brotli wins ties."""
+        self.assertEqual(choose_encoding("gzip, br", brotli_available=True), "br")
+        self.assertEqual(choose_encoding("gzip, br", brotli_available=False), "gzip")
+        self.assertEqual(choose_encoding("gzip;q=1, br;q=0.5", brotli_available=True), "gzip")
+        self.assertEqual(choose_encoding("*", brotli_available=False), "gzip")
+        self.assertIsNone(choose_encoding("gzip;q=0, deflate", brotli_available=True))
+        self.assertIsNone(choose_encoding("", brotli_available=True))
+
+class TestCompressionMiddleware(unittest.TestCase):
+    """Test suite for the CompressionMiddleware."""
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+        @app.get("/large")
+        def large():
+            return PlainTextResponse("briefing " * 100)
+
+        @app.get("/small")
+        def small():
+            return PlainTextResponse("briefing")
+
+        @app.get("/stream")
+        def stream():
+            return StreamingResponse(iter(["briefing\n"] * 3), media_type="application/x-ndjson")
+
+        @app.get("/events")
+        def events():
+            return StreamingResponse(iter(["data: briefing\n\n"] * 100), media_type="text/event-stream")
+
+        self.client = TestClient(app)
+
+    def test_large_response_is_gzipped(self):
+        """Responses above the threshold are compressed when gzip is accepted."""
+        # Only gzip is offered, so the result doesn't depend on brotli being installed.
+        response = self.client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertEqual(response.text, "briefing " * 100)
+
+    def test_small_or_unaccepted_responses_are_not_compressed(self):
+        """Small responses and clients without a supported coding get plain bodies."""
+        small = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+        identity = self.client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        self.assertNotIn("content-encoding", small.headers)
+        self.assertNotIn("content-encoding", identity.headers)
+        self.assertEqual(identity.text, "briefing " * 100)
+
+    def test_streamed_chunks_are_compressed_as_they_come(self):
+        """Every chunk of a streamed response is flushed as a decodable part of one gzip stream."""
+        with self.client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", response.headers)
+        self.assertEqual(zlib.decompress(raw, 16 + zlib.MAX_WBITS), b"briefing\n" * 3)
+
+    def test_event_streams_are_not_compressed(self):
+        """Event streams are passed through, so that events reach the client at once."""
+        response = self.client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.text, "data: briefing\n\n" * 100)
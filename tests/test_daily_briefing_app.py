@@ -1,10 +1,17 @@
 """
 Unit tests for the DailyBriefing application logic.
 """
+import time
 import unittest
 from unittest.mock import MagicMock, patch, call
 
 from daily_briefing.daily_briefing_app import DailyBriefing
+from daily_briefing.sections import (
+    DEFAULT_SECTIONS,
+    BriefingSection,
+    LatestPostCommentsSection,
+    OpenTodosSection,
+)
 from daily_briefing.api_interactions import JSONPlaceholderClient
 from daily_briefing.models import WeatherInfo, BriefingResponse
 from daily_briefing.weather_client import OpenWeatherClient
@@ -45,8 +52,8 @@ class TestDailyBriefing(unittest.TestCase):
         )
 
         # Configure the mock executor
-        # The executor is used as a context manager, so we need to mock the __enter__ result.
-        mock_executor_instance = mock_executor_class.return_value.__enter__.return_value
+        # The executor is created per briefing, so we configure the instance it returns.
+        mock_executor_instance = mock_executor_class.return_value
         # We define a side_effect to simulate the behavior of executor.submit.
         # It will call the function immediately and return a mock future holding the result.
         def mock_submit(func, *args, **kwargs):
@@ -92,7 +99,7 @@ class TestDailyBriefing(unittest.TestCase):
         self.mock_api_client.get_user.return_value = None
 
         # Configure the mock executor as before.
-        mock_executor_instance = mock_executor_class.return_value.__enter__.return_value
+        mock_executor_instance = mock_executor_class.return_value
         def mock_submit(func, *args):
             mock_future = MagicMock()
             mock_future.result.return_value = func(*args)
@@ -122,7 +129,7 @@ class TestDailyBriefing(unittest.TestCase):
         self.mock_weather_client.get_weather.return_value = None  # Weather service fails
 
         # Configure the mock executor
-        mock_executor_instance = mock_executor_class.return_value.__enter__.return_value
+        mock_executor_instance = mock_executor_class.return_value
         def mock_submit(func, *args):
             mock_future = MagicMock()
             mock_future.result.return_value = func(*args)
@@ -139,4 +146,258 @@ class TestDailyBriefing(unittest.TestCase):
         # Check that the fallback messages are present in the response.
         self.assertEqual(result.user_name, "Ervin Howell")
         self.assertEqual(result.latest_post_title, "No new posts.")
-        self.assertEqual(result.weather_summary, "Weather data not available.")
\ No newline at end of file
+        self.assertEqual(result.weather_summary, "Weather data not available.")
+
+    def test_generate_briefing_for_api_uses_response_cache(self):
+        """A repeated request is answered from the cache without upstream calls."""
+        # Arrange
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = [{"title": "First Post"}]
+        self.mock_weather_client.get_weather.return_value = None
+
+        # Act
+        first = self.briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław")
+        second = self.briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław")
+        refreshed = self.briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław", use_cache=False)
+
+        # Assert
+        self.assertIs(second, first)
+        self.assertIsNot(refreshed, first)
+        self.assertEqual(self.mock_api_client.get_user.call_count, 2)
+
+    def test_generate_briefings_shares_weather_lookups(self):
+        """A batch fetches each city's weather once and reports errors per item."""
+        # Arrange
+        self.mock_api_client.get_user.side_effect = lambda user_id: {"name": f"User {user_id}"} if user_id < 10 else None
+        self.mock_api_client.get_posts_by_user.return_value = []
+        self.mock_weather_client.get_weather.side_effect = lambda city: WeatherInfo(
+            city=city, temperature=20.0, feels_like=19.0, description="clear sky", icon_code="01d"
+        )
+        requests = [(1, "Wrocław"), (2, "Wrocław"), (3, "Gdańsk"), (99, "Wrocław")]
+
+        # Act
+        results = {index: (briefing, error) for index, briefing, error in self.briefing_app.generate_briefings(requests)}
+
+        # Assert
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        self.assertEqual(results[1][0].user_name, "User 2")
+        self.assertIn("Gdańsk", results[2][0].weather_summary)
+        self.assertIsInstance(results[3][1], ValueError)
+        self.assertEqual(
+            sorted(call.args[0] for call in self.mock_weather_client.get_weather.call_args_list),
+            ["Gdańsk", "Wrocław"],
+        )
+
+    def test_create_post_invalidates_cached_briefings(self):
+        """Creating a post evicts the user's cached briefings in every city."""
+        # Arrange
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = [{"title": "First Post"}]
+        self.mock_weather_client.get_weather.return_value = None
+        self.mock_api_client.create_post.return_value = {"id": 101, "title": "Second Post"}
+        self.briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław")
+        self.briefing_app.generate_briefing_for_api(user_id=1, city="Gdańsk")
+
+        # Act
+        self.briefing_app.create_post(title="Second Post", body="Body", user_id=1)
+        self.mock_api_client.get_posts_by_user.return_value = [{"title": "Second Post"}]
+        result = self.briefing_app.generate_briefing_for_api(user_id=1, city="Gdańsk")
+
+        # Assert
+        self.mock_api_client.create_post.assert_called_once_with(title="Second Post", body="Body", user_id=1)
+        self.assertEqual(result.latest_post_title, "Second Post")
+        self.assertEqual(self.mock_api_client.get_posts_by_user.call_count, 3)
+
+    def test_changed_weather_invalidates_briefings_for_the_city(self):
+        """New weather fetched for one user evicts other users' briefings for that city."""
+        # Arrange
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = None
+        self.mock_weather_client.get_weather.return_value = WeatherInfo(
+            city="Wrocław", temperature=15.0, feels_like=14.0, description="cloudy", icon_code="04d"
+        )
+        stale = self.briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław")
+        self.mock_weather_client.get_weather.return_value = WeatherInfo(
+            city="Wrocław", temperature=20.0, feels_like=19.0, description="clear sky", icon_code="01d"
+        )
+
+        # Act
+        self.briefing_app.generate_briefing_for_api(user_id=2, city="Wrocław")
+        result = self.briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław")
+
+        # Assert
+        self.assertIsNot(result, stale)
+        self.assertIn("clear sky", result.weather_summary)
+
+    def test_invalidation_listeners_get_every_stale_briefing(self):
+        """
+        Listeners hear about every briefing built from a written or changed
+        input, except the one being built from the new value.
+        """
+        # Arrange
+        stale = []
+        self.briefing_app.add_invalidation_listener(lambda user_id, city: stale.append((user_id, city)))
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = [{"title": "First Post"}]
+        self.mock_weather_client.get_weather.return_value = None
+        self.mock_api_client.create_post.return_value = {"id": 101, "title": "Second Post"}
+        for city in ("Wrocław", "Gdańsk"):
+            self.briefing_app.generate_briefing_for_api(user_id=1, city=city)
+
+        # Act
+        self.briefing_app.create_post(title="Second Post", body="Body", user_id=1)
+        written = sorted(stale)
+        stale.clear()
+        for city in ("Wrocław", "Gdańsk"):
+            self.briefing_app.generate_briefing_for_api(user_id=1, city=city)
+        self.mock_api_client.get_posts_by_user.return_value = [{"title": "Third Post"}]
+        self.briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław", use_cache=False)
+
+        # Assert
+        self.assertEqual(written, [(1, "Gdańsk"), (1, "Wrocław")])
+        self.assertEqual(stale, [(1, "Gdańsk")])
+
+    def test_additional_sections_share_fetches(self):
+        """
+        Extra sections are returned under `sections`, and a source needed by
+        several sections (the posts) is fetched only once.
+        """
+        # Arrange
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = [{"id": 7, "title": "Latest"}]
+        self.mock_api_client.get_comments_for_post.return_value = [{"id": 1}, {"id": 2}]
+        self.mock_api_client.get_todos_by_user.return_value = [
+            {"id": 1, "completed": False}, {"id": 2, "completed": True}, {"id": 3, "completed": False}
+        ]
+        self.mock_weather_client.get_weather.return_value = None
+        briefing_app = DailyBriefing(
+            api_client=self.mock_api_client,
+            weather_client=self.mock_weather_client,
+            sections=[*DEFAULT_SECTIONS, LatestPostCommentsSection(), OpenTodosSection()],
+        )
+
+        # Act
+        result = briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław")
+
+        # Assert
+        self.assertEqual(result.latest_post_title, "Latest")
+        self.assertEqual(result.sections, {"latest_post_comments": 2, "open_todos": 2})
+        self.mock_api_client.get_posts_by_user.assert_called_once_with(1)
+        self.mock_api_client.get_comments_for_post.assert_called_once_with(7)
+
+    def test_section_timeout_falls_back(self):
+        """A non-critical section whose data is late degrades to its fallback."""
+        # Arrange
+        class SlowSection(BriefingSection):
+            name = "slow"
+            requires = ("todos",)
+            timeout = 0.05
+            fallback = "Not available."
+
+            def render(self, context, data):
+                return "Done."
+
+        def slow_todos(user_id):
+            time.sleep(0.5)
+            return []
+
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = None
+        self.mock_api_client.get_todos_by_user.side_effect = slow_todos
+        self.mock_weather_client.get_weather.return_value = None
+        briefing_app = DailyBriefing(
+            api_client=self.mock_api_client,
+            weather_client=self.mock_weather_client,
+            sections=[*DEFAULT_SECTIONS, SlowSection()],
+        )
+
+        # Act
+        start = time.monotonic()
+        result = briefing_app.generate_briefing_for_api(user_id=1, city="Wrocław")
+
+        # Assert
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(result.sections, {"slow": "Not available."})
+        self.assertEqual(result.user_name, "Leanne Graham")
+
+    def test_unknown_data_source_is_rejected(self):
+        """Sections requiring a source that doesn't exist fail at construction."""
+        class AlbumsSection(BriefingSection):
+            name = "albums"
+            requires = ("albums",)
+
+            def render(self, context, data):
+                return data["albums"]
+
+        with self.assertRaises(ValueError):
+            DailyBriefing(
+                api_client=self.mock_api_client,
+                weather_client=self.mock_weather_client,
+                sections=[*DEFAULT_SECTIONS, AlbumsSection()],
+            )
+
+    def test_generate_briefing_delta_returns_only_new_data(self):
+        """
+        The first delta returns everything; the next one only fetches posts
+        above the watermark and omits an unchanged weather observation.
+        """
+        # Arrange
+        weather = WeatherInfo(
+            city="Wrocław", temperature=15.0, feels_like=14.0,
+            description="cloudy", icon_code="04d", observed_at=1750061420
+        )
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = [
+            {"id": 1, "title": "First Post"}, {"id": 2, "title": "Second Post"}
+        ]
+        self.mock_weather_client.get_weather.return_value = weather
+
+        # Act
+        initial = self.briefing_app.generate_briefing_delta(user_id=1, city="Wrocław")
+        self.mock_api_client.get_posts_by_user.return_value = [{"id": 3, "title": "Third Post"}]
+        delta = self.briefing_app.generate_briefing_delta(user_id=1, city="Wrocław")
+
+        # Assert
+        self.assertTrue(initial.is_initial)
+        self.assertEqual(initial.new_post_titles, ["First Post", "Second Post"])
+        self.assertIn("cloudy", initial.weather_summary)
+
+        self.assertFalse(delta.is_initial)
+        self.assertEqual(delta.new_post_titles, ["Third Post"])
+        self.assertEqual(delta.last_post_id, 3)
+        self.assertIsNone(delta.weather_summary)
+        self.mock_api_client.get_posts_by_user.assert_called_with(1, 2)
+        # The user is only looked up for the initial briefing.
+        self.mock_api_client.get_user.assert_called_once_with(1)
+
+    def test_generate_briefing_delta_reports_newer_weather(self):
+        """A newer weather observation is included in the delta."""
+        # Arrange
+        self.mock_api_client.get_user.return_value = {"name": "Leanne Graham"}
+        self.mock_api_client.get_posts_by_user.return_value = None
+        self.mock_weather_client.get_weather.return_value = WeatherInfo(
+            city="Wrocław", temperature=15.0, feels_like=14.0,
+            description="cloudy", icon_code="04d", observed_at=100
+        )
+        self.briefing_app.generate_briefing_delta(user_id=1, city="Wrocław")
+        self.mock_weather_client.get_weather.return_value = WeatherInfo(
+            city="Wrocław", temperature=18.0, feels_like=17.0,
+            description="clear sky", icon_code="01d", observed_at=700
+        )
+
+        # Act
+        delta = self.briefing_app.generate_briefing_delta(user_id=1, city="Wrocław")
+
+        # Assert
+        self.assertEqual(delta.new_post_titles, [])
+        self.assertIn("clear sky", delta.weather_summary)
+        self.assertEqual(delta.weather_observed_at, 700)
+
+    def test_generate_briefing_delta_user_not_found(self):
+        """The initial delta for a missing user raises a ValueError."""
+        self.mock_api_client.get_user.return_value = None
+        self.mock_api_client.get_posts_by_user.return_value = None
+        self.mock_weather_client.get_weather.return_value = None
+
+        with self.assertRaises(ValueError):
+            self.briefing_app.generate_briefing_delta(user_id=999, city="Wrocław")
@@ -0,0 +1,76 @@
+"""
+Unit tests for the connection pool of the database module.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+from daily_briefing.database import TimedQueuePool
+from daily_briefing.metrics import DB_POOL_CHECKOUT_WAIT
+
+def _checkouts(outcome: str) -> int:
+    entry = DB_POOL_CHECKOUT_WAIT.collect().get((outcome,))
+    return sum(entry[0]) if entry else 0
+
+class TestConnectionPool(unittest.TestCase):
+    """Test suite for TimedQueuePool and session checkouts."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.directory.name, 'pool.db')}",
+            poolclass=TimedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_checkout_wait_is_recorded(self):
+        """Every checkout is observed, and one exceeding the pool timeout as a timeout."""
+        ok_before, timeouts_before = _checkouts("ok"), _checkouts("timeout")
+
+        with self.engine.connect():
+            with self.assertRaises(PoolTimeoutError):
+                self.engine.connect()
+
+        self.assertEqual(_checkouts("ok") - ok_before, 1)
+        self.assertEqual(_checkouts("timeout") - timeouts_before, 1)
+
+    def test_session_checks_out_a_connection_only_for_queries(self):
+        """A session holds no connection until its first query, and none after closing."""
+        session = sessionmaker(bind=self.engine)()
+
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+        session.execute(text("SELECT 1"))
+        self.assertEqual(self.engine.pool.checkedout(), 1)
+        session.close()
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+
+class TestPoolSize(unittest.TestCase):
+    """Test suite for the default pool size."""
+
+    def test_workers_share_the_connection_budget(self):
+        """The default pools of all workers together stay within DB_MAX_CONNECTIONS."""
+        code = "import daily_briefing.database as d; print(d.DB_POOL_SIZE, d.DB_MAX_OVERFLOW)"
+        sizes = {}
+        for workers in ("1", "8", "16"):
+            env = {**os.environ, "WEB_CONCURRENCY": workers, "DB_MAX_CONNECTIONS": "80"}
+            env.pop("DB_POOL_SIZE", None)
+            env.pop("DB_MAX_OVERFLOW", None)
+            output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+            sizes[workers] = tuple(int(value) for value in output.stdout.split())
+
+        self.assertEqual(sizes, {"1": (10, 10), "8": (5, 5), "16": (2, 3)})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Unit tests for the readiness checks.
+"""
+import unittest
+from unittest.mock import MagicMock
+
+from daily_briefing import health
+from daily_briefing.admission import AdmissionLane
+from daily_briefing.metrics import CACHE_LOOKUPS
+from daily_briefing.warmup import WarmUpReport, WarmUpStep
+
+class TestHealthChecks(unittest.TestCase):
+    """Test suite for the individual checks and their combination."""
+
+    def test_admission_is_saturated_when_a_queue_is_full(self):
+        """A lane with all slots taken and a full queue saturates the instance."""
+        busy = AdmissionLane("briefing", max_concurrent=1, max_queue=1)
+        busy.in_flight, busy.waiting = 1, 1
+        idle = AdmissionLane("logs", max_concurrent=1, max_queue=1)
+
+        report = health.check_admission([busy, idle])
+
+        self.assertEqual(report["status"], health.SATURATED)
+        self.assertEqual(report["logs"], {"in_flight": 0, "waiting": 0, "shed": 0})
+
+    def test_executor_is_saturated_when_many_requests_queue(self):
+        """A few requests waiting for a thread are normal; half as many as there are threads are not."""
+        self.assertEqual(health.check_executor(40, 40, 5)["status"], health.OK)
+        self.assertEqual(health.check_executor(40, 40, 21)["status"], health.SATURATED)
+
+    def test_log_writer_is_saturated_when_its_buffer_is_full(self):
+        """A full log writer buffer saturates the instance."""
+        log_writer = MagicMock(pending=100, max_queue_size=100, running=True)
+
+        self.assertEqual(health.check_log_writer(log_writer)["status"], health.SATURATED)
+        self.assertEqual(health.check_log_writer(None)["status"], health.OK)
+
+    def test_unfinished_warm_up_is_not_ready(self):
+        """The instance is not ready until the warm-up has finished."""
+        report = WarmUpReport(steps={"database_pool": WarmUpStep("database_pool")})
+
+        ready, _ = health.readiness({"warm_up": health.check_warm_up(report)})
+        report.finished = True
+        ready_after, combined = health.readiness({"warm_up": health.check_warm_up(report)})
+
+        self.assertFalse(ready)
+        self.assertTrue(ready_after)
+        self.assertEqual(combined["status"], "ready")
+
+    def test_cache_stats_combine_sizes_and_hit_ratios(self):
+        """Cache entries are reported next to the hit ratio of the lookups."""
+        CACHE_LOOKUPS.inc("test_health_cache", "hit", amount=3)
+        CACHE_LOOKUPS.inc("test_health_cache", "miss")
+
+        stats = health.cache_stats({"test_health_cache": lambda: 7})
+
+        self.assertEqual(stats["test_health_cache"], {"hit_ratio": 0.75, "entries": 7})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit tests for the Idempotency-Key middleware.
+"""
+import asyncio
+import unittest
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from daily_briefing.cache import TTLCache
+from daily_briefing.idempotency import IdempotencyMiddleware
+
+class Order(BaseModel):
+    item: str
+
+class TestIdempotencyMiddleware(unittest.TestCase):
+    """Test suite for the IdempotencyMiddleware class."""
+
+    def setUp(self):
+        self.calls = 0
+        self.app = FastAPI()
+        self.app.add_middleware(IdempotencyMiddleware, store=TTLCache(ttl_seconds=60), wait_timeout=1)
+
+        @self.app.post("/orders", status_code=201)
+        async def create_order(order: Order):
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return {"order": self.calls, "item": order.item}
+
+        @self.app.post("/failing")
+        def fail():
+            self.calls += 1
+            return JSONResponse({"detail": "boom"}, status_code=502)
+
+        self.client = TestClient(self.app)
+
+    def test_retries_are_replayed(self):
+        """A retry with the same key gets the stored response without running the endpoint."""
+        headers = {"Idempotency-Key": "order-1"}
+
+        first = self.client.post("/orders", json={"item": "tea"}, headers=headers)
+        retry = self.client.post("/orders", json={"item": "tea"}, headers=headers)
+        other = self.client.post("/orders", json={"item": "tea"}, headers={"Idempotency-Key": "order-2"})
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual((retry.status_code, retry.json()), (201, {"order": 1, "item": "tea"}))
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", first.headers)
+        self.assertEqual(other.json()["order"], 2)
+
+    def test_requests_without_a_key_are_not_stored(self):
+        """Without the header, every request runs the endpoint."""
+        self.client.post("/orders", json={"item": "tea"})
+        self.client.post("/orders", json={"item": "tea"})
+
+        self.assertEqual(self.calls, 2)
+
+    def test_key_reused_with_a_different_body_is_rejected(self):
+        """Reusing a key for a different request is an error, not a replay."""
+        headers = {"Idempotency-Key": "order-1"}
+        self.client.post("/orders", json={"item": "tea"}, headers=headers)
+
+        response = self.client.post("/orders", json={"item": "coffee"}, headers=headers)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_server_errors_are_not_stored(self):
+        """A 5xx response may be retried with the same key."""
+        headers = {"Idempotency-Key": "retry-me"}
+
+        self.client.post("/failing", headers=headers)
+        response = self.client.post("/failing", headers=headers)
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(self.calls, 2)
+
+    def test_concurrent_retry_waits_for_the_original(self):
+        """A retry arriving while the original runs gets its result instead of running again."""
+        async def send_twice():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                request = dict(json={"item": "tea"}, headers={"Idempotency-Key": "order-1"})
+                return await asyncio.gather(client.post("/orders", **request), client.post("/orders", **request))
+
+        first, retry = asyncio.run(send_twice())
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first.json(), retry.json())
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+
+    def test_overlong_key_is_rejected(self):
+        """Keys longer than 255 characters are rejected."""
+        response = self.client.post("/orders", json={"item": "tea"}, headers={"Idempotency-Key": "k" * 256})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_oversized_body_is_rejected(self):
+        """Bodies above the limit are not buffered; requests without a key are not limited."""
+        app = FastAPI()
+        app.add_middleware(IdempotencyMiddleware, store=TTLCache(ttl_seconds=60), max_body_size=10)
+
+        @app.post("/orders")
+        def create_order(order: Order):
+            return {"item": order.item}
+
+        client = TestClient(app)
+
+        response = client.post("/orders", json={"item": "a long order"}, headers={"Idempotency-Key": "order-1"})
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_private_paths_use_the_private_store(self):
+        """Responses of private paths are kept in the private store only, with its TTL."""
+        store, private_store = TTLCache(ttl_seconds=60), TTLCache(ttl_seconds=60)
+        app = FastAPI()
+        app.add_middleware(
+            IdempotencyMiddleware, store=store, private_paths=("/token",), private_store=private_store,
+            private_ttl_seconds=5,
+        )
+
+        @app.post("/token")
+        def login():
+            return {"access_token": "secret"}
+
+        client = TestClient(app)
+
+        first = client.post("/token", headers={"Idempotency-Key": "login-1"})
+        retry = client.post("/token", headers={"Idempotency-Key": "login-1"})
+
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual((len(store), len(private_store)), (0, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+Tests that heavy dependencies are only imported when they are used.
+"""
+import subprocess
+import sys
+import unittest
+
+def modules_loaded_by(statement: str, modules) -> list:
+    """Runs a statement in a fresh process and returns which of the modules it loaded."""
+    code = f"import sys; {statement}; print(','.join(m for m in {list(modules)!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return [module for module in output.strip().split(",") if module]
+
+class TestLazyImports(unittest.TestCase):
+    """Test suite for the cold start of the CLI and the web API."""
+
+    def test_cli_does_not_load_the_application_stack(self):
+        """Importing the CLI loads neither the HTTP, model nor database libraries."""
+        loaded = modules_loaded_by(
+            "import daily_briefing.main", ("requests", "pydantic", "sqlalchemy", "fastapi", "starlette")
+        )
+
+        self.assertEqual(loaded, [])
+
+    def test_web_api_defers_driver_auth_and_http_libraries(self):
+        """Importing the web API neither creates the engine nor loads the driver, passlib, jose or requests."""
+        loaded = modules_loaded_by(
+            "import daily_briefing.web_api, daily_briefing.database as d; assert d._engine is None",
+            ("psycopg2", "passlib", "jose", "requests"),
+        )
+
+        self.assertEqual(loaded, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Unit tests for the briefing log queries.
+"""
+import csv
+import gzip
+import io
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from daily_briefing.database import Base, BriefingLog
+from daily_briefing.log_queries import (
+    decode_cursor, delete_logs, encode_cursor, encode_logs_export, get_top_cities, iter_log_rows
+)
+
+class TestLogCursors(unittest.TestCase):
+    """Test suite for the keyset pagination cursors."""
+
+    def test_cursor_round_trip(self):
+        """A cursor decodes to the position of the log it was created from."""
+        log = MagicMock(id=42, created_at=datetime(2025, 6, 16, 8, 30, 15, 123456))
+
+        cursor = encode_cursor(log)
+
+        self.assertEqual(decode_cursor(cursor), (datetime(2025, 6, 16, 8, 30, 15, 123456), 42))
+        self.assertNotIn("=", cursor)
+
+    def test_malformed_cursor_is_rejected(self):
+        """Cursors that weren't created by encode_cursor raise a ValueError."""
+        for cursor in ("not-a-cursor", "", "bm9waXBl"):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    decode_cursor(cursor)
+
+class TestLogExport(unittest.TestCase):
+    """Test suite for streaming log exports."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.db.add_all([
+            BriefingLog(user_id=user_id, city=city, created_at=datetime(2025, 6, 16, 8, minute))
+            for minute, (user_id, city) in enumerate([(1, "Warsaw"), (2, "Berlin"), (1, "Paris")])
+        ])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_rows_are_streamed_in_chunks(self):
+        """Rows arrive oldest first in chunks of at most fetch_size."""
+        chunks = list(iter_log_rows(self.db, fetch_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual([row.city for chunk in chunks for row in chunk], ["Warsaw", "Berlin", "Paris"])
+
+    def test_ndjson_export_with_filter(self):
+        """The NDJSON export holds one JSON object per matching row."""
+        data = b"".join(encode_logs_export(iter_log_rows(self.db, user_id=1), "ndjson"))
+
+        lines = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual([line["city"] for line in lines], ["Warsaw", "Paris"])
+        self.assertEqual(lines[0]["created_at"], "2025-06-16T08:00:00")
+
+    def test_gzipped_csv_export(self):
+        """The CSV export starts with a header row and can be gzip-compressed."""
+        data = b"".join(encode_logs_export(iter_log_rows(self.db, fetch_size=1), "csv", compress=True))
+
+        rows = list(csv.reader(io.StringIO(gzip.decompress(data).decode())))
+        self.assertEqual(rows[0], ["id", "user_id", "city", "created_at"])
+        self.assertEqual(len(rows), 4)
+
+    def test_unsupported_format_is_rejected(self):
+        """Formats other than NDJSON and CSV raise a ValueError."""
+        with self.assertRaises(ValueError):
+            list(encode_logs_export([], "xml"))
+
+
+class TestDeleteLogs(unittest.TestCase):
+    """Test suite for bulk deletes of log entries."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.db.add_all([
+            BriefingLog(user_id=1, city="Warsaw", created_at=datetime(2025, 6, day)) for day in range(1, 8)
+        ])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def remaining(self):
+        return self.db.scalar(select(func.count()).select_from(BriefingLog))
+
+    def test_delete_by_ids_in_chunks(self):
+        """Only the listed logs are deleted; unknown IDs are ignored."""
+        deleted = delete_logs(self.db, ids=[1, 2, 3, 3, 999], chunk_size=2)
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(self.remaining(), 4)
+
+    def test_delete_by_cutoff_in_chunks(self):
+        """All logs older than the cutoff are deleted, chunk by chunk."""
+        deleted = delete_logs(self.db, created_before=datetime(2025, 6, 6), chunk_size=2)
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(self.remaining(), 2)
+
+    def test_exactly_one_criterion_is_required(self):
+        """Deleting needs either IDs or a cutoff, but not both."""
+        with self.assertRaises(ValueError):
+            delete_logs(self.db)
+        with self.assertRaises(ValueError):
+            delete_logs(self.db, ids=[1], created_before=datetime(2025, 6, 6))
+
+class TestTopCities(unittest.TestCase):
+    """Test suite for the most requested cities."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.db.add_all(
+            [BriefingLog(user_id=1, city="Warsaw", created_at=datetime(2025, 6, 1)) for _ in range(3)]
+            + [BriefingLog(user_id=1, city="Wroclaw", created_at=datetime(2025, 6, 5)) for _ in range(2)]
+            + [BriefingLog(user_id=2, city="Gdansk", created_at=datetime(2025, 6, 6))]
+        )
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_cities_by_briefing_count(self):
+        """Cities are ordered by their number of briefings, optionally counting recent ones only."""
+        self.assertEqual(get_top_cities(self.db, 2), ["Warsaw", "Wroclaw"])
+        self.assertEqual(get_top_cities(self.db, 5, created_from=datetime(2025, 6, 2)), ["Wroclaw", "Gdansk"])
@@ -0,0 +1,144 @@
+"""
+Unit tests for the BufferedLogWriter.
+"""
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from daily_briefing.log_writer import BufferedLogWriter
+
+class TestBufferedLogWriter(unittest.TestCase):
+    """Test suite for the BufferedLogWriter class."""
+
+    def setUp(self):
+        self.mock_session = MagicMock()
+        self.session_factory = MagicMock(return_value=self.mock_session)
+
+    def written_rows(self):
+        """Returns the rows of every insert, one list per batch."""
+        return [call.args[1] for call in self.mock_session.execute.call_args_list]
+
+    def test_rows_are_inserted_in_batches(self):
+        """Buffered rows are written in batches of at most `batch_size` rows."""
+        writer = BufferedLogWriter(
+            session_factory=self.session_factory, batch_size=2, flush_interval_ms=10_000
+        )
+        for user_id in range(1, 6):
+            writer.submit(user_id=user_id, city="Wrocław")
+
+        writer.start()
+        writer.close()
+
+        batches = self.written_rows()
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual([row["user_id"] for batch in batches for row in batch], [1, 2, 3, 4, 5])
+        self.assertEqual(self.mock_session.commit.call_count, 3)
+        self.assertEqual(writer.written, 5)
+
+    def test_partial_batch_is_flushed_after_interval(self):
+        """A batch smaller than `batch_size` is written once the flush interval passes."""
+        flushed = threading.Event()
+        self.mock_session.commit.side_effect = lambda: flushed.set()
+        writer = BufferedLogWriter(
+            session_factory=self.session_factory, batch_size=100, flush_interval_ms=20
+        ).start()
+
+        writer.submit(user_id=1, city="Wrocław")
+
+        self.assertTrue(flushed.wait(timeout=2))
+        writer.close()
+        self.assertEqual(len(self.written_rows()[0]), 1)
+
+    def test_full_buffer_drops_rows(self):
+        """With the drop policy, rows submitted to a full buffer are discarded."""
+        writer = BufferedLogWriter(session_factory=self.session_factory, max_queue_size=2, when_full="drop")
+
+        results = [writer.submit(user_id=user_id, city="Wrocław") for user_id in (1, 2, 3)]
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(writer.dropped, 1)
+        self.assertEqual(writer.pending, 2)
+
+    def test_buffer_is_bounded_by_rows_of_groups(self):
+        """Every row of a `submit_many` group counts against max_queue_size."""
+        writer = BufferedLogWriter(session_factory=self.session_factory, max_queue_size=3, when_full="drop")
+
+        results = [
+            writer.submit_many([(1, "Wrocław"), (2, "Berlin")]),
+            writer.submit_many([(3, "Paris"), (4, "Rome")]),
+            writer.submit(user_id=5, city="Wrocław"),
+            writer.submit(user_id=6, city="Wrocław"),
+        ]
+
+        self.assertEqual(results, [True, False, True, False])
+        self.assertEqual(writer.dropped, 3)
+        self.assertEqual(writer.pending, 3)
+
+    def test_block_policy_waits_for_written_rows(self):
+        """With the block policy, submit waits for the writer to free enough space."""
+        writer = BufferedLogWriter(
+            session_factory=self.session_factory, max_queue_size=2, when_full="block",
+            block_timeout_ms=2000, flush_interval_ms=10,
+        )
+        writer.submit_many([(1, "Wrocław"), (2, "Berlin")])
+        writer.start()
+
+        self.assertTrue(writer.submit(user_id=3, city="Paris"))
+        writer.close()
+        self.assertEqual(writer.written, 3)
+        self.assertEqual(writer.dropped, 0)
+
+    def test_close_gives_up_on_a_stuck_writer(self):
+        """close() returns after its timeout when the writer is stuck."""
+        inserting, release = threading.Event(), threading.Event()
+
+        def execute(*args):
+            inserting.set()
+            release.wait(5)
+
+        self.mock_session.execute.side_effect = execute
+        writer = BufferedLogWriter(
+            session_factory=self.session_factory, batch_size=1, max_queue_size=1, flush_interval_ms=10_000
+        ).start()
+        writer.submit(user_id=1, city="Wrocław")
+        self.assertTrue(inserting.wait(timeout=2))
+        writer.submit(user_id=2, city="Wrocław")
+
+        writer.close(timeout=0.05)
+        self.assertTrue(writer.running)
+
+        release.set()
+        writer.close()
+        self.assertEqual(writer.written, 2)
+
+    def test_failed_insert_is_rolled_back(self):
+        """A failing batch is rolled back and counted, and the writer keeps running."""
+        self.mock_session.execute.side_effect = [RuntimeError("Database down"), None]
+        writer = BufferedLogWriter(
+            session_factory=self.session_factory, batch_size=1, flush_interval_ms=10_000
+        )
+        writer.submit(user_id=1, city="Wrocław")
+        writer.submit(user_id=2, city="Wrocław")
+
+        writer.start()
+        writer.close()
+
+        self.mock_session.rollback.assert_called_once()
+        self.assertEqual(writer.failed, 1)
+        self.assertEqual(writer.written, 1)
+
+    def test_submit_many_writes_entries_in_one_insert(self):
+        """Entries submitted together are written in a single insert."""
+        writer = BufferedLogWriter(
+            session_factory=self.session_factory, batch_size=2, flush_interval_ms=10_000
+        )
+
+        writer.submit_many([(1, "Wrocław"), (2, "Berlin"), (3, "Paris")])
+        self.assertEqual(writer.pending, 3)
+        writer.start()
+        writer.close()
+
+        batches = self.written_rows()
+        self.assertEqual(len(batches), 1)
+        self.assertEqual([row["city"] for row in batches[0]], ["Wrocław", "Berlin", "Paris"])
+        self.assertEqual(writer.written, 3)
@@ -1,12 +1,15 @@
 """
 Unit tests for the Command-Line Interface.
 """
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from typer.testing import CliRunner
 
 # Import the app object from the CLI script
 from daily_briefing.main import app
+from daily_briefing.models import BriefingResponse
 
 class TestMainCLI(unittest.TestCase):
     """Test suite for the CLI."""
@@ -38,6 +41,34 @@ class TestMainCLI(unittest.TestCase):
         # Verify that the mocked method was actually called.
         mock_briefing_instance.generate_briefing.assert_called_once_with(user_id=1, city="Testville")
 
+    @patch("daily_briefing.main.get_DailyBriefing")
+    def test_render_briefings_to_file(self, mock_get_daily_briefing):
+        """Test the 'render-briefings' CLI command writing Markdown to a file."""
+        # Arrange
+        mock_briefing_instance = MagicMock()
+        mock_briefing_instance.iter_briefings.return_value = iter([
+            BriefingResponse(user_name="Leanne Graham", city="Testville"),
+            BriefingResponse(user_name="Ervin Howell", city="Testville"),
+        ])
+        mock_get_daily_briefing.return_value = mock_briefing_instance
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "out.md")
+            # Act
+            result = self.runner.invoke(
+                app, ["render-briefings", "1", "2", "--city", "Testville", "--format", "markdown", "--output", output_path]
+            )
+
+            # Assert
+            self.assertEqual(result.exit_code, 0, f"CLI exited with an error: {result.exception}")
+            with open(output_path, encoding="utf-8") as fh:
+                content = fh.read()
+        self.assertIn("## Good morning, Leanne Graham!", content)
+        self.assertIn("## Good morning, Ervin Howell!", content)
+        self.assertIn("Rendered 2 of 2 briefings.", result.stderr)
+        requests = list(mock_briefing_instance.iter_briefings.call_args.args[0])
+        self.assertEqual(requests, [(1, "Testville"), (2, "Testville")])
+
     @patch("daily_briefing.main.ConfigReader")
     def test_get_briefing_config_not_found(self, mock_config_reader_class):
         """Test the CLI's error handling when config.ini is missing."""
@@ -69,4 +100,43 @@ class TestMainCLI(unittest.TestCase):
         self.assertEqual(result.exit_code, 0)
         self.assertIn("✅ Configuration file found and seems valid.", result.stdout)
         # Ensure the mock was actually used.
-        mock_config_reader_class.assert_called_once()
\ No newline at end of file
+        mock_config_reader_class.assert_called_once()
+
+    @patch.dict(os.environ, {"WEB_CONCURRENCY": "3"}, clear=False)
+    @patch("daily_briefing.database.create_db_and_tables")
+    @patch("uvicorn.run")
+    def test_serve_starts_workers_sharing_a_cache(self, mock_uvicorn_run, mock_create_db_and_tables):
+        """Test that 'serve' runs several uvicorn workers pointed at one shared cache."""
+        # Arrange
+        os.environ.pop("SHARED_CACHE_PATH", None)
+
+        # Act
+        result = self.runner.invoke(app, ["serve", "--host", "0.0.0.0", "--shared-cache", "/tmp/briefing-cache.db"])
+
+        # Assert
+        self.assertEqual(result.exit_code, 0, f"CLI exited with an error: {result.exception}")
+        mock_uvicorn_run.assert_called_once_with(
+            "daily_briefing.web_api:api_app", host="0.0.0.0", port=8000, workers=3, log_level="info"
+        )
+        self.assertEqual(os.environ["SHARED_CACHE_PATH"], "/tmp/briefing-cache.db")
+        # The tables are created once, before the workers, which skip it.
+        mock_create_db_and_tables.assert_called_once_with()
+        self.assertEqual(os.environ["CREATE_DB_TABLES"], "false")
+
+    @patch.dict(os.environ, {"WEB_CONCURRENCY": "2"}, clear=False)
+    @patch("daily_briefing.database.create_db_and_tables")
+    @patch("uvicorn.run")
+    def test_serve_keeps_the_shared_cache_in_a_private_directory(self, mock_uvicorn_run, mock_create_db_and_tables):
+        """Test that 'serve' defaults to a cache file in a directory only the user can access."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.environ.pop("SHARED_CACHE_PATH", None)
+            with patch.dict(os.environ, {"XDG_CACHE_HOME": tmp_dir}):
+                # Act
+                result = self.runner.invoke(app, ["serve"])
+                shared_cache_path = os.environ.get("SHARED_CACHE_PATH")
+
+            # Assert
+            self.assertEqual(result.exit_code, 0, f"CLI exited with an error: {result.exception}")
+            directory = os.path.join(tmp_dir, "daily_briefing")
+            self.assertEqual(shared_cache_path, os.path.join(directory, "shared_cache.sqlite3"))
+            self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
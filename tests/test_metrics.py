@@ -0,0 +1,76 @@
+"""
+Unit tests for the metrics module.
+"""
+import threading
+import unittest
+
+from daily_briefing.metrics import (
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    UPSTREAM_REQUEST_DURATION,
+    timed_upstream_call,
+)
+
+class TestMetrics(unittest.TestCase):
+    """Test suite for the per-thread sharded metrics."""
+
+    def test_counter_combines_values_of_all_threads(self):
+        """Increments from many threads, including finished ones, are all counted."""
+        counter = Counter("test_requests_total", "Test requests.", ("route",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc("/briefing")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc("/logs", amount=2)
+
+        self.assertEqual(counter.collect(), {("/briefing",): 4000, ("/logs",): 2})
+        # The shards of the finished threads were folded into one total.
+        self.assertEqual(len(counter._shards), 1)
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Histograms are rendered with cumulative buckets, sum and count."""
+        registry = MetricsRegistry()
+        histogram = registry.register(Histogram("test_seconds", "Test latency.", ("call",), buckets=(0.1, 1.0)))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, "get_user")
+
+        text = registry.render()
+
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertIn('test_seconds_bucket{call="get_user",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{call="get_user",le="1.0"} 2', text)
+        self.assertIn('test_seconds_bucket{call="get_user",le="+Inf"} 3', text)
+        self.assertIn('test_seconds_sum{call="get_user"} 5.55', text)
+        self.assertIn('test_seconds_count{call="get_user"} 3', text)
+
+    def test_wrong_number_of_labels_is_rejected(self):
+        """Recording with the wrong labels raises a ValueError."""
+        counter = Counter("test_labels_total", "Test.", ("cache", "result"))
+
+        with self.assertRaises(ValueError):
+            counter.inc("briefing_responses")
+
+    def test_timed_upstream_call_records_outcome(self):
+        """Upstream calls are timed with an ok, empty or error outcome."""
+        @timed_upstream_call("test_call")
+        def call(result):
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        call({"id": 1})
+        call(None)
+        with self.assertRaises(RuntimeError):
+            call(RuntimeError("Upstream down"))
+
+        counts = {labels[1]: value[0] for labels, value in UPSTREAM_REQUEST_DURATION.collect().items()
+                  if labels[0] == "test_call"}
+        self.assertEqual({outcome: sum(buckets) for outcome, buckets in counts.items()},
+                         {"ok": 1, "empty": 1, "error": 1})
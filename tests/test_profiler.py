@@ -0,0 +1,59 @@
+"""
+Unit tests for the sampling profiler.
+"""
+import threading
+import unittest
+
+from daily_briefing import profiler
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+class TestProfiler(unittest.TestCase):
+    """Test suite for sampling and collapsing stacks."""
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.worker = threading.Thread(target=busy_loop, args=(self.stop,), name="busy-worker")
+        self.worker.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.worker.join()
+
+    def test_samples_busy_threads(self):
+        """The stacks of other threads are sampled, root frame first."""
+        counts = profiler.sample_stacks(0.1, interval=0.005, include_thread_names=True)
+
+        busy_stacks = [stack for stack in counts if any(frame.startswith("busy_loop ") for frame in stack)]
+        self.assertTrue(busy_stacks)
+        self.assertEqual(busy_stacks[0][0], "busy-worker")
+        self.assertTrue(busy_stacks[0][1].startswith("_bootstrap "))
+
+    def test_idle_threads_are_skipped_by_default(self):
+        """Threads waiting on a lock or event are left out unless requested."""
+        waiting = threading.Thread(target=self.stop.wait, name="waiting-worker")
+        waiting.start()
+
+        busy = profiler.sample_stacks(0.05, interval=0.005, include_thread_names=True)
+        everything = profiler.sample_stacks(0.05, interval=0.005, include_idle=True, include_thread_names=True)
+
+        self.assertNotIn("waiting-worker", {stack[0] for stack in busy})
+        self.assertIn("waiting-worker", {stack[0] for stack in everything})
+
+    def test_collapse_stacks_orders_by_samples(self):
+        """Collapsed stacks are "frame;frame count" lines, most frequent first."""
+        collapsed = profiler.collapse_stacks({("main", "handle"): 2, ("main", "handle", "encode"): 5})
+
+        self.assertEqual(collapsed, "main;handle;encode 5\nmain;handle 2\n")
+        self.assertEqual(profiler.collapse_stacks({}), "")
+
+    def test_concurrent_profiles_are_rejected(self):
+        """Only one profile runs at a time."""
+        with profiler._profile_lock:
+            with self.assertRaises(profiler.ProfilerBusyError):
+                profiler.profile(0.01)
+
+if __name__ == '__main__':
+    unittest.main()
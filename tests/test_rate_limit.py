@@ -0,0 +1,160 @@
+"""
+Unit tests for the sliding window rate limiter and its middleware.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from daily_briefing import auth
+from daily_briefing.cache import SharedCache
+from daily_briefing.rate_limit import (
+    InMemoryRateLimitStore,
+    RateLimitMiddleware,
+    RateLimitRule,
+    SharedRateLimitStore,
+    SlidingWindowRateLimiter,
+    client_identity,
+)
+
+class FakeClock:
+    """A settable clock for the limiter."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+class TestSlidingWindowRateLimiter(unittest.TestCase):
+    """Test suite for the SlidingWindowRateLimiter class."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = SlidingWindowRateLimiter(clock=self.clock)
+        self.rule = RateLimitRule("briefing", limit=3, window_seconds=10)
+
+    def test_requests_over_the_limit_are_rejected(self):
+        """Only `limit` requests are allowed within a window, per caller."""
+        results = [self.limiter.check("ip:1.2.3.4", self.rule) for _ in range(4)]
+
+        self.assertEqual([result.allowed for result in results], [True, True, True, False])
+        self.assertEqual([result.remaining for result in results], [2, 1, 0, 0])
+        self.assertTrue(self.limiter.check("ip:5.6.7.8", self.rule).allowed)
+
+    def test_previous_window_is_weighted_by_overlap(self):
+        """Requests of the previous window count in proportion to their overlap."""
+        for _ in range(3):
+            self.limiter.check("ip:1.2.3.4", self.rule)
+
+        # Half-way through the next window, 3 * 0.5 = 1.5 requests still count.
+        self.clock.now = 1015
+        allowed = [self.limiter.check("ip:1.2.3.4", self.rule).allowed for _ in range(3)]
+        self.assertEqual(allowed, [True, False, False])
+
+        # Two windows later nothing is carried over.
+        self.clock.now = 1031
+        self.assertEqual(self.limiter.check("ip:1.2.3.4", self.rule).remaining, 2)
+
+    def test_store_forgets_least_recently_seen_callers(self):
+        """The in-memory store stays bounded."""
+        store = InMemoryRateLimitStore(max_keys=2)
+        limiter = SlidingWindowRateLimiter(store=store, clock=self.clock)
+
+        for caller in ("a", "b", "c"):
+            limiter.check(caller, self.rule)
+
+        self.assertEqual(len(store._counters), 2)
+
+    def test_shared_store_counts_requests_of_all_workers(self):
+        """Limiters of several processes sharing a cache file share the limit."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "shared.sqlite3")
+            workers = [
+                SlidingWindowRateLimiter(store=SharedRateLimitStore(SharedCache(path)), clock=self.clock)
+                for _ in range(2)
+            ]
+
+            allowed = [workers[i % 2].check("ip:1.2.3.4", self.rule).allowed for i in range(4)]
+
+            self.assertEqual(allowed, [True, True, True, False])
+
+    def test_requests_are_charged_by_cost(self):
+        """A request with a cost counts as that many requests."""
+        self.assertTrue(self.limiter.check("ip:1.2.3.4", self.rule, cost=2).allowed)
+        self.assertFalse(self.limiter.check("ip:1.2.3.4", self.rule, cost=2).allowed)
+        self.assertTrue(self.limiter.check("ip:1.2.3.4", self.rule).allowed)
+
+class TestRateLimitMiddleware(unittest.TestCase):
+    """Test suite for the RateLimitMiddleware."""
+
+    def setUp(self):
+        rule = RateLimitRule("briefing", limit=2, window_seconds=60)
+        app = FastAPI()
+        app.add_middleware(
+            RateLimitMiddleware,
+            limiter=SlidingWindowRateLimiter(),
+            rule_for=lambda method, path: rule if path.startswith("/briefing") else None,
+        )
+
+        @app.get("/briefing")
+        def briefing():
+            return {"ok": True}
+
+        @app.get("/other")
+        def other():
+            return {"ok": True}
+
+        batch_rule = RateLimitRule("briefing_batch", limit=5, window_seconds=60, cost=lambda body: len(json.loads(body)))
+        batch_app = FastAPI()
+        batch_app.add_middleware(
+            RateLimitMiddleware,
+            limiter=SlidingWindowRateLimiter(),
+            rule_for=lambda method, path: batch_rule,
+            max_body_size=100,
+        )
+
+        @batch_app.post("/briefings")
+        async def briefings(request: Request):
+            return {"items": len(await request.json())}
+
+        self.client = TestClient(app)
+        self.batch_client = TestClient(batch_app)
+
+    def test_limited_route_sends_headers_and_429(self):
+        """Responses carry RateLimit headers; requests over the limit get 429."""
+        responses = [self.client.get("/briefing") for _ in range(3)]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        self.assertEqual(responses[0].headers["ratelimit-limit"], "2")
+        self.assertEqual(responses[0].headers["ratelimit-remaining"], "1")
+        self.assertIn("retry-after", responses[2].headers)
+
+    def test_unlimited_route_has_no_headers(self):
+        """Routes without a rule are not counted."""
+        response = self.client.get("/other")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ratelimit-limit", response.headers)
+
+    def test_batches_are_charged_by_their_body(self):
+        """A rule with a cost weighs requests by their body, which still reaches the endpoint."""
+        responses = [self.batch_client.post("/briefings", json=[1, 2, 3]) for _ in range(2)]
+
+        self.assertEqual([response.status_code for response in responses], [200, 429])
+        self.assertEqual(responses[0].json(), {"items": 3})
+        self.assertEqual(responses[0].headers["ratelimit-remaining"], "2")
+        self.assertEqual(self.batch_client.post("/briefings", json=list(range(50))).status_code, 413)
+
+    def test_callers_are_identified_by_token_subject(self):
+        """A valid bearer token identifies the user; otherwise the IP is used."""
+        token = auth.create_access_token({"sub": "testuser"})
+
+        def scope(authorization: str) -> dict:
+            return {"headers": [(b"authorization", authorization.encode())], "client": ("10.0.0.1", 1234)}
+
+        self.assertEqual(client_identity(scope(f"Bearer {token}")), "user:testuser")
+        self.assertEqual(client_identity(scope("Bearer forged")), "ip:10.0.0.1")
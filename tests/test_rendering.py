@@ -0,0 +1,94 @@
+"""
+Unit tests for the briefing rendering layer.
+"""
+import io
+import json
+import unittest
+
+from daily_briefing.models import BriefingResponse
+from daily_briefing.rendering import BriefingRenderer, CompiledTemplate
+
+def make_briefing(user_name: str) -> BriefingResponse:
+    return BriefingResponse(
+        user_name=user_name,
+        city="Wrocław",
+        weather_summary="Sunny.",
+        latest_post_title="Hello"
+    )
+
+class TestCompiledTemplate(unittest.TestCase):
+    """Test suite for the CompiledTemplate class."""
+
+    def test_render_matches_str_format(self):
+        """Rendering gives the same result as str.format, including format specs."""
+        template = "It's {temperature:.1f}°C in {city}."
+        compiled = CompiledTemplate(template)
+
+        result = compiled.render({"temperature": 15, "city": "Wrocław"})
+
+        self.assertEqual(result, template.format(temperature=15, city="Wrocław"))
+        self.assertEqual(compiled.fields, {"temperature", "city"})
+
+    def test_attribute_and_index_fields_are_supported(self):
+        """Fields may access attributes and items of a value, like in str.format."""
+        compiled = CompiledTemplate("{briefing.user_name} in {cities[0]}")
+
+        result = compiled.render({"briefing": make_briefing("Leanne"), "cities": ["Wrocław"]})
+
+        self.assertEqual(result, "Leanne in Wrocław")
+        self.assertEqual(compiled.fields, {"briefing", "cities"})
+
+    def test_conversions_and_nested_format_specs_are_supported(self):
+        """Conversions and format specs built from other fields render like str.format."""
+        template = "{city!r:>{width}} {{literal}}"
+        compiled = CompiledTemplate(template)
+
+        result = compiled.render({"city": "Wrocław", "width": 12})
+
+        self.assertEqual(result, template.format(city="Wrocław", width=12))
+        self.assertEqual(compiled.fields, {"city", "width"})
+
+    def test_positional_fields_are_rejected(self):
+        """Only named fields are supported."""
+        with self.assertRaises(ValueError):
+            CompiledTemplate("Good morning, {}!")
+
+class TestBriefingRenderer(unittest.TestCase):
+    """Test suite for the BriefingRenderer class."""
+
+    def test_render_plain(self):
+        """The plain format is the classic one-line CLI briefing."""
+        result = BriefingRenderer("plain").render(make_briefing("Leanne Graham"))
+
+        self.assertEqual(
+            result,
+            "Good morning, Leanne Graham! Sunny. Your latest post is titled: 'Hello'."
+        )
+
+    def test_render_markdown(self):
+        """The Markdown format has a heading and a bullet per section."""
+        result = BriefingRenderer("markdown").render(make_briefing("Leanne Graham"))
+
+        self.assertTrue(result.startswith("## Good morning, Leanne Graham!\n"))
+        self.assertIn("- **Weather in Wrocław:** Sunny.\n", result)
+
+    def test_unknown_format_is_rejected(self):
+        """Unsupported output formats raise a ValueError."""
+        with self.assertRaises(ValueError):
+            BriefingRenderer("html")
+
+    def test_write_many_streams_json_lines(self):
+        """Briefings from a generator are written one JSON object per line."""
+        consumed = []
+
+        def briefings():
+            for name in ("Leanne Graham", "Ervin Howell"):
+                consumed.append(name)
+                yield make_briefing(name)
+
+        fh = io.StringIO()
+        count = BriefingRenderer("jsonl").write_many(briefings(), fh)
+
+        lines = fh.getvalue().splitlines()
+        self.assertEqual(count, 2)
+        self.assertEqual([json.loads(line)["user_name"] for line in lines], consumed)
@@ -0,0 +1,118 @@
+"""
+Unit tests for the tracing module.
+"""
+import concurrent.futures
+import json
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from daily_briefing import tracing
+
+class TestTracing(unittest.TestCase):
+    """Test suite for spans, context propagation and the middleware."""
+
+    def setUp(self):
+        self.exporter = tracing.InMemoryExporter()
+        tracing.configure(self.exporter)
+
+    def tearDown(self):
+        tracing.configure(None)
+
+    def test_nested_spans_share_the_trace(self):
+        """A span started inside another one is its child."""
+        with tracing.start_span("parent") as parent:
+            with tracing.start_span("child", city="Wroclaw"):
+                pass
+
+        child, exported_parent = self.exporter.spans
+        self.assertIs(exported_parent, parent)
+        self.assertEqual(child.trace_id, parent.trace_id)
+        self.assertEqual(child.parent_id, parent.span_id)
+        self.assertIsNone(parent.parent_id)
+        self.assertEqual(child.attributes, {"city": "Wroclaw"})
+        self.assertGreaterEqual(child.duration_ms, 0)
+
+    def test_bind_context_propagates_the_span_to_worker_threads(self):
+        """Spans started in a thread pool are children of the submitting span."""
+        traced_call = tracing.traced("get_user")(lambda user_id: user_id)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            with tracing.start_span("generate_briefing") as parent:
+                future = executor.submit(tracing.bind_context(traced_call), 3)
+                self.assertEqual(future.result(), 3)
+
+        child = next(span for span in self.exporter.spans if span.name == "get_user")
+        self.assertEqual(child.parent_id, parent.span_id)
+        self.assertNotEqual(child.thread, parent.thread)
+
+    def test_failed_span_is_marked_as_error(self):
+        """An exception leaving a span marks it as failed and propagates."""
+        with self.assertRaises(ValueError):
+            with tracing.start_span("get_user"):
+                raise ValueError("boom")
+
+        self.assertEqual(self.exporter.spans[0].status, "error")
+
+    def test_outbound_headers_carry_the_current_span(self):
+        """Outbound requests get a traceparent header that parses back to the span."""
+        self.assertEqual(tracing.outbound_headers(), {})
+        with tracing.start_span("get_weather") as span:
+            headers = tracing.outbound_headers()
+
+        self.assertEqual(tracing.parse_traceparent(headers["traceparent"]), (span.trace_id, span.span_id))
+
+    def test_parse_traceparent_rejects_malformed_headers(self):
+        """Malformed or all-zero traceparent headers are ignored."""
+        self.assertIsNone(tracing.parse_traceparent(None))
+        self.assertIsNone(tracing.parse_traceparent("not-a-traceparent"))
+        self.assertIsNone(tracing.parse_traceparent(f"00-{'0' * 32}-{'1' * 16}-01"))
+
+    def test_disabled_tracing_records_nothing(self):
+        """Without an exporter, spans are not created and functions are not wrapped."""
+        tracing.configure(None)
+        func = lambda: None
+
+        with tracing.start_span("get_user") as span:
+            self.assertIsNone(span)
+        self.assertIs(tracing.bind_context(func), func)
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_file_exporter_writes_spans_in_the_background(self):
+        """The file is only opened by the writer thread, and closing writes out the queued spans."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spans.jsonl")
+            exporter = tracing.JsonlFileExporter(path)
+            self.assertFalse(os.path.exists(path))
+
+            tracing.configure(exporter)
+            with tracing.start_span("get_user", user_id=1):
+                pass
+            tracing.shutdown()
+
+            with open(path, encoding="utf-8") as file:
+                lines = [json.loads(line) for line in file]
+            self.assertEqual([(line["name"], line["attributes"]) for line in lines], [("get_user", {"user_id": 1})])
+
+    def test_middleware_continues_incoming_trace(self):
+        """The request span continues an incoming trace and is named after the route."""
+        app = FastAPI()
+        app.add_middleware(tracing.TracingMiddleware)
+
+        @app.get("/briefing/{user_id}")
+        def briefing(user_id: int):
+            with tracing.start_span("generate_briefing"):
+                return {"user_id": user_id}
+
+        trace_id, parent_id = "a" * 32, "b" * 16
+        response = TestClient(app).get("/briefing/1", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+        self.assertEqual(response.headers["X-Trace-Id"], trace_id)
+        request_span = next(span for span in self.exporter.spans if span.name == "GET /briefing/{user_id}")
+        self.assertEqual(request_span.parent_id, parent_id)
+        self.assertEqual(request_span.attributes["status"], 200)
+
+if __name__ == '__main__':
+    unittest.main()
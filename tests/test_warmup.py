@@ -0,0 +1,91 @@
+"""
+Unit tests for the startup warm-up.
+"""
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from daily_briefing import warmup
+from daily_briefing.database import Base, BriefingLog
+
+class TestRunWarmUp(unittest.TestCase):
+    """Test suite for running the warm-up steps."""
+
+    def test_steps_are_reported_individually(self):
+        """Successful, failing and slow steps are all recorded; none stops the warm-up."""
+        release = threading.Event()
+
+        def failing():
+            raise ConnectionError("upstream unreachable")
+
+        report = warmup.run_warm_up(
+            {"ok": lambda: "done", "failing": failing, "slow": lambda: release.wait(5) and "late"},
+            timeout=0.2,
+        )
+        # The timed-out step keeps running, but cannot keep the process alive.
+        slow_thread = next(thread for thread in threading.enumerate() if thread.name == "warm-up-slow")
+        self.assertTrue(slow_thread.daemon)
+        release.set()
+
+        self.assertTrue(report.finished)
+        self.assertEqual(report.steps["ok"].status, "ok")
+        self.assertEqual(report.steps["ok"].detail, "done")
+        self.assertEqual(report.steps["failing"].status, "failed")
+        self.assertEqual(report.steps["failing"].detail, "upstream unreachable")
+        self.assertEqual(report.steps["slow"].status, "timed out")
+
+class TestWarmUpSteps(unittest.TestCase):
+    """Test suite for the individual warm-up steps."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        now = datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            db.add_all(
+                [BriefingLog(user_id=1, city="Wroclaw", created_at=now) for _ in range(3)]
+                + [BriefingLog(user_id=2, city="Warsaw", created_at=now)]
+                + [BriefingLog(user_id=3, city="Gdansk", created_at=now - timedelta(days=30)) for _ in range(5)]
+            )
+            db.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_open_db_connections_fills_the_pool(self):
+        """The opened connections stay in the pool for the first requests."""
+        engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=3)
+
+        detail = warmup.open_db_connections(engine, 3)
+
+        self.assertEqual(detail, "opened 3 connections")
+        self.assertEqual(engine.pool.checkedin(), 3)
+        engine.dispose()
+
+    def test_prefetch_weather_of_recent_top_cities(self):
+        """The weather of the most requested recent cities is fetched, most requested first."""
+        weather_client = MagicMock()
+        weather_client.get_weather.side_effect = lambda city: None if city == "Warsaw" else MagicMock()
+
+        detail = warmup.prefetch_weather(self.session_factory, weather_client, top_k=5)
+
+        self.assertEqual([c.args[0] for c in weather_client.get_weather.call_args_list], ["Wroclaw", "Warsaw"])
+        self.assertEqual(detail, "fetched the weather of 1 of 2 cities")
+
+    def test_preconnect_upstreams(self):
+        """Every client opens its connection."""
+        clients = [MagicMock(), MagicMock()]
+
+        warmup.preconnect_upstreams(*clients)
+
+        for client in clients:
+            client.preconnect.assert_called_once_with()
+
+if __name__ == '__main__':
+    unittest.main()
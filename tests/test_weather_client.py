@@ -7,7 +7,7 @@ import requests
 from daily_briefing.weather_client import OpenWeatherClient
 from daily_briefing.models import WeatherInfo
 
-@patch('daily_briefing.weather_client.requests.get')
+@patch('daily_briefing.weather_client.requests.Session.get')
 @patch('daily_briefing.weather_client.ConfigReader')
 def test_get_weather_success(mock_config_reader_class, mock_requests_get):
     """
@@ -67,10 +67,11 @@ def test_get_weather_success(mock_config_reader_class, mock_requests_get):
     mock_requests_get.assert_called_once_with(
         f"{client.base_url}/weather",
         params=expected_params,
+        headers={},
         timeout=10
     )
 
-@patch("daily_briefing.weather_client.requests.get")
+@patch("daily_briefing.weather_client.requests.Session.get")
 @patch("daily_briefing.weather_client.ConfigReader")
 def test_get_weather_city_not_found(mock_config_reader_class, mock_requests_get):
     """Test the graceful handling of a 404 City Not Found error from the API."""
@@ -78,4 +78,35 @@ def test_authorized_log_creation_and_deletion(db_session_setup):
 
         # 5. Verify the log is truly gone by trying to fetch it by its ID.
         response_get_again = client.get(f"http://127.0.0.1:8000/logs/{log_id_to_delete}")
-        assert response_get_again.status_code == 404, "Log should not be found after deletion"
\ No newline at end of file
+        assert response_get_again.status_code == 404, "Log should not be found after deletion"
+
+def test_logs_keyset_pagination(db_session_setup):
+    """
+    Tests that /logs pages through filtered log entries, newest first, using
+    the X-Next-Cursor header, without repeating or skipping entries.
+    """
+    # Arrange
+    token = get_auth_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    db = TestingSessionLocal()
+    new_logs = [BriefingLog(user_id=98, city="PaginationTestCity") for _ in range(5)]
+    db.add_all(new_logs)
+    db.commit()
+    expected_ids = sorted((log.id for log in new_logs), reverse=True)
+    db.close()
+
+    # Act
+    seen_ids = []
+    params = {"city": "PaginationTestCity", "limit": 2}
+    with httpx.Client(headers=headers) as client:
+        while True:
+            response = client.get("http://127.0.0.1:8000/logs", params=params)
+            assert response.status_code == 200
+            seen_ids.extend(log["id"] for log in response.json())
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if next_cursor is None:
+                break
+            params["cursor"] = next_cursor
+
+    # Assert
+    assert seen_ids == expected_ids
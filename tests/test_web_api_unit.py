@@ -6,12 +6,28 @@ dependencies (like the database and external API clients) mocked.
 This allows for fast and reliable testing of the API's logic in isolation
 without needing to run Docker or have live network connections.
 """
+import asyncio
+import json
+import threading
+
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from daily_briefing.web_api import api_app, get_db, get_briefing_app
-from daily_briefing.models import BriefingResponse
+from daily_briefing import auth
+from daily_briefing.web_api import (
+    _briefing_events,
+    api_app,
+    get_api_client,
+    get_db,
+    get_briefing_app,
+    get_briefing_store,
+    get_log_writer,
+    get_weather_client,
+)
+from daily_briefing.briefing_store import MaterializedBriefingStore
+from daily_briefing.models import BriefingDelta, BriefingResponse
+from daily_briefing.profiler import ProfilerBusyError
 
 @pytest.fixture
 def client_with_mock_deps():
@@ -19,17 +35,20 @@ def client_with_mock_deps():
     Pytest fixture to create a FastAPI TestClient with mocked dependencies.
 
     This fixture uses FastAPI's dependency override mechanism to replace the
-    real `get_db` dependency and application logic with mock objects.
-    This allows us to test fast the API endpoint's interaction with the database
-    (e.g., that it calls `db.add()` and `db.commit()`) without needing a real
-    database connection.
+    real `get_db` dependency, the log writer and application logic with mock
+    objects. This allows us to test fast the API endpoint's interaction with
+    the database (e.g., that it hands a log entry to the log writer) without
+    needing a real database connection.
 
     Yields:
-        tuple: A tuple containing the configured TestClient, the mock DB session
-        and the mock briefing app.
+        tuple: A tuple containing the configured TestClient, the mock DB session,
+        the mock briefing app and the mock log writer.
     """
     mock_db_session = MagicMock()
     mock_briefing_app = MagicMock()
+    mock_log_writer = MagicMock()
+    # A fresh store per test, so materialized briefings don't leak between tests.
+    briefing_store = MaterializedBriefingStore()
 
     def override_get_db():
         """A dependency override that yields the mock session."""
@@ -40,9 +59,11 @@ def client_with_mock_deps():
 
     api_app.dependency_overrides[get_db] = override_get_db
     api_app.dependency_overrides[get_briefing_app] = override_get_briefing_app
+    api_app.dependency_overrides[get_briefing_store] = lambda: briefing_store
+    api_app.dependency_overrides[get_log_writer] = lambda: mock_log_writer
 
     client = TestClient(api_app)
-    yield client, mock_db_session, mock_briefing_app
+    yield client, mock_db_session, mock_briefing_app, mock_log_writer
 
     # Teardown: Clean up the override after the test is done
     api_app.dependency_overrides.clear()
@@ -57,7 +78,7 @@ def test_get_briefing_unit_success(client_with_mock_deps):
     """
     # Arrange
     # Unpack the client and mock db_session yielded from the fixture
-    client, mock_db_session, mock_briefing_app = client_with_mock_deps
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
     mock_db_session.reset_mock()
     mock_briefing_app.reset_mock()  
 
@@ -80,6 +101,638 @@ def test_get_briefing_unit_success(client_with_mock_deps):
     mock_briefing_app.generate_briefing_for_api.assert_called_once_with(
         user_id=99, city="Mock City"
     )
-    # 3. Assert that a log entry was added and committed to the database.
-    mock_db_session.add.assert_called_once()
-    mock_db_session.commit.assert_called_once()
\ No newline at end of file
+    # 3. Assert that a log entry was handed to the log writer, and that the
+    #    request didn't wait for a database commit.
+    mock_log_writer.submit.assert_called_once_with(user_id=99, city="Mock City")
+    mock_db_session.commit.assert_not_called()
+
+def test_get_briefing_unit_served_from_store(client_with_mock_deps):
+    """
+    Tests that a repeated request is served from the materialized store
+    instead of generating the briefing again.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    mock_briefing_app.generate_briefing_for_api.return_value = BriefingResponse(
+        user_name="Mock User",
+        city="Mock City",
+        weather_summary="Always sunny",
+        latest_post_title="Mock Post"
+    )
+
+    # Act
+    first = client.get("/briefing/99?city=Mock City")
+    second = client.get("/briefing/99?city=Mock City")
+
+    # Assert
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert "generated_at" in second.json()
+    # The briefing was generated only once, but both requests were logged.
+    mock_briefing_app.generate_briefing_for_api.assert_called_once()
+    assert mock_log_writer.submit.call_count == 2
+
+def test_get_briefing_changes_unit_success(client_with_mock_deps):
+    """
+    Tests that the /briefing/{user_id}/changes endpoint returns the delta
+    produced by the application logic.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    mock_briefing_app.generate_briefing_delta.return_value = BriefingDelta(
+        user_id=99,
+        city="Mock City",
+        is_initial=False,
+        new_post_titles=["Fresh Post"],
+        last_post_id=12,
+    )
+
+    # Act
+    response = client.get("/briefing/99/changes?city=Mock City")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["new_post_titles"] == ["Fresh Post"]
+    assert response.json()["weather_summary"] is None
+    mock_briefing_app.generate_briefing_delta.assert_called_once_with(user_id=99, city="Mock City")
+
+@patch("daily_briefing.web_api.DailyBriefing")
+@patch("daily_briefing.weather_client.OpenWeatherClient")
+@patch("daily_briefing.api_interactions.JSONPlaceholderClient")
+@patch("daily_briefing.web_api.ConfigReader")
+def test_clients_are_created_once_per_application(
+    mock_config_reader_class,
+    mock_api_client_class,
+    mock_weather_client_class,
+    mock_daily_briefing_class
+):
+    """
+    Tests that the configuration, clients and DailyBriefing are created once
+    and reused by subsequent requests, instead of being rebuilt per request.
+    """
+    # Arrange
+    mock_daily_briefing_class.return_value.generate_briefing_for_api.side_effect = [
+        BriefingResponse(user_name="Mock User", city="City A"),
+        BriefingResponse(user_name="Mock User", city="City B"),
+    ]
+    api_app.dependency_overrides[get_log_writer] = lambda: MagicMock()
+    client = TestClient(api_app)
+
+    try:
+        # Act
+        first = client.get("/briefing/1?city=City A")
+        second = client.get("/briefing/1?city=City B")
+
+        # Assert
+        assert first.status_code == 200
+        assert second.status_code == 200
+        mock_config_reader_class.assert_called_once()
+        mock_api_client_class.assert_called_once()
+        mock_weather_client_class.assert_called_once()
+        mock_daily_briefing_class.assert_called_once()
+        assert api_app.state.briefing_app is mock_daily_briefing_class.return_value
+    finally:
+        api_app.dependency_overrides.clear()
+        for name in ("config_reader", "api_client", "weather_client", "briefing_app", "briefing_app_clients", "briefing_store"):
+            if hasattr(api_app.state, name):
+                delattr(api_app.state, name)
+
+@patch("daily_briefing.web_api.DailyBriefing")
+def test_overridden_clients_are_used_by_the_briefing_app(mock_daily_briefing_class):
+    """
+    Tests that overriding get_api_client and get_weather_client takes effect,
+    instead of reusing a DailyBriefing built for other clients.
+    """
+    # Arrange
+    first_clients, second_clients = (MagicMock(), MagicMock()), (MagicMock(), MagicMock())
+    mock_daily_briefing_class.return_value.generate_briefing_for_api.return_value = BriefingResponse(
+        user_name="Mock User", city="City A"
+    )
+    api_app.dependency_overrides[get_log_writer] = lambda: MagicMock()
+    client = TestClient(api_app)
+
+    try:
+        # Act
+        for api_client, weather_client in (first_clients, first_clients, second_clients):
+            api_app.dependency_overrides[get_api_client] = lambda: api_client
+            api_app.dependency_overrides[get_weather_client] = lambda: weather_client
+            assert client.get("/briefing/1?city=City A").status_code == 200
+
+        # Assert
+        created_for = [
+            (call.kwargs["api_client"], call.kwargs["weather_client"]) for call in mock_daily_briefing_class.call_args_list
+        ]
+        assert created_for == [first_clients, second_clients]
+    finally:
+        api_app.dependency_overrides.clear()
+        for name in ("briefing_app", "briefing_app_clients", "briefing_store"):
+            if hasattr(api_app.state, name):
+                delattr(api_app.state, name)
+
+def test_briefing_shows_a_new_post_right_after_create_post():
+    """
+    Tests that creating a post also evicts the materialized briefing served
+    by /briefing, instead of it being served until the store's TTL.
+    """
+    # Arrange
+    api_client, weather_client = MagicMock(), MagicMock()
+    api_client.get_user.return_value = {"name": "Leanne Graham"}
+    api_client.get_posts_by_user.return_value = [{"title": "First Post"}]
+    api_client.create_post.return_value = {"id": 101, "title": "Second Post"}
+    weather_client.get_weather.return_value = None
+    api_app.dependency_overrides[get_api_client] = lambda: api_client
+    api_app.dependency_overrides[get_weather_client] = lambda: weather_client
+    store = MaterializedBriefingStore()
+    api_app.dependency_overrides[get_briefing_store] = lambda: store
+    api_app.dependency_overrides[get_log_writer] = lambda: MagicMock()
+    client = TestClient(api_app)
+
+    try:
+        # Act
+        before = client.get("/briefing/1?city=Wroclaw").json()
+        api_app.state.briefing_app.create_post(title="Second Post", body="Body", user_id=1)
+        api_client.get_posts_by_user.return_value = [{"title": "Second Post"}]
+        after = client.get("/briefing/1?city=Wroclaw").json()
+
+        # Assert
+        assert before["latest_post_title"] == "First Post"
+        assert after["latest_post_title"] == "Second Post"
+    finally:
+        api_app.dependency_overrides.clear()
+        for name in ("briefing_app", "briefing_app_clients"):
+            if hasattr(api_app.state, name):
+                delattr(api_app.state, name)
+
+def test_get_logs_unit_rejects_invalid_cursor(client_with_mock_deps):
+    """
+    Tests that /logs answers a malformed pagination cursor with 400 Bad Request.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser"}
+
+    # Act
+    response = client.get("/logs?cursor=not-a-cursor")
+
+    # Assert
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+def test_get_logs_unit_limit_is_capped(client_with_mock_deps):
+    """
+    Tests that /logs refuses page sizes above the maximum.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser"}
+
+    # Act
+    response = client.get("/logs?limit=100000")
+
+    # Assert
+    assert response.status_code == 422
+
+def test_export_logs_unit_streams_ndjson(client_with_mock_deps):
+    """
+    Tests that /logs/export streams the encoded rows from its own session
+    as a downloadable NDJSON attachment.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser"}
+    export_session = MagicMock()
+
+    with patch("daily_briefing.database.SessionLocal", return_value=export_session), \
+         patch("daily_briefing.web_api.iter_log_rows", return_value=iter([["row"]])) as mock_iter_rows, \
+         patch("daily_briefing.web_api.encode_logs_export", return_value=iter([b'{"id": 1}\n'])) as mock_encode:
+        # Act
+        response = client.get("/logs/export?city=Warsaw")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.content == b'{"id": 1}\n'
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="briefing_logs.ndjson"' in response.headers["content-disposition"]
+    assert mock_iter_rows.call_args.kwargs["city"] == "Warsaw"
+    mock_encode.assert_called_once()
+    assert mock_encode.call_args.kwargs == {"export_format": "ndjson", "compress": False}
+    export_session.close.assert_called_once()
+
+def test_export_logs_unit_keeps_the_format_and_gzip_parameters(client_with_mock_deps):
+    """
+    Tests that /logs/export still takes the `format` and `gzip` query
+    parameters.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser"}
+
+    with patch("daily_briefing.database.SessionLocal"), \
+         patch("daily_briefing.web_api.iter_log_rows", return_value=iter([])), \
+         patch("daily_briefing.web_api.encode_logs_export", return_value=iter([b"gz"])) as mock_encode:
+        # Act
+        response = client.get("/logs/export?format=csv&gzip=true")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="briefing_logs.csv.gz"' in response.headers["content-disposition"]
+    assert mock_encode.call_args.kwargs == {"export_format": "csv", "compress": True}
+
+def test_export_logs_unit_rejects_unknown_format(client_with_mock_deps):
+    """
+    Tests that /logs/export refuses formats other than NDJSON and CSV.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser"}
+
+    # Act
+    response = client.get("/logs/export?format=xml")
+
+    # Assert
+    assert response.status_code == 422
+
+def test_bulk_delete_logs_unit_success(client_with_mock_deps):
+    """
+    Tests that /logs/bulk-delete deletes by cutoff and returns the count.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser", "scopes": [auth.ADMIN_SCOPE]}
+
+    with patch("daily_briefing.web_api.delete_logs", return_value=42) as mock_delete_logs:
+        # Act
+        response = client.post("/logs/bulk-delete", json={"created_before": "2025-06-01T00:00:00"})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 42}
+    assert mock_delete_logs.call_args.kwargs["ids"] is None
+    assert mock_delete_logs.call_args.kwargs["created_before"].year == 2025
+
+def test_bulk_delete_logs_unit_requires_one_criterion(client_with_mock_deps):
+    """
+    Tests that /logs/bulk-delete refuses requests with both or neither
+    of IDs and a cutoff.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser", "scopes": [auth.ADMIN_SCOPE]}
+
+    # Act
+    neither = client.post("/logs/bulk-delete", json={})
+    both = client.post("/logs/bulk-delete", json={"ids": [1], "created_before": "2025-06-01T00:00:00"})
+
+    # Assert
+    assert neither.status_code == 422
+    assert both.status_code == 422
+
+def test_bulk_delete_logs_unit_requires_the_admin_scope(client_with_mock_deps):
+    """
+    Tests that /logs/bulk-delete refuses a token without the admin scope.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser", "scopes": []}
+
+    with patch("daily_briefing.web_api.delete_logs") as mock_delete_logs:
+        # Act
+        response = client.post("/logs/bulk-delete", json={"created_before": "2025-06-01T00:00:00"})
+
+    # Assert
+    assert response.status_code == 403
+    mock_delete_logs.assert_not_called()
+
+def test_delete_log_unit_miss_is_not_timed_as_a_commit(client_with_mock_deps):
+    """
+    Tests that deleting an unknown log answers 404 without committing or
+    recording a commit latency sample.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser"}
+    mock_db_session.query.return_value.filter.return_value.delete.return_value = 0
+
+    with patch("daily_briefing.web_api.DB_COMMIT_DURATION") as mock_commit_duration:
+        # Act
+        response = client.delete("/logs/999")
+
+    # Assert
+    assert response.status_code == 404
+    mock_db_session.commit.assert_not_called()
+    mock_commit_duration.time.assert_not_called()
+
+def test_get_briefing_unit_conditional_request(client_with_mock_deps):
+    """
+    Tests that /briefing/{user_id} sends ETag and Cache-Control headers, and
+    answers a matching If-None-Match with 304 Not Modified and no body.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    mock_briefing_app.generate_briefing_for_api.return_value = BriefingResponse(
+        user_name="Mock User",
+        city="Mock City",
+        weather_summary="Always sunny",
+    )
+
+    # Act
+    first = client.get("/briefing/99?city=Mock City")
+    etag = first.headers["etag"]
+    not_modified = client.get("/briefing/99?city=Mock City", headers={"If-None-Match": etag})
+    modified = client.get("/briefing/99?city=Mock City", headers={"If-None-Match": 'W/"outdated"'})
+
+    # Assert
+    assert first.status_code == 200
+    assert etag.startswith('W/"')
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert modified.status_code == 200
+    mock_briefing_app.generate_briefing_for_api.assert_called_once()
+
+def test_get_user_briefings_unit_batch(client_with_mock_deps):
+    """
+    Tests that /briefings returns a result per item in request order, and
+    logs the successful ones with a single bulk submission.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    mock_briefing_app.generate_briefings.return_value = iter([
+        (1, None, ValueError("User with ID 999 not found.")),
+        (0, BriefingResponse(user_name="Mock User", city="Mock City"), None),
+    ])
+
+    # Act
+    response = client.post(
+        "/briefings",
+        json={"items": [{"user_id": 1, "city": "Mock City"}, {"user_id": 999, "city": "Mock City"}]},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == [0, 1]
+    assert results[0]["briefing"]["user_name"] == "Mock User"
+    assert results[1]["status_code"] == 404
+    assert results[1]["error"] == "User with ID 999 not found."
+    mock_briefing_app.generate_briefings.assert_called_once_with([(1, "Mock City"), (999, "Mock City")])
+    mock_log_writer.submit_many.assert_called_once_with([(1, "Mock City")])
+
+def test_get_user_briefings_unit_streamed(client_with_mock_deps):
+    """
+    Tests that /briefings?stream=true sends one NDJSON line per item in
+    completion order.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    mock_briefing_app.generate_briefings.return_value = iter([
+        (1, BriefingResponse(user_name="Second", city="B"), None),
+        (0, BriefingResponse(user_name="First", city="A"), None),
+    ])
+
+    # Act
+    response = client.post(
+        "/briefings?stream=true",
+        json={"items": [{"user_id": 1, "city": "A"}, {"user_id": 2, "city": "B"}]},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [1, 0]
+    mock_log_writer.submit_many.assert_called_once_with([(2, "B"), (1, "A")])
+
+def test_briefing_events_unit_pushes_only_changes():
+    """
+    Tests that the briefing subscription sends the current briefing, then
+    only briefings whose content changed, until the client disconnects.
+    """
+    # Arrange
+    store = MaterializedBriefingStore()
+    mock_briefing_app = MagicMock()
+    first = store.put(1, "Mock City", BriefingResponse(user_name="Mock User", city="Mock City"))
+    # The store is read once per poll: unchanged, unchanged, then changed.
+    updates = [first, first, store.put(1, "Other", BriefingResponse(user_name="Renamed", city="Mock City"))]
+    mock_request = MagicMock()
+    mock_request.is_disconnected = AsyncMock(side_effect=[False, False, False, True])
+
+    async def collect():
+        with patch("daily_briefing.web_api.EVENTS_POLL_INTERVAL_SECONDS", 0), \
+             patch("daily_briefing.web_api._current_briefing", AsyncMock(side_effect=updates)):
+            return [event async for event in _briefing_events(
+                mock_request, 1, "Mock City", mock_briefing_app, store, first
+            )]
+
+    # Act
+    events = asyncio.run(collect())
+
+    # Assert
+    assert len(events) == 2
+    assert events[0].startswith(f"event: briefing\nid: {first.etag}\n")
+    assert '"user_name":"Renamed"' in events[1]
+
+def test_subscribe_to_user_briefing_unit_unknown_user(client_with_mock_deps):
+    """
+    Tests that subscribing to the briefing of an unknown user fails with 404
+    before the event stream starts.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    mock_briefing_app.generate_briefing_for_api.side_effect = ValueError("User with ID 999 not found.")
+
+    # Act
+    response = client.get("/briefing/999/events?city=Mock City")
+
+    # Assert
+    assert response.status_code == 404
+    mock_log_writer.submit.assert_not_called()
+
+def test_metrics_endpoint_exposes_request_latencies(client_with_mock_deps):
+    """
+    Tests that /metrics exposes the request latency histogram by route
+    template, in the Prometheus text format.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    mock_briefing_app.generate_briefing_for_api.return_value = BriefingResponse(
+        user_name="Mock User", city="Mock City"
+    )
+    client.get("/briefing/99?city=Mock City")
+
+    # Act
+    response = client.get("/metrics")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/briefing/{user_id}",status="200"}' in response.text
+    assert 'cache_lookups_total{cache="materialized_briefings",result="miss"}' in response.text
+
+def test_profile_endpoint_returns_collapsed_stacks(client_with_mock_deps):
+    """
+    Tests that /debug/profile requires a token and returns the collapsed
+    stacks of the profiler, with the number of samples.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    assert client.get("/debug/profile?seconds=1").status_code == 401
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser", "scopes": ["admin"]}
+
+    with patch("daily_briefing.web_api.profile", return_value=("main;handle 3\n", 3)) as mock_profile:
+        # Act
+        response = client.get("/debug/profile?seconds=2&interval_ms=5")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.text == "main;handle 3\n"
+    assert response.headers["X-Profile-Samples"] == "3"
+    mock_profile.assert_called_once_with(2.0, interval=0.005, include_idle=False, include_thread_names=False)
+
+def test_profile_endpoint_requires_the_admin_scope(client_with_mock_deps):
+    """
+    Tests that a token without the admin scope gets 403, and that the scope
+    is only granted when requested at login.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    form = {"username": "testuser", "password": "testpassword"}
+
+    with patch("daily_briefing.auth.verify_password", return_value=True), \
+         patch("daily_briefing.web_api.profile", return_value=("main;handle 3\n", 3)) as mock_profile:
+        # Act
+        tokens = [
+            client.post("/token", data=data).json()["access_token"] for data in (form, {**form, "scope": "admin"})
+        ]
+        responses = [
+            client.get("/debug/profile?seconds=1", headers={"Authorization": f"Bearer {token}"}) for token in tokens
+        ]
+
+    # Assert
+    assert [response.status_code for response in responses] == [403, 200]
+    mock_profile.assert_called_once()
+
+def test_profile_endpoint_rejects_concurrent_profiles(client_with_mock_deps):
+    """
+    Tests that a profile requested while another one runs gets 409 Conflict.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    api_app.dependency_overrides[auth.get_current_user] = lambda: {"username": "testuser", "scopes": ["admin"]}
+
+    with patch("daily_briefing.web_api.profile", side_effect=ProfilerBusyError("A profile is already running.")):
+        # Act
+        response = client.get("/debug/profile?seconds=1")
+
+    # Assert
+    assert response.status_code == 409
+
+def test_healthz_is_always_ok(client_with_mock_deps):
+    """
+    Tests that the liveness check succeeds without checking dependencies.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+
+    # Act
+    response = client.get("/healthz")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+def _mock_engine(checked_out: int) -> MagicMock:
+    engine = MagicMock()
+    engine.pool.size.return_value = 5
+    engine.pool.checkedout.return_value = checked_out
+    return engine
+
+def test_readyz_reports_dependencies(client_with_mock_deps):
+    """
+    Tests that the readiness check reports the database, the pool and the
+    executor, and succeeds when nothing is saturated.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+
+    with patch("daily_briefing.database.engine", _mock_engine(checked_out=3)), \
+         patch("daily_briefing.database.DB_MAX_OVERFLOW", 5), patch("daily_briefing.database.DB_POOL_SIZE", 5):
+        # Act
+        response = client.get("/readyz")
+
+    # Assert
+    assert response.status_code == 200
+    report = response.json()
+    assert report["status"] == "ready"
+    assert report["checks"]["database"]["status"] == "ok"
+    assert report["checks"]["connection_pool"] == {"status": "ok", "size": 5, "checked_out": 3, "capacity": 10}
+    assert report["checks"]["executor"]["queued"] == 0
+    assert "upstream_lookups" in report["caches"]
+
+def test_readyz_fails_when_pool_is_saturated_or_database_down(client_with_mock_deps):
+    """
+    Tests that the readiness check returns 503 when all pooled connections
+    are in use, or the database cannot be reached.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    unreachable = _mock_engine(checked_out=0)
+    unreachable.connect.side_effect = ConnectionError("connection refused")
+
+    with patch("daily_briefing.database.engine", _mock_engine(checked_out=10)), \
+         patch("daily_briefing.database.DB_MAX_OVERFLOW", 5), patch("daily_briefing.database.DB_POOL_SIZE", 5):
+        # Act
+        saturated = client.get("/readyz")
+    with patch("daily_briefing.database.engine", unreachable):
+        down = client.get("/readyz")
+
+    # Assert
+    assert saturated.status_code == 503
+    assert saturated.json()["checks"]["connection_pool"]["status"] == "saturated"
+    assert down.status_code == 503
+    assert down.json()["checks"]["database"] == {"status": "failed", "error": "connection refused"}
+
+def test_readyz_probes_join_a_hanging_database_check(client_with_mock_deps):
+    """
+    Tests that probes after a timed-out database check wait for the same
+    check instead of starting another one on a further thread.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    hanging = _mock_engine(checked_out=0)
+    release = threading.Event()
+    hanging.connect.side_effect = lambda: release.wait(5)
+
+    with patch("daily_briefing.database.engine", hanging), \
+         patch("daily_briefing.web_api.READINESS_DB_TIMEOUT_SECONDS", 0.05):
+        # Act
+        responses = [client.get("/readyz") for _ in range(3)]
+        release.set()
+
+    # Assert
+    assert [response.json()["checks"]["database"]["error"] for response in responses] == ["timed out"] * 3
+    assert hanging.connect.call_count == 1
+
+def test_token_retry_with_idempotency_key_skips_password_check(client_with_mock_deps):
+    """
+    Tests that a retried login with the same Idempotency-Key is answered from
+    the stored response, without verifying the password again.
+    """
+    # Arrange
+    client, mock_db_session, mock_briefing_app, mock_log_writer = client_with_mock_deps
+    form = {"username": "testuser", "password": "testpassword"}
+    headers = {"Idempotency-Key": "login-test-token-retry"}
+
+    with patch("daily_briefing.auth.verify_password", return_value=True) as mock_verify:
+        # Act
+        first = client.post("/token", data=form, headers=headers)
+        retry = client.post("/token", data=form, headers=headers)
+
+    # Assert
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    mock_verify.assert_called_once()